@@ -3,8 +3,9 @@ from sqlalchemy import text
 from db import get_engine
 from auth import has_permission
 from report import fetch_report
+from product_sales_stats import warn_if_behind
 
-engine = get_engine()
+engine = get_engine("analytics")
 
 # ----------------- Notification Center -----------------
 def notification_center():
@@ -120,14 +121,15 @@ def supplier_performance():
 
 
 def peak_hours_analysis():
-    """Identify busiest store hours"""
+    """Identify busiest store hours (from the hourly sales rollup)"""
     query = """
-        SELECT EXTRACT(HOUR FROM sale_time) as hour_of_day,
-               COUNT(sale_id) as transaction_count,
-               ROUND(AVG(total_amount), 2) as avg_sale_amount,
-               SUM(total_amount) as total_revenue
-        FROM sales
-        GROUP BY EXTRACT(HOUR FROM sale_time)
+        SELECT EXTRACT(HOUR FROM bucket) as hour_of_day,
+               SUM(sale_count) as transaction_count,
+               ROUND(SUM(revenue) / NULLIF(SUM(sale_count), 0), 2) as avg_sale_amount,
+               SUM(revenue) as total_revenue
+        FROM sales_rollup_hourly
+        GROUP BY EXTRACT(HOUR FROM bucket)
+        HAVING SUM(sale_count) > 0
         ORDER BY transaction_count DESC
     """
     fetch_report(query, "Peak Hours Analysis", "peak_hours")
@@ -150,35 +152,34 @@ def customer_analytics():
 
 
 def predictive_restocking():
-    """Predict which products will need restocking soon"""
+    """Predict which products will need restocking soon (from the 7-day sales window)"""
+    warn_if_behind(engine)
     query = """
         SELECT p.product_id, p.name, p.stock_quantity, 
                p.low_stock_threshold,
-               COALESCE(SUM(si.quantity), 0) as weekly_sales,
+               COALESCE(st.units_7d, 0) as weekly_sales,
                CASE 
-                   WHEN COALESCE(SUM(si.quantity), 0) = 0 THEN 999
-                   ELSE ROUND(p.stock_quantity / NULLIF(SUM(si.quantity), 0) * 7, 2)
+                   WHEN COALESCE(st.units_7d, 0) = 0 THEN 999
+                   ELSE ROUND(p.stock_quantity / NULLIF(st.units_7d, 0) * 7, 2)
                END as days_remaining
         FROM products p
-        LEFT JOIN sale_items si ON p.product_id = si.product_id
-        LEFT JOIN sales s ON si.sale_id = s.sale_id
-        WHERE s.sale_time >= CURRENT_DATE - INTERVAL '7 days' OR s.sale_time IS NULL
-        GROUP BY p.product_id, p.name, p.stock_quantity, p.low_stock_threshold
+        LEFT JOIN product_sales_stats st ON p.product_id = st.product_id
         ORDER BY days_remaining ASC
     """
     fetch_report(query, "Predictive Restocking Analysis", "predictive_restock")
 
 
 def seasonal_trends():
-    """Analyze seasonal sales trends"""
+    """Analyze seasonal sales trends (from the daily sales rollup)"""
     query = """
-        SELECT EXTRACT(MONTH FROM s.sale_time) as month,
-               EXTRACT(YEAR FROM s.sale_time) as year,
-               COUNT(s.sale_id) as transaction_count,
-               SUM(s.total_amount) as total_revenue,
-               ROUND(AVG(s.total_amount), 2) as avg_sale
-        FROM sales s
-        GROUP BY EXTRACT(YEAR FROM s.sale_time), EXTRACT(MONTH FROM s.sale_time)
+        SELECT EXTRACT(MONTH FROM sale_date) as month,
+               EXTRACT(YEAR FROM sale_date) as year,
+               SUM(sale_count) as transaction_count,
+               SUM(revenue) as total_revenue,
+               ROUND(SUM(revenue) / NULLIF(SUM(sale_count), 0), 2) as avg_sale
+        FROM sales_rollup_daily
+        GROUP BY EXTRACT(YEAR FROM sale_date), EXTRACT(MONTH FROM sale_date)
+        HAVING SUM(sale_count) > 0
         ORDER BY year, month
     """
     fetch_report(query, "Seasonal Sales Trends", "seasonal_trends")
@@ -213,16 +214,17 @@ def create_notification(product_id, message, notification_type="low_stock"):
 
 
 def employee_performance():
-    """Track sales performance by employee"""
+    """Track sales performance by employee (from the daily sales rollup)"""
     query = """
         SELECT e.employee_id, e.name, e.role,
-               COUNT(s.sale_id) as sales_processed,
-               SUM(s.total_amount) as total_revenue,
-               ROUND(AVG(s.total_amount), 2) as avg_sale_value
+               SUM(r.sale_count) as sales_processed,
+               SUM(r.revenue) as total_revenue,
+               ROUND(SUM(r.revenue) / NULLIF(SUM(r.sale_count), 0), 2) as avg_sale_value
         FROM employees e
-        LEFT JOIN sales s ON e.employee_id = s.employee_id
-        WHERE s.sale_time >= CURRENT_DATE - INTERVAL '30 days'
+        JOIN sales_rollup_daily r ON e.employee_id = r.employee_id
+        WHERE r.sale_date >= CURRENT_DATE - 30
         GROUP BY e.employee_id, e.name, e.role
+        HAVING SUM(r.sale_count) > 0
         ORDER BY total_revenue DESC
     """
     from report import fetch_report
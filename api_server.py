@@ -1,10 +1,26 @@
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, HTTPException, Query, Request, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional, List
+from fastapi.responses import Response
+from pydantic import BaseModel, Field
+from typing import Optional, List, Literal
 from sqlalchemy import text
-from db_config import get_engine
-import bcrypt
+from db_config import get_async_engine, dispose_async_engines, pool_stats
+from checkout import complete_sale, complete_sales_batch, CheckoutError
+from stock_adjustments import apply_adjustments, StockAdjustmentError, MAX_ADJUSTMENTS, KINDS
+from purchase_receiving import receive_order, ReceivingError
+from stock_ledger import fold, record_movements, locked_stock, STOCK_COMPACT_INTERVAL
+from product_sales_stats import slide_windows, SALES_WINDOWS_INTERVAL
+from pagination import keyset_page, split_page, decode_cursor, CursorError, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from streaming import stream_format, stream_rows
+from catalog_cache import catalog, product_record, PRODUCT_FIELDS, CATALOG_QUERY
+from dashboard_counters import read_counters
+from sales_partitions import ensure_upcoming
+from catalog_import import (parse_header, create_staging, apply_import, is_data_error, CatalogImportError,
+                            STAGING_TABLE, MAX_REPORTED_REJECTS)
+from passwords import hash_password_async, verify_password_async, needs_rehash
+import metrics
+from session_tokens import Session, issue_token, current_session, require_role, revocations
+import asyncio
 import datetime
 
 app = FastAPI(title="SuperMarket Management API")
@@ -17,7 +33,84 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-engine = get_engine()
+# Async engines (asyncpg) so queries never block the event loop.
+# Reports run on their own small pool so they can't starve checkouts.
+engine = get_async_engine()
+analytics_engine = get_async_engine("analytics")
+metrics.instrument_engine(engine.sync_engine)
+metrics.instrument_engine(analytics_engine.sync_engine)
+app.middleware("http")(metrics.http_middleware)
+
+# List endpoints page with ?limit=&cursor= and return next_cursor (null on the last page)
+PageLimit = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+# ?format=ndjson|csv (or an Accept header) streams the whole list instead; see streaming.py
+StreamFormat = Query(None, alias="format")
+
+# Routes take a bearer token from /api/auth/login; roles are checked from its claims
+AnyRole = Depends(current_session)
+ManagerRole = Depends(require_role("MANAGER", "ADMIN"))
+AdminRole = Depends(require_role("ADMIN"))
+
+@app.on_event("startup")
+async def ensure_sales_partitions():
+    """Makes sure checkouts have this month's (and the next few months') sales partitions"""
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(ensure_upcoming)
+    except Exception as e:
+        print(f"⚠️ Could not create upcoming sales partitions: {e}")
+
+async def compact_stock():
+    """Folds stock movements into product stock levels every STOCK_COMPACT_INTERVAL seconds (see stock_ledger.py)"""
+    while True:
+        await asyncio.sleep(STOCK_COMPACT_INTERVAL)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(fold)
+        except Exception as e:
+            print(f"⚠️ Stock compaction failed: {e}")
+
+@app.on_event("startup")
+async def start_stock_compaction():
+    # Several servers may run it; fold() skips while another server's compaction is running
+    if STOCK_COMPACT_INTERVAL > 0:
+        app.state.stock_compactor = asyncio.create_task(compact_stock())
+
+async def slide_sales_windows():
+    """Slides the per-product rolling sales windows every SALES_WINDOWS_INTERVAL seconds (see product_sales_stats.py)"""
+    while True:
+        try:
+            after = 0
+            while True:
+                # One short transaction per batch, so checkouts of those products wait at most a batch
+                async with analytics_engine.begin() as conn:
+                    done = await conn.run_sync(slide_windows, after)
+                if not done:
+                    break
+                after = done[-1]
+        except Exception as e:
+            print(f"⚠️ Sliding sales windows failed: {e}")
+        await asyncio.sleep(SALES_WINDOWS_INTERVAL)
+
+@app.on_event("startup")
+async def start_sales_windows():
+    if SALES_WINDOWS_INTERVAL > 0:
+        app.state.sales_windows = asyncio.create_task(slide_sales_windows())
+
+@app.on_event("shutdown")
+async def dispose_engines():
+    for name in ("stock_compactor", "sales_windows"):
+        task = getattr(app.state, name, None)
+        if task:
+            task.cancel()
+    await dispose_async_engines()
+
+async def fresh_catalog():
+    """Returns the product catalog cache, re-loading changed products first (see catalog_cache.py)"""
+    if catalog.needs_refresh():
+        async with engine.connect() as conn:
+            await conn.run_sync(catalog.refresh)
+    return catalog
 
 class LoginRequest(BaseModel):
     username: str
@@ -28,6 +121,9 @@ class LoginResponse(BaseModel):
     name: str
     role: str
     message: str
+    access_token: str
+    token_type: str = "bearer"
+    expires_at: int
 
 class Product(BaseModel):
     name: str
@@ -38,6 +134,9 @@ class Product(BaseModel):
     supplier_id: int
     low_stock_threshold: int = 10
 
+class BarcodeLookup(BaseModel):
+    barcodes: List[str] = Field(min_length=1, max_length=500)
+
 class SaleItem(BaseModel):
     product_id: int
     quantity: int
@@ -46,7 +145,23 @@ class Sale(BaseModel):
     items: List[SaleItem]
     payment_method: str
     customer_id: Optional[int] = None
-    employee_id: int
+    employee_id: Optional[int] = None  # ignored: the sale is recorded for the logged-in employee
+
+class BatchSaleItem(BaseModel):
+    product_id: int
+    quantity: int
+    unit_price: Optional[float] = None  # price charged at the till; defaults to the current price
+
+class BatchSale(BaseModel):
+    client_sale_id: str = Field(min_length=1, max_length=64)
+    items: List[BatchSaleItem]
+    payment_method: str
+    customer_id: Optional[int] = None
+    employee_id: Optional[int] = None  # defaults to the logged-in employee
+    sale_time: Optional[datetime.datetime] = None
+
+class SaleBatch(BaseModel):
+    sales: List[BatchSale] = Field(max_length=5000)
 
 class Customer(BaseModel):
     name: str
@@ -63,6 +178,15 @@ class StockUpdate(BaseModel):
     product_id: int
     quantity: int
 
+class StockAdjustment(BaseModel):
+    product_id: int
+    quantity: int
+    mode: Literal["add", "set"] = "add"  # add: change the level by quantity; set: the level becomes quantity
+
+class StockAdjustmentBatch(BaseModel):
+    adjustments: List[StockAdjustment] = Field(min_length=1, max_length=MAX_ADJUSTMENTS)
+    kind: Literal[KINDS] = "ADJUSTMENT"
+
 class Category(BaseModel):
     name: str
     description: Optional[str] = None
@@ -78,6 +202,13 @@ class PurchaseOrder(BaseModel):
     items: List[dict]  # List of {product_id, quantity, unit_price}
     status: str = "PENDING"
 
+class ReceivedLine(BaseModel):
+    product_id: int
+    received: int = Field(ge=0)  # total received so far for this product, not this delivery's count
+
+class Receipt(BaseModel):
+    lines: List[ReceivedLine] = Field(min_length=1, max_length=5000)
+
 class NotificationUpdate(BaseModel):
     status: str
 
@@ -88,86 +219,131 @@ async def root():
 @app.post("/api/auth/login", response_model=LoginResponse)
 async def login(credentials: LoginRequest):
     try:
-        with engine.connect() as conn:
-            # First check if user exists
-            res = conn.execute(text("""
-                SELECT COUNT(*) FROM employees
-            """))
-            total = res.fetchone()[0]
-            print(f"Total employees in database: {total}")
-            
-            # Try to find the user
-            res = conn.execute(text("""
+        # One lookup through the unique lower(username) index
+        async with engine.connect() as conn:
+            res = await conn.execute(text("""
                 SELECT employee_id, name, role, password
                 FROM employees
                 WHERE LOWER(username) = LOWER(:uname)
             """), {"uname": credentials.username})
             row = res.fetchone()
-            
-            if not row:
-                # Log attempted username for debugging
-                print(f"Login attempt failed for username: {credentials.username}")
-                res = conn.execute(text("""
-                    SELECT username FROM employees
-                """))
-                existing = [r[0] for r in res]
-                print(f"Existing usernames: {existing}")
-                raise HTTPException(status_code=401, detail="Invalid username")
-        
-        emp_id, name, role, stored_password = row
-        
-        # Check password - stored_password is already a string from DB, only encode submitted password
-        if not bcrypt.checkpw(credentials.password.encode('utf-8'), stored_password.encode('utf-8')):
-            print(f"Password verification failed for {credentials.username}")
-            raise HTTPException(status_code=401, detail="Invalid password")
-        
+
+        # bcrypt runs on its own worker pool, never on the event loop (see passwords.py)
+        stored_password = row[3] if row else None
+        if not await verify_password_async(credentials.password, stored_password):
+            raise HTTPException(status_code=401, detail="Invalid username or password")
+
+        emp_id, name, role, _ = row
+        if needs_rehash(stored_password):
+            new_hash = await hash_password_async(credentials.password)
+            async with engine.begin() as conn:
+                # Only replace the hash we verified, in case the password changed meanwhile
+                await conn.execute(text("""
+                    UPDATE employees SET password = :new
+                    WHERE employee_id = :eid AND password = :old
+                """), {"new": new_hash, "eid": emp_id, "old": stored_password})
+
+        token, expires_at = issue_token(emp_id, name, role)
         return LoginResponse(
             employee_id=emp_id,
             name=name,
             role=role,
-            message=f"Welcome {name}!"
+            message=f"Welcome {name}!",
+            access_token=token,
+            expires_at=expires_at
         )
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/products")
-async def get_products():
+@app.get("/api/auth/me")
+async def whoami(session: Session = AnyRole):
+    return {
+        "employee_id": session.employee_id,
+        "name": session.name,
+        "role": session.role,
+        "expires_at": session.expires_at
+    }
+
+@app.post("/api/auth/logout")
+async def logout(session: Session = AnyRole):
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT p.product_id, p.name, p.barcode, p.price, p.stock_quantity, 
-                       p.low_stock_threshold, c.name as category, s.name as supplier
-                FROM products p
-                LEFT JOIN categories c ON p.category_id = c.category_id
-                LEFT JOIN suppliers s ON p.supplier_id = s.supplier_id
-                ORDER BY p.product_id
-            """))
-            rows = result.fetchall()
-        
-        products = [
-            {
-                "product_id": r[0],
-                "name": r[1],
-                "barcode": r[2],
-                "price": float(r[3]) if r[3] else 0,
-                "stock_quantity": r[4],
-                "low_stock_threshold": r[5],
-                "category": r[6],
-                "supplier": r[7]
-            }
-            for r in rows
-        ]
-        return {"products": products}
+        async with engine.begin() as conn:
+            await conn.run_sync(revocations.revoke, session)
+        return {"message": "Logged out"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/products")
+@app.get("/api/products", dependencies=[AnyRole])
+async def get_products(request: Request, limit: int = PageLimit, cursor: Optional[str] = None,
+                       fmt: Optional[str] = StreamFormat):
+    try:
+        streaming = stream_format(request, fmt)
+        if streaming:
+            where, order_by, params = keyset_page([("p.product_id", int)], cursor, limit)
+            query = f"{CATALOG_QUERY} {where} ORDER BY {order_by}"
+            return stream_rows(request, analytics_engine, query, params, product_record,
+                               PRODUCT_FIELDS, streaming, "products")
+
+        # Pages are served from the in-memory catalog; cursors match the SQL keyset ones
+        after_id = decode_cursor(cursor, 1, (int,))[0] if cursor else None
+        cache = await fresh_catalog()
+        products, next_cursor = split_page(cache.page(after_id, limit + 1), limit,
+                                           lambda r: (r["product_id"],))
+        return {"products": products, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+async def lookup_barcodes(codes):
+    """Resolves barcodes from the catalog cache; misses fall back to the unique barcode index"""
+    cache = await fresh_catalog()
+    found = {}
+    for code in codes:
+        record = cache.get_by_barcode(code)
+        if record is not None:
+            found[code] = record
+    misses = [code for code in codes if code not in found]
+    if misses:
+        async with engine.connect() as conn:
+            for record in await conn.run_sync(cache.load_barcodes, misses):
+                found[record["barcode"]] = record
+    return found
+
+# Barcode scans at the till: answered from memory, so they stay fast at peak checkout load
+@app.get("/api/products/by-barcode/{code}", dependencies=[AnyRole])
+async def get_product_by_barcode(code: str):
+    try:
+        found = await lookup_barcodes([code])
+        if code not in found:
+            raise HTTPException(status_code=404, detail="Product not found")
+        return found[code]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/products/by-barcode", dependencies=[AnyRole])
+async def get_products_by_barcode(lookup: BarcodeLookup):
+    try:
+        codes = list(dict.fromkeys(lookup.barcodes))
+        found = await lookup_barcodes(codes)
+        return {
+            "products": [found[code] for code in codes if code in found],
+            "missing": [code for code in codes if code not in found],
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/products", dependencies=[AdminRole])
 async def add_product(product: Product):
     try:
-        with engine.begin() as conn:
-            result = conn.execute(text("""
+        async with engine.begin() as conn:
+            result = await conn.execute(text("""
                 INSERT INTO products (name, barcode, price, stock_quantity, category_id, supplier_id, low_stock_threshold)
                 VALUES (:name, :barcode, :price, :stock, :category_id, :supplier_id, :threshold)
                 RETURNING product_id
@@ -181,45 +357,106 @@ async def add_product(product: Product):
                 "threshold": product.low_stock_threshold
             })
             product_id = result.fetchone()[0]
+        catalog.invalidate([product_id])
         return {"message": "Product added successfully", "product_id": product_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/categories")
-async def get_categories():
+MAX_IMPORT_HEADER = 64 * 1024
+
+async def split_header(chunks):
+    """Reads a streamed body up to its first newline; returns (header line, async iterator of the rest)"""
+    header = b""
+    async for chunk in chunks:
+        header += chunk
+        if b"\n" in header:
+            break
+        if len(header) > MAX_IMPORT_HEADER:
+            raise CatalogImportError("The header row is too long")
+    header, _, rest = header.partition(b"\n")
+
+    async def remainder():
+        if rest:
+            yield rest
+        async for chunk in chunks:
+            yield chunk
+
+    return header, remainder()
+
+@app.post("/api/products/import", dependencies=[AdminRole])
+async def import_products(request: Request):
+    """
+    Adds or updates products from a CSV request body (text/csv, header row
+    first; columns in catalog_import.py). The body is streamed straight into
+    COPY, so files of any size load in a few statements. Invalid rows are
+    returned with their row numbers and the rest are imported.
+    """
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT category_id, name, description FROM categories ORDER BY name"))
-            rows = result.fetchall()
+        chunks = request.stream()
+        header, rows = await split_header(chunks)
+        columns = parse_header(header)
+        async with engine.begin() as conn:
+            await conn.run_sync(create_staging)
+            raw = await conn.get_raw_connection()
+            await raw.driver_connection.copy_to_table(STAGING_TABLE, source=rows, columns=columns, format="csv")
+            result = await conn.run_sync(apply_import, columns, MAX_REPORTED_REJECTS)
+        if result["inserted"] or result["updated"]:
+            catalog.invalidate()
+        return result
+    except CatalogImportError as e:
+        raise HTTPException(status_code=400, detail=e.message)
+    except Exception as e:
+        if is_data_error(e):
+            raise HTTPException(status_code=400, detail=f"Malformed CSV: {str(e).strip()}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/categories", dependencies=[AnyRole])
+async def get_categories(limit: int = PageLimit, cursor: Optional[str] = None):
+    try:
+        where, order_by, params = keyset_page([("name", str), ("category_id", int)], cursor, limit)
+        async with engine.connect() as conn:
+            result = await conn.execute(text(f"""
+                SELECT category_id, name, description FROM categories
+                {where} ORDER BY {order_by} LIMIT :limit
+            """), params)
+            rows, next_cursor = split_page(result.fetchall(), limit, lambda r: (r[1], r[0]))
         
         categories = [
             {"category_id": r[0], "name": r[1], "description": r[2]}
             for r in rows
         ]
-        return {"categories": categories}
+        return {"categories": categories, "next_cursor": next_cursor}
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/suppliers")
-async def get_suppliers():
+@app.get("/api/suppliers", dependencies=[AnyRole])
+async def get_suppliers(limit: int = PageLimit, cursor: Optional[str] = None):
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT supplier_id, name, phone, email, address, reliability_score FROM suppliers ORDER BY name"))
-            rows = result.fetchall()
+        where, order_by, params = keyset_page([("name", str), ("supplier_id", int)], cursor, limit)
+        async with engine.connect() as conn:
+            result = await conn.execute(text(f"""
+                SELECT supplier_id, name, phone, email, address, reliability_score FROM suppliers
+                {where} ORDER BY {order_by} LIMIT :limit
+            """), params)
+            rows, next_cursor = split_page(result.fetchall(), limit, lambda r: (r[1], r[0]))
         
         suppliers = [
             {"supplier_id": r[0], "name": r[1], "phone": r[2], "email": r[3], "address": r[4], "reliability_score": r[5]}
             for r in rows
         ]
-        return {"suppliers": suppliers}
+        return {"suppliers": suppliers, "next_cursor": next_cursor}
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/suppliers")
+@app.post("/api/suppliers", dependencies=[AdminRole])
 async def add_supplier(supplier: Supplier):
     try:
-        with engine.begin() as conn:
-            result = conn.execute(text("""
+        async with engine.begin() as conn:
+            result = await conn.execute(text("""
                 INSERT INTO suppliers (name, phone, email, address)
                 VALUES (:name, :phone, :email, :address)
                 RETURNING supplier_id
@@ -234,11 +471,11 @@ async def add_supplier(supplier: Supplier):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.put("/api/suppliers/{supplier_id}")
+@app.put("/api/suppliers/{supplier_id}", dependencies=[AdminRole])
 async def update_supplier(supplier_id: int, supplier: Supplier):
     try:
-        with engine.begin() as conn:
-            result = conn.execute(text("""
+        async with engine.begin() as conn:
+            result = await conn.execute(text("""
                 UPDATE suppliers 
                 SET name = :name, phone = :phone, email = :email, address = :address
                 WHERE supplier_id = :sid
@@ -252,30 +489,32 @@ async def update_supplier(supplier_id: int, supplier: Supplier):
             })
             if not result.fetchone():
                 raise HTTPException(status_code=404, detail="Supplier not found")
+        catalog.invalidate()
         return {"message": "Supplier updated successfully"}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.delete("/api/suppliers/{supplier_id}")
+@app.delete("/api/suppliers/{supplier_id}", dependencies=[AdminRole])
 async def delete_supplier(supplier_id: int):
     try:
-        with engine.begin() as conn:
-            result = conn.execute(text("DELETE FROM suppliers WHERE supplier_id = :sid RETURNING supplier_id"), {"sid": supplier_id})
+        async with engine.begin() as conn:
+            result = await conn.execute(text("DELETE FROM suppliers WHERE supplier_id = :sid RETURNING supplier_id"), {"sid": supplier_id})
             if not result.fetchone():
                 raise HTTPException(status_code=404, detail="Supplier not found")
+        catalog.invalidate()
         return {"message": "Supplier deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/categories")
+@app.post("/api/categories", dependencies=[AdminRole])
 async def add_category(category: Category):
     try:
-        with engine.begin() as conn:
-            result = conn.execute(text("""
+        async with engine.begin() as conn:
+            result = await conn.execute(text("""
                 INSERT INTO categories (name, description)
                 VALUES (:name, :description)
                 RETURNING category_id
@@ -288,11 +527,11 @@ async def add_category(category: Category):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.put("/api/categories/{category_id}")
+@app.put("/api/categories/{category_id}", dependencies=[AdminRole])
 async def update_category(category_id: int, category: Category):
     try:
-        with engine.begin() as conn:
-            result = conn.execute(text("""
+        async with engine.begin() as conn:
+            result = await conn.execute(text("""
                 UPDATE categories 
                 SET name = :name, description = :description
                 WHERE category_id = :cid
@@ -304,19 +543,21 @@ async def update_category(category_id: int, category: Category):
             })
             if not result.fetchone():
                 raise HTTPException(status_code=404, detail="Category not found")
+        catalog.invalidate()
         return {"message": "Category updated successfully"}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.delete("/api/categories/{category_id}")
+@app.delete("/api/categories/{category_id}", dependencies=[AdminRole])
 async def delete_category(category_id: int):
     try:
-        with engine.begin() as conn:
-            result = conn.execute(text("DELETE FROM categories WHERE category_id = :cid RETURNING category_id"), {"cid": category_id})
+        async with engine.begin() as conn:
+            result = await conn.execute(text("DELETE FROM categories WHERE category_id = :cid RETURNING category_id"), {"cid": category_id})
             if not result.fetchone():
                 raise HTTPException(status_code=404, detail="Category not found")
+        catalog.invalidate()
         return {"message": "Category deleted successfully"}
     except HTTPException:
         raise
@@ -324,116 +565,123 @@ async def delete_category(category_id: int):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/sales")
-async def create_sale(sale: Sale):
+async def create_sale(sale: Sale, session: Session = AnyRole):
     try:
-        total = 0.0
-        cart = []
-        
-        with engine.connect() as conn:
-            for item in sale.items:
-                result = conn.execute(text("""
-                    SELECT name, price, stock_quantity
-                    FROM products
-                    WHERE product_id = :pid
-                """), {"pid": item.product_id})
-                product_data = result.fetchone()
-                
-                if not product_data:
-                    raise HTTPException(status_code=404, detail=f"Product {item.product_id} not found")
-                
-                if product_data[2] < item.quantity:
-                    raise HTTPException(status_code=400, detail=f"Only {product_data[2]} units in stock for {product_data[0]}")
-                
-                item_total = float(product_data[1]) * item.quantity
-                cart.append({
-                    'product_id': item.product_id,
-                    'quantity': item.quantity,
-                    'price': float(product_data[1]),
-                    'subtotal': item_total
-                })
-                total += item_total
-        
-        with engine.begin() as conn:
-            if sale.customer_id:
-                res = conn.execute(text("SELECT 1 FROM customers WHERE customer_id = :cid"), {"cid": sale.customer_id})
-                if res.fetchone() is None:
-                    raise HTTPException(status_code=404, detail="Customer not found")
-            
-            result = conn.execute(text("""
-                INSERT INTO sales (total_amount, payment_method, customer_id, employee_id)
-                VALUES (:total, :pm, :cid, :eid)
-                RETURNING sale_id
-            """), {
-                "total": round(total, 2),
-                "pm": sale.payment_method,
-                "cid": sale.customer_id,
-                "eid": sale.employee_id
-            })
-            sale_id = result.fetchone()[0]
-            
-            for item in cart:
-                conn.execute(text("""
-                    INSERT INTO sale_items (sale_id, product_id, quantity, unit_price)
-                    VALUES (:sale_id, :pid, :qty, :price)
-                """), {
-                    "sale_id": sale_id,
-                    "pid": item['product_id'],
-                    "qty": item['quantity'],
-                    "price": item['price']
-                })
-                
-                conn.execute(text("""
-                    UPDATE products 
-                    SET stock_quantity = stock_quantity - :qty
-                    WHERE product_id = :pid
-                """), {"qty": item['quantity'], "pid": item['product_id']})
+        async with engine.begin() as conn:
+            receipt = await conn.run_sync(
+                complete_sale,
+                [(item.product_id, item.quantity) for item in sale.items],
+                sale.payment_method,
+                session.employee_id,
+                sale.customer_id,
+            )
         
-        return {"message": "Sale completed successfully", "sale_id": sale_id, "total": total}
-    except HTTPException:
-        raise
+        catalog.apply_stock(receipt["stock_levels"])
+        metrics.record_sales("pos", 1, len(receipt["lines"]), receipt["total"])
+        return {"message": "Sale completed successfully", "sale_id": receipt["sale_id"], "total": float(receipt["total"])}
+    except CheckoutError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/sales")
-async def get_sales(limit: int = 50):
+@app.post("/api/sales/batch")
+async def create_sales_batch(batch: SaleBatch, session: Session = AnyRole):
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT s.sale_id, s.sale_time, s.total_amount, s.payment_method, 
-                       c.name as customer, e.name as employee
-                FROM sales s
-                LEFT JOIN customers c ON s.customer_id = c.customer_id
-                LEFT JOIN employees e ON s.employee_id = e.employee_id
-                ORDER BY s.sale_time DESC
-                LIMIT :limit
-            """), {"limit": limit})
-            rows = result.fetchall()
-        
+        if session.role == "CASHIER" and any(
+                sale.employee_id not in (None, session.employee_id) for sale in batch.sales):
+            raise HTTPException(status_code=403, detail="Cashiers can only upload their own sales")
         sales = [
             {
-                "sale_id": r[0],
-                "sale_time": str(r[1]),
-                "total_amount": float(r[2]),
-                "payment_method": r[3],
-                "customer": r[4],
-                "employee": r[5]
+                "client_sale_id": sale.client_sale_id,
+                "items": [(item.product_id, item.quantity, item.unit_price) for item in sale.items],
+                "payment_method": sale.payment_method,
+                "customer_id": sale.customer_id,
+                "employee_id": sale.employee_id or session.employee_id,
+                "sale_time": sale.sale_time,
             }
-            for r in rows
+            for sale in batch.sales
         ]
-        return {"sales": sales}
+        async with engine.begin() as conn:
+            results = await conn.run_sync(complete_sales_batch, sales)
+        catalog.invalidate({pid for sale in sales for pid, _, _ in sale["items"]})
+        
+        counts = {"created": 0, "duplicate": 0, "rejected": 0}
+        for r in results:
+            counts[r["status"]] += 1
+        created = [(sale, r) for sale, r in zip(sales, results) if r["status"] == "created"]
+        metrics.record_sales("batch", len(created), sum(len(sale["items"]) for sale, _ in created),
+                             sum(r["total"] for _, r in created))
+        return {
+            "results": results,
+            "created": counts["created"],
+            "duplicates": counts["duplicate"],
+            "rejected": counts["rejected"],
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+SALE_FIELDS = ["sale_id", "sale_time", "total_amount", "payment_method", "customer", "employee"]
+
+def sale_record(r):
+    return {
+        "sale_id": r[0],
+        "sale_time": str(r[1]),
+        "total_amount": float(r[2]),
+        "payment_method": r[3],
+        "customer": r[4],
+        "employee": r[5]
+    }
+
+@app.get("/api/sales", dependencies=[AnyRole])
+async def get_sales(request: Request, limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+                    cursor: Optional[str] = None, fmt: Optional[str] = StreamFormat):
+    try:
+        where, order_by, params = keyset_page([("s.sale_time", datetime.datetime), ("s.sale_id", int)],
+                                              cursor, limit, descending=True, nullable_lead=True)
+        query = f"""
+            SELECT s.sale_id, s.sale_time, s.total_amount, s.payment_method, 
+                   c.name as customer, e.name as employee
+            FROM sales s
+            LEFT JOIN customers c ON s.customer_id = c.customer_id
+            LEFT JOIN employees e ON s.employee_id = e.employee_id
+            {where}
+            ORDER BY {order_by}
+        """
+        streaming = stream_format(request, fmt)
+        if streaming:
+            return stream_rows(request, analytics_engine, query, params, sale_record,
+                               SALE_FIELDS, streaming, "sales")
+
+        async with engine.connect() as conn:
+            result = await conn.execute(text(query + " LIMIT :limit"), params)
+            rows, next_cursor = split_page(result.fetchall(), limit, lambda r: (r[1], r[0]))
+        
+        sales = [sale_record(r) for r in rows]
+        return {"sales": sales, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/sales/{sale_id}")
+@app.get("/api/sales/{sale_id}", dependencies=[AnyRole])
 async def get_sale_details(sale_id: int):
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("""
+        async with engine.connect() as conn:
+            # sale_items is partitioned by sale_time: with it, only one partition is read
+            sale_time = (await conn.execute(text("SELECT sale_time FROM sales WHERE sale_id = :sid"),
+                                            {"sid": sale_id})).scalar()
+            if sale_time is None:
+                return {"items": []}
+            result = await conn.execute(text("""
                 SELECT si.product_id, p.name, si.quantity, si.unit_price, si.subtotal
                 FROM sale_items si
                 JOIN products p ON si.product_id = p.product_id
-                WHERE si.sale_id = :sid
-            """), {"sid": sale_id})
+                WHERE si.sale_id = :sid AND si.sale_time = :sale_time
+            """), {"sid": sale_id, "sale_time": sale_time})
             rows = result.fetchall()
         
         items = [
@@ -450,26 +698,40 @@ async def get_sale_details(sale_id: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/customers")
-async def get_customers():
+CUSTOMER_FIELDS = ["customer_id", "name", "phone", "email"]
+
+def customer_record(r):
+    return {"customer_id": r[0], "name": r[1], "phone": r[2], "email": r[3]}
+
+@app.get("/api/customers", dependencies=[AnyRole])
+async def get_customers(request: Request, limit: int = PageLimit, cursor: Optional[str] = None,
+                        fmt: Optional[str] = StreamFormat):
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT customer_id, name, phone, email FROM customers ORDER BY name"))
-            rows = result.fetchall()
+        where, order_by, params = keyset_page([("name", str), ("customer_id", int)], cursor, limit)
+        query = f"SELECT customer_id, name, phone, email FROM customers {where} ORDER BY {order_by}"
+        streaming = stream_format(request, fmt)
+        if streaming:
+            return stream_rows(request, analytics_engine, query, params, customer_record,
+                               CUSTOMER_FIELDS, streaming, "customers")
+
+        async with engine.connect() as conn:
+            result = await conn.execute(text(query + " LIMIT :limit"), params)
+            rows, next_cursor = split_page(result.fetchall(), limit, lambda r: (r[1], r[0]))
         
-        customers = [
-            {"customer_id": r[0], "name": r[1], "phone": r[2], "email": r[3]}
-            for r in rows
-        ]
-        return {"customers": customers}
+        customers = [customer_record(r) for r in rows]
+        return {"customers": customers, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/customers")
+@app.post("/api/customers", dependencies=[AnyRole])
 async def add_customer(customer: Customer):
     try:
-        with engine.begin() as conn:
-            result = conn.execute(text("""
+        async with engine.begin() as conn:
+            result = await conn.execute(text("""
                 INSERT INTO customers (name, phone, email)
                 VALUES (:name, :phone, :email)
                 RETURNING customer_id
@@ -483,27 +745,33 @@ async def add_customer(customer: Customer):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/employees")
-async def get_employees():
+@app.get("/api/employees", dependencies=[AdminRole])
+async def get_employees(limit: int = PageLimit, cursor: Optional[str] = None):
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT employee_id, name, role, username FROM employees ORDER BY name"))
-            rows = result.fetchall()
+        where, order_by, params = keyset_page([("name", str), ("employee_id", int)], cursor, limit)
+        async with engine.connect() as conn:
+            result = await conn.execute(text(f"""
+                SELECT employee_id, name, role, username FROM employees
+                {where} ORDER BY {order_by} LIMIT :limit
+            """), params)
+            rows, next_cursor = split_page(result.fetchall(), limit, lambda r: (r[1], r[0]))
         
         employees = [
             {"employee_id": r[0], "name": r[1], "role": r[2], "username": r[3]}
             for r in rows
         ]
-        return {"employees": employees}
+        return {"employees": employees, "next_cursor": next_cursor}
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/employees")
+@app.post("/api/employees", dependencies=[AdminRole])
 async def add_employee(employee: Employee):
     try:
-        hashed_password = bcrypt.hashpw(employee.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-        with engine.begin() as conn:
-            result = conn.execute(text("""
+        hashed_password = await hash_password_async(employee.password)
+        async with engine.begin() as conn:
+            result = await conn.execute(text("""
                 INSERT INTO employees (name, role, username, password)
                 VALUES (:name, :role, :username, :password)
                 RETURNING employee_id
@@ -518,68 +786,75 @@ async def add_employee(employee: Employee):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.put("/api/products/{product_id}/stock")
+@app.put("/api/products/{product_id}/stock", dependencies=[ManagerRole])
 async def update_stock(product_id: int, stock_update: StockUpdate):
     try:
-        with engine.begin() as conn:
-            result = conn.execute(text("""
-                UPDATE products 
-                SET stock_quantity = stock_quantity + :qty
-                WHERE product_id = :pid
-                RETURNING name, stock_quantity
-            """), {"qty": stock_update.quantity, "pid": product_id})
-            
-            updated = result.fetchone()
-            if not updated:
+        async with engine.begin() as conn:
+            result = await conn.execute(text("SELECT name FROM products WHERE product_id = :pid"),
+                                        {"pid": product_id})
+            product = result.fetchone()
+            if not product:
                 raise HTTPException(status_code=404, detail="Product not found")
+
+            await conn.run_sync(record_movements, "RESTOCK", [product_id], [stock_update.quantity])
+            stock = await conn.run_sync(locked_stock, [product_id])
+            updated = (product[0], stock[product_id])
         
+        catalog.apply_stock({product_id: updated[1]})
         return {"message": f"Stock updated for {updated[0]}", "new_stock": updated[1]}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/dashboard/stats")
+@app.post("/api/stock/adjustments", dependencies=[ManagerRole])
+async def adjust_stock(batch: StockAdjustmentBatch):
+    """Applies any number of absolute or relative stock adjustments in one statement (see stock_adjustments.py)"""
+    try:
+        async with engine.begin() as conn:
+            result = await conn.run_sync(
+                apply_adjustments, [(a.product_id, a.quantity, a.mode) for a in batch.adjustments], batch.kind)
+        catalog.apply_stock({r["product_id"]: r["stock_quantity"]
+                             for r in result["results"] if r["status"] == "updated"})
+        return result
+    except StockAdjustmentError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/dashboard/stats", dependencies=[AnyRole])
 async def get_dashboard_stats():
     try:
-        with engine.connect() as conn:
-            total_products = conn.execute(text("SELECT COUNT(*) FROM products")).scalar()
-            total_sales = conn.execute(text("SELECT COUNT(*) FROM sales")).scalar()
-            total_revenue = conn.execute(text("SELECT COALESCE(SUM(total_amount), 0) FROM sales")).scalar()
-            low_stock_count = conn.execute(text("""
-                SELECT COUNT(*) FROM products 
-                WHERE stock_quantity <= low_stock_threshold
-            """)).scalar()
-            
-            recent_sales = conn.execute(text("""
-                SELECT COALESCE(SUM(total_amount), 0) 
-                FROM sales 
-                WHERE DATE(sale_time) = CURRENT_DATE
-            """)).scalar()
+        # Trigger-maintained counters (see dashboard_counters.py): constant cost whatever the history size
+        async with engine.connect() as conn:
+            counters = await conn.run_sync(read_counters)
         
         return {
-            "total_products": total_products,
-            "total_sales": total_sales,
-            "total_revenue": float(total_revenue),
-            "low_stock_count": low_stock_count,
-            "today_sales": float(recent_sales)
+            "total_products": counters["total_products"],
+            "total_sales": counters["total_sales"],
+            "total_revenue": float(counters["total_revenue"]),
+            "low_stock_count": counters["low_stock_count"],
+            "today_sales": float(counters["today_revenue"])
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/notifications")
-async def get_notifications():
+@app.get("/api/notifications", dependencies=[AnyRole])
+async def get_notifications(limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("""
+        where, order_by, params = keyset_page([("n.created_at", datetime.datetime), ("n.notification_id", int)],
+                                              cursor, limit, descending=True, nullable_lead=True)
+        async with engine.connect() as conn:
+            result = await conn.execute(text(f"""
                 SELECT n.notification_id, n.message, n.status, n.notification_type, 
                        n.created_at, p.name as product_name
                 FROM notifications n
                 LEFT JOIN products p ON n.product_id = p.product_id
-                ORDER BY n.created_at DESC
-                LIMIT 50
-            """))
-            rows = result.fetchall()
+                {where}
+                ORDER BY {order_by}
+                LIMIT :limit
+            """), params)
+            rows, next_cursor = split_page(result.fetchall(), limit, lambda r: (r[4], r[0]))
         
         notifications = [
             {
@@ -592,17 +867,19 @@ async def get_notifications():
             }
             for r in rows
         ]
-        return {"notifications": notifications}
+        return {"notifications": notifications, "next_cursor": next_cursor}
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.put("/api/notifications/{notification_id}")
+@app.put("/api/notifications/{notification_id}", dependencies=[AnyRole])
 async def update_notification(notification_id: int, notification: NotificationUpdate):
     try:
-        with engine.begin() as conn:
-            result = conn.execute(text("""
+        async with engine.begin() as conn:
+            result = await conn.execute(text("""
                 UPDATE notifications 
-                SET status = :status, read_at = CASE WHEN :status = 'read' THEN NOW() ELSE read_at END
+                SET status = :status, read_at = CASE WHEN CAST(:status AS VARCHAR) = 'read' THEN NOW() ELSE read_at END
                 WHERE notification_id = :nid
                 RETURNING notification_id
             """), {
@@ -617,18 +894,21 @@ async def update_notification(notification_id: int, notification: NotificationUp
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/purchase-orders")
-async def get_purchase_orders():
+@app.get("/api/purchase-orders", dependencies=[ManagerRole])
+async def get_purchase_orders(limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE), cursor: Optional[str] = None):
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("""
+        where, order_by, params = keyset_page([("po.order_date", datetime.date), ("po.order_id", int)],
+                                              cursor, limit, descending=True, nullable_lead=True)
+        async with engine.connect() as conn:
+            result = await conn.execute(text(f"""
                 SELECT po.order_id, po.order_date, po.status, s.name as supplier_name
                 FROM purchase_orders po
                 JOIN suppliers s ON po.supplier_id = s.supplier_id
-                ORDER BY po.order_date DESC
-                LIMIT 50
-            """))
-            rows = result.fetchall()
+                {where}
+                ORDER BY {order_by}
+                LIMIT :limit
+            """), params)
+            rows, next_cursor = split_page(result.fetchall(), limit, lambda r: (r[1], r[0]))
         
         orders = [
             {
@@ -639,15 +919,17 @@ async def get_purchase_orders():
             }
             for r in rows
         ]
-        return {"purchase_orders": orders}
+        return {"purchase_orders": orders, "next_cursor": next_cursor}
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/purchase-orders")
+@app.post("/api/purchase-orders", dependencies=[ManagerRole])
 async def create_purchase_order(order: PurchaseOrder):
     try:
-        with engine.begin() as conn:
-            result = conn.execute(text("""
+        async with engine.begin() as conn:
+            result = await conn.execute(text("""
                 INSERT INTO purchase_orders (supplier_id, status)
                 VALUES (:supplier_id, :status)
                 RETURNING order_id
@@ -658,7 +940,7 @@ async def create_purchase_order(order: PurchaseOrder):
             order_id = result.fetchone()[0]
             
             for item in order.items:
-                conn.execute(text("""
+                await conn.execute(text("""
                     INSERT INTO purchase_order_items (order_id, product_id, quantity, unit_price)
                     VALUES (:order_id, :product_id, :quantity, :unit_price)
                 """), {
@@ -672,12 +954,12 @@ async def create_purchase_order(order: PurchaseOrder):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/purchase-orders/{order_id}")
+@app.get("/api/purchase-orders/{order_id}", dependencies=[ManagerRole])
 async def get_purchase_order_details(order_id: int):
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT poi.product_id, p.name, poi.quantity, poi.unit_price
+        async with engine.connect() as conn:
+            result = await conn.execute(text("""
+                SELECT poi.product_id, p.name, poi.quantity, poi.unit_price, poi.received_quantity
                 FROM purchase_order_items poi
                 JOIN products p ON poi.product_id = p.product_id
                 WHERE poi.order_id = :oid
@@ -689,7 +971,8 @@ async def get_purchase_order_details(order_id: int):
                 "product_id": r[0],
                 "product_name": r[1],
                 "quantity": r[2],
-                "unit_price": float(r[3])
+                "unit_price": float(r[3]),
+                "received": r[4]
             }
             for r in rows
         ]
@@ -697,71 +980,58 @@ async def get_purchase_order_details(order_id: int):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.put("/api/purchase-orders/{order_id}/receive")
-async def receive_purchase_order(order_id: int):
+@app.put("/api/purchase-orders/{order_id}/receive", dependencies=[ManagerRole])
+async def receive_purchase_order(order_id: int, receipt: Optional[Receipt] = None):
+    """
+    Receives the whole order, or with a body the quantities received so far
+    per product (partial deliveries). Idempotent: a retried receipt adds no
+    stock. See purchase_receiving.py.
+    """
     try:
-        with engine.begin() as conn:
-            result = conn.execute(text("""
-                SELECT poi.product_id, poi.quantity
-                FROM purchase_order_items poi
-                WHERE poi.order_id = :oid
-            """), {"oid": order_id})
-            items = result.fetchall()
-            
-            if not items:
-                raise HTTPException(status_code=404, detail="Purchase order not found")
-            
-            for product_id, quantity in items:
-                conn.execute(text("""
-                    UPDATE products 
-                    SET stock_quantity = stock_quantity + :qty
-                    WHERE product_id = :pid
-                """), {"qty": quantity, "pid": product_id})
-            
-            conn.execute(text("""
-                UPDATE purchase_orders 
-                SET status = 'RECEIVED'
-                WHERE order_id = :oid
-            """), {"oid": order_id})
-        
-        return {"message": "Purchase order received and stock updated"}
-    except HTTPException:
-        raise
+        received = [(line.product_id, line.received) for line in receipt.lines] if receipt else None
+        async with engine.begin() as conn:
+            result = await conn.run_sync(receive_order, order_id, received)
+        catalog.apply_stock(result.pop("stock_levels"))
+        return result
+    except ReceivingError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/reports/sales-by-date")
+@app.get("/api/reports/sales-by-date", dependencies=[AnyRole])
 async def get_sales_by_date(days: int = 7):
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT DATE(sale_time) as sale_date, COUNT(*) as count, SUM(total_amount) as total
-                FROM sales
-                WHERE sale_time >= CURRENT_DATE - CAST(:days || ' days' AS INTERVAL)
-                GROUP BY DATE(sale_time)
+        # Answered from the daily rollup (see sales_rollups.py)
+        async with analytics_engine.connect() as conn:
+            result = await conn.execute(text("""
+                SELECT sale_date, SUM(sale_count) as count, SUM(revenue) as total
+                FROM sales_rollup_daily
+                WHERE sale_date >= CURRENT_DATE - CAST(:days AS INTEGER)
+                GROUP BY sale_date
+                HAVING SUM(sale_count) > 0
                 ORDER BY sale_date ASC
             """), {"days": days})
             rows = result.fetchall()
         
         data = [
-            {"date": str(r[0]), "count": r[1], "total": float(r[2]) if r[2] else 0}
+            {"date": str(r[0]), "count": int(r[1]), "total": float(r[2]) if r[2] else 0}
             for r in rows
         ]
         return {"sales_by_date": data}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/reports/category-sales")
+@app.get("/api/reports/category-sales", dependencies=[AnyRole])
 async def get_category_sales():
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("""
+        async with analytics_engine.connect() as conn:
+            result = await conn.execute(text("""
                 SELECT c.name, SUM(si.subtotal) as total_sales
                 FROM categories c
                 LEFT JOIN products p ON c.category_id = p.category_id
                 LEFT JOIN sale_items si ON p.product_id = si.product_id
                 GROUP BY c.category_id, c.name
-                HAVING total_sales > 0
+                HAVING SUM(si.subtotal) > 0
                 ORDER BY total_sales DESC
             """))
             rows = result.fetchall()
@@ -774,11 +1044,11 @@ async def get_category_sales():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/reports/top-products")
+@app.get("/api/reports/top-products", dependencies=[AnyRole])
 async def get_top_products(limit: int = 5):
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("""
+        async with analytics_engine.connect() as conn:
+            result = await conn.execute(text("""
                 SELECT p.name, SUM(si.quantity) as total_quantity, SUM(si.subtotal) as total_revenue
                 FROM products p
                 JOIN sale_items si ON p.product_id = si.product_id
@@ -800,6 +1070,16 @@ async def get_top_products(limit: int = 5):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/system/pools", dependencies=[AdminRole])
+async def get_pool_stats():
+    return {"pools": pool_stats()}
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    # Prometheus scrape target; restrict access at the network level. The header is set as is:
+    # media_type would get a second charset appended.
+    return Response(metrics.render(), headers={"Content-Type": metrics.CONTENT_TYPE})
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="127.0.0.1", port=8000)
@@ -0,0 +1,400 @@
+-- Schema additions on top of schema_1761298988728.sql (formerly upgrades.sql).
+-- Every statement is idempotent, so databases that applied upgrades.sql by
+-- hand re-run it harmlessly. Applied by migrate.py in one transaction.
+
+-- Offline POS terminals tag every sale with a client-generated id so a
+-- replayed batch (POST /api/sales/batch) never records the same sale twice.
+ALTER TABLE IF EXISTS public.sales
+    ADD COLUMN IF NOT EXISTS client_sale_id character varying(64) COLLATE pg_catalog."default";
+
+CREATE UNIQUE INDEX IF NOT EXISTS sales_client_sale_id_key
+    ON public.sales (client_sale_id);
+
+-- Keyset pagination: one index per list endpoint sort key, so every page is
+-- an index range scan (products page on their primary key).
+CREATE INDEX IF NOT EXISTS categories_name_id_idx ON public.categories (name, category_id);
+CREATE INDEX IF NOT EXISTS suppliers_name_id_idx ON public.suppliers (name, supplier_id);
+CREATE INDEX IF NOT EXISTS customers_name_id_idx ON public.customers (name, customer_id);
+CREATE INDEX IF NOT EXISTS employees_name_id_idx ON public.employees (name, employee_id);
+CREATE INDEX IF NOT EXISTS sales_sale_time_id_idx
+    ON public.sales (sale_time DESC NULLS LAST, sale_id DESC);
+CREATE INDEX IF NOT EXISTS notifications_created_at_id_idx
+    ON public.notifications (created_at DESC NULLS LAST, notification_id DESC);
+CREATE INDEX IF NOT EXISTS purchase_orders_order_date_id_idx
+    ON public.purchase_orders (order_date DESC NULLS LAST, order_id DESC);
+
+-- Dashboard counters, maintained by statement-level triggers in the same
+-- transaction as every sale / product write, so GET /api/dashboard/stats reads
+-- a handful of rows instead of aggregating whole tables.
+--   counter_period: 'all' or a sale day 'YYYY-MM-DD'
+--   shard: pg_backend_pid() % 16, so concurrent checkouts update different rows
+-- A counter's value is the SUM over its shards. dashboard_counters.py
+-- reconciles drift against the base tables and folds shards together.
+CREATE TABLE IF NOT EXISTS public.dashboard_counters
+(
+    counter_name character varying(50) COLLATE pg_catalog."default" NOT NULL,
+    counter_period character varying(10) COLLATE pg_catalog."default" NOT NULL DEFAULT 'all',
+    shard smallint NOT NULL DEFAULT 0,
+    value numeric(18,2) NOT NULL DEFAULT 0,
+    CONSTRAINT dashboard_counters_pkey PRIMARY KEY (counter_name, counter_period, shard)
+);
+
+CREATE OR REPLACE FUNCTION public.dashboard_counters_sales() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    new_times timestamp[];
+    new_totals numeric[];
+    old_times timestamp[];
+    old_totals numeric[];
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        SELECT array_agg(sale_time), array_agg(total_amount) INTO new_times, new_totals FROM new_rows;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        SELECT array_agg(sale_time), array_agg(total_amount) INTO old_times, old_totals FROM old_rows;
+    END IF;
+
+    INSERT INTO public.dashboard_counters (counter_name, counter_period, shard, value)
+    SELECT c.counter_name, c.counter_period, pg_backend_pid() % 16, SUM(c.delta)
+    FROM (
+        SELECT 1 AS sign, t AS sale_time, COALESCE(a, 0) AS total FROM unnest(new_times, new_totals) AS n(t, a)
+        UNION ALL
+        SELECT -1, t, COALESCE(a, 0) FROM unnest(old_times, old_totals) AS o(t, a)
+    ) s
+    CROSS JOIN LATERAL (VALUES
+        ('sales_count', 'all', s.sign::numeric),
+        ('sales_revenue', 'all', s.sign * s.total),
+        ('sales_count', to_char(s.sale_time, 'YYYY-MM-DD'), s.sign::numeric),
+        ('sales_revenue', to_char(s.sale_time, 'YYYY-MM-DD'), s.sign * s.total)
+    ) AS c(counter_name, counter_period, delta)
+    WHERE c.counter_period IS NOT NULL
+    GROUP BY c.counter_name, c.counter_period
+    HAVING SUM(c.delta) <> 0
+    ON CONFLICT (counter_name, counter_period, shard)
+    DO UPDATE SET value = dashboard_counters.value + EXCLUDED.value;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.dashboard_counters_products() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    new_stock integer[];
+    new_thresholds integer[];
+    old_stock integer[];
+    old_thresholds integer[];
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        SELECT array_agg(stock_quantity), array_agg(low_stock_threshold) INTO new_stock, new_thresholds FROM new_rows;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        SELECT array_agg(stock_quantity), array_agg(low_stock_threshold) INTO old_stock, old_thresholds FROM old_rows;
+    END IF;
+
+    INSERT INTO public.dashboard_counters (counter_name, counter_period, shard, value)
+    SELECT c.counter_name, 'all', pg_backend_pid() % 16, SUM(c.delta)
+    FROM (
+        SELECT 1 AS sign, q, t FROM unnest(new_stock, new_thresholds) AS n(q, t)
+        UNION ALL
+        SELECT -1, q, t FROM unnest(old_stock, old_thresholds) AS o(q, t)
+    ) p
+    CROSS JOIN LATERAL (VALUES
+        ('products', p.sign::numeric),
+        ('low_stock', CASE WHEN p.q <= p.t THEN p.sign ELSE 0 END::numeric),
+        ('inventory_units', (p.sign * COALESCE(p.q, 0))::numeric)
+    ) AS c(counter_name, delta)
+    GROUP BY c.counter_name
+    HAVING SUM(c.delta) <> 0
+    ON CONFLICT (counter_name, counter_period, shard)
+    DO UPDATE SET value = dashboard_counters.value + EXCLUDED.value;
+    RETURN NULL;
+END;
+$$;
+
+-- Transition tables need one trigger per event
+DROP TRIGGER IF EXISTS dashboard_counters_sales_ins ON public.sales;
+CREATE TRIGGER dashboard_counters_sales_ins AFTER INSERT ON public.sales
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.dashboard_counters_sales();
+DROP TRIGGER IF EXISTS dashboard_counters_sales_upd ON public.sales;
+CREATE TRIGGER dashboard_counters_sales_upd AFTER UPDATE ON public.sales
+    REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.dashboard_counters_sales();
+DROP TRIGGER IF EXISTS dashboard_counters_sales_del ON public.sales;
+CREATE TRIGGER dashboard_counters_sales_del AFTER DELETE ON public.sales
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.dashboard_counters_sales();
+
+DROP TRIGGER IF EXISTS dashboard_counters_products_ins ON public.products;
+CREATE TRIGGER dashboard_counters_products_ins AFTER INSERT ON public.products
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.dashboard_counters_products();
+DROP TRIGGER IF EXISTS dashboard_counters_products_upd ON public.products;
+CREATE TRIGGER dashboard_counters_products_upd AFTER UPDATE ON public.products
+    REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.dashboard_counters_products();
+DROP TRIGGER IF EXISTS dashboard_counters_products_del ON public.products;
+CREATE TRIGGER dashboard_counters_products_del AFTER DELETE ON public.products
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.dashboard_counters_products();
+
+-- Seed the counters once; the triggers above hold table locks until COMMIT,
+-- so no write can slip between this snapshot and the triggers going live.
+INSERT INTO public.dashboard_counters (counter_name, counter_period, shard, value)
+SELECT v.counter_name, v.counter_period, 0, v.value
+FROM (
+    SELECT 'products' AS counter_name, 'all' AS counter_period, COUNT(*)::numeric AS value FROM public.products
+    UNION ALL
+    SELECT 'low_stock', 'all', COUNT(*) FILTER (WHERE stock_quantity <= low_stock_threshold) FROM public.products
+    UNION ALL
+    SELECT 'inventory_units', 'all', COALESCE(SUM(stock_quantity), 0) FROM public.products
+    UNION ALL
+    SELECT 'sales_count', 'all', COUNT(*) FROM public.sales
+    UNION ALL
+    SELECT 'sales_revenue', 'all', COALESCE(SUM(total_amount), 0) FROM public.sales
+    UNION ALL
+    SELECT 'sales_count', to_char(sale_time, 'YYYY-MM-DD'), COUNT(*)
+    FROM public.sales WHERE sale_time IS NOT NULL GROUP BY 2
+    UNION ALL
+    SELECT 'sales_revenue', to_char(sale_time, 'YYYY-MM-DD'), COALESCE(SUM(total_amount), 0)
+    FROM public.sales WHERE sale_time IS NOT NULL GROUP BY 2
+) v
+WHERE NOT EXISTS (SELECT 1 FROM public.dashboard_counters);
+
+-- Sales rollups: sale count and revenue per hour / per day, split by payment
+-- method and employee (employee_id 0 = none). Maintained by statement-level
+-- triggers as sales commit; time-series reports read these instead of sales.
+-- Average ticket = revenue / sale_count. sales_rollups.py backfills history.
+CREATE TABLE IF NOT EXISTS public.sales_rollup_hourly
+(
+    bucket timestamp without time zone NOT NULL,
+    payment_method character varying(50) COLLATE pg_catalog."default" NOT NULL,
+    employee_id integer NOT NULL DEFAULT 0,
+    sale_count bigint NOT NULL DEFAULT 0,
+    revenue numeric(18,2) NOT NULL DEFAULT 0,
+    CONSTRAINT sales_rollup_hourly_pkey PRIMARY KEY (bucket, payment_method, employee_id)
+);
+
+CREATE TABLE IF NOT EXISTS public.sales_rollup_daily
+(
+    sale_date date NOT NULL,
+    payment_method character varying(50) COLLATE pg_catalog."default" NOT NULL,
+    employee_id integer NOT NULL DEFAULT 0,
+    sale_count bigint NOT NULL DEFAULT 0,
+    revenue numeric(18,2) NOT NULL DEFAULT 0,
+    CONSTRAINT sales_rollup_daily_pkey PRIMARY KEY (sale_date, payment_method, employee_id)
+);
+
+CREATE OR REPLACE FUNCTION public.sales_rollups_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    new_times timestamp[];
+    new_totals numeric[];
+    new_methods text[];
+    new_employees integer[];
+    old_times timestamp[];
+    old_totals numeric[];
+    old_methods text[];
+    old_employees integer[];
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        SELECT array_agg(sale_time), array_agg(total_amount), array_agg(payment_method), array_agg(employee_id)
+        INTO new_times, new_totals, new_methods, new_employees FROM new_rows;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        SELECT array_agg(sale_time), array_agg(total_amount), array_agg(payment_method), array_agg(employee_id)
+        INTO old_times, old_totals, old_methods, old_employees FROM old_rows;
+    END IF;
+
+    WITH changes AS (
+        SELECT 1 AS sign, t AS sale_time, COALESCE(a, 0) AS total, m AS payment_method, COALESCE(e, 0) AS employee_id
+        FROM unnest(new_times, new_totals, new_methods, new_employees) AS n(t, a, m, e)
+        WHERE t IS NOT NULL
+        UNION ALL
+        SELECT -1, t, COALESCE(a, 0), m, COALESCE(e, 0)
+        FROM unnest(old_times, old_totals, old_methods, old_employees) AS o(t, a, m, e)
+        WHERE t IS NOT NULL
+    ), hourly AS (
+        INSERT INTO public.sales_rollup_hourly (bucket, payment_method, employee_id, sale_count, revenue)
+        SELECT date_trunc('hour', sale_time), payment_method, employee_id, SUM(sign), SUM(sign * total)
+        FROM changes
+        GROUP BY 1, 2, 3
+        HAVING SUM(sign) <> 0 OR SUM(sign * total) <> 0
+        ON CONFLICT (bucket, payment_method, employee_id) DO UPDATE
+        SET sale_count = sales_rollup_hourly.sale_count + EXCLUDED.sale_count,
+            revenue = sales_rollup_hourly.revenue + EXCLUDED.revenue
+    )
+    INSERT INTO public.sales_rollup_daily (sale_date, payment_method, employee_id, sale_count, revenue)
+    SELECT sale_time::date, payment_method, employee_id, SUM(sign), SUM(sign * total)
+    FROM changes
+    GROUP BY 1, 2, 3
+    HAVING SUM(sign) <> 0 OR SUM(sign * total) <> 0
+    ON CONFLICT (sale_date, payment_method, employee_id) DO UPDATE
+    SET sale_count = sales_rollup_daily.sale_count + EXCLUDED.sale_count,
+        revenue = sales_rollup_daily.revenue + EXCLUDED.revenue;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS sales_rollups_ins ON public.sales;
+CREATE TRIGGER sales_rollups_ins AFTER INSERT ON public.sales
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.sales_rollups_apply();
+DROP TRIGGER IF EXISTS sales_rollups_upd ON public.sales;
+CREATE TRIGGER sales_rollups_upd AFTER UPDATE ON public.sales
+    REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.sales_rollups_apply();
+DROP TRIGGER IF EXISTS sales_rollups_del ON public.sales;
+CREATE TRIGGER sales_rollups_del AFTER DELETE ON public.sales
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.sales_rollups_apply();
+
+-- First install only; for large histories prefer `python sales_rollups.py`
+INSERT INTO public.sales_rollup_hourly (bucket, payment_method, employee_id, sale_count, revenue)
+SELECT date_trunc('hour', sale_time), payment_method, COALESCE(employee_id, 0), COUNT(*), SUM(total_amount)
+FROM public.sales
+WHERE sale_time IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM public.sales_rollup_hourly)
+GROUP BY 1, 2, 3;
+
+INSERT INTO public.sales_rollup_daily (sale_date, payment_method, employee_id, sale_count, revenue)
+SELECT sale_time::date, payment_method, COALESCE(employee_id, 0), COUNT(*), SUM(total_amount)
+FROM public.sales
+WHERE sale_time IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM public.sales_rollup_daily)
+GROUP BY 1, 2, 3;
+
+-- Per-product sales statistics for dead-stock / turnover analysis.
+-- product_sales_daily: units and revenue per product per sale day.
+-- product_sales_stats: last sale, lifetime totals and rolling 7/30/60/90-day
+-- windows (sale_date >= windows_as_of - N days). A trigger on sale_items keeps
+-- both current as sales commit; product_sales_stats.py slides the windows
+-- forward each day and rebuilds from history. Sales history is treated as
+-- append-only: archiving old sales does not change these figures.
+CREATE TABLE IF NOT EXISTS public.product_sales_daily
+(
+    product_id integer NOT NULL,
+    sale_date date NOT NULL,
+    units bigint NOT NULL DEFAULT 0,
+    revenue numeric(18,2) NOT NULL DEFAULT 0,
+    CONSTRAINT product_sales_daily_pkey PRIMARY KEY (product_id, sale_date),
+    CONSTRAINT product_sales_daily_product_id_fkey FOREIGN KEY (product_id)
+        REFERENCES public.products (product_id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS public.product_sales_stats
+(
+    product_id integer NOT NULL,
+    last_sale_time timestamp without time zone,
+    lifetime_units bigint NOT NULL DEFAULT 0,
+    lifetime_revenue numeric(18,2) NOT NULL DEFAULT 0,
+    units_7d bigint NOT NULL DEFAULT 0,
+    revenue_7d numeric(18,2) NOT NULL DEFAULT 0,
+    units_30d bigint NOT NULL DEFAULT 0,
+    revenue_30d numeric(18,2) NOT NULL DEFAULT 0,
+    units_60d bigint NOT NULL DEFAULT 0,
+    revenue_60d numeric(18,2) NOT NULL DEFAULT 0,
+    units_90d bigint NOT NULL DEFAULT 0,
+    revenue_90d numeric(18,2) NOT NULL DEFAULT 0,
+    windows_as_of date NOT NULL DEFAULT CURRENT_DATE,
+    CONSTRAINT product_sales_stats_pkey PRIMARY KEY (product_id),
+    CONSTRAINT product_sales_stats_product_id_fkey FOREIGN KEY (product_id)
+        REFERENCES public.products (product_id) ON DELETE CASCADE
+);
+
+CREATE OR REPLACE FUNCTION public.product_sales_stats_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    WITH items AS (
+        SELECT n.product_id, s.sale_time::date AS sale_date, MAX(s.sale_time) AS last_sale_time,
+               SUM(n.quantity) AS units, SUM(n.quantity * n.unit_price) AS revenue
+        FROM new_rows n
+        JOIN public.sales s ON s.sale_id = n.sale_id
+        WHERE s.sale_time IS NOT NULL
+        GROUP BY n.product_id, s.sale_time::date
+    ), daily AS (
+        INSERT INTO public.product_sales_daily (product_id, sale_date, units, revenue)
+        SELECT product_id, sale_date, units, revenue FROM items
+        ON CONFLICT (product_id, sale_date) DO UPDATE
+        SET units = product_sales_daily.units + EXCLUDED.units,
+            revenue = product_sales_daily.revenue + EXCLUDED.revenue
+    )
+    INSERT INTO public.product_sales_stats AS st
+        (product_id, last_sale_time, lifetime_units, lifetime_revenue,
+         units_7d, revenue_7d, units_30d, revenue_30d, units_60d, revenue_60d, units_90d, revenue_90d)
+    SELECT product_id, MAX(last_sale_time), SUM(units), SUM(revenue),
+           COALESCE(SUM(units) FILTER (WHERE sale_date >= CURRENT_DATE - 7), 0),
+           COALESCE(SUM(revenue) FILTER (WHERE sale_date >= CURRENT_DATE - 7), 0),
+           COALESCE(SUM(units) FILTER (WHERE sale_date >= CURRENT_DATE - 30), 0),
+           COALESCE(SUM(revenue) FILTER (WHERE sale_date >= CURRENT_DATE - 30), 0),
+           COALESCE(SUM(units) FILTER (WHERE sale_date >= CURRENT_DATE - 60), 0),
+           COALESCE(SUM(revenue) FILTER (WHERE sale_date >= CURRENT_DATE - 60), 0),
+           COALESCE(SUM(units) FILTER (WHERE sale_date >= CURRENT_DATE - 90), 0),
+           COALESCE(SUM(revenue) FILTER (WHERE sale_date >= CURRENT_DATE - 90), 0)
+    FROM items
+    GROUP BY product_id
+    ON CONFLICT (product_id) DO UPDATE
+    SET last_sale_time = GREATEST(st.last_sale_time, EXCLUDED.last_sale_time),
+        lifetime_units = st.lifetime_units + EXCLUDED.lifetime_units,
+        lifetime_revenue = st.lifetime_revenue + EXCLUDED.lifetime_revenue,
+        units_7d = st.units_7d + EXCLUDED.units_7d,
+        revenue_7d = st.revenue_7d + EXCLUDED.revenue_7d,
+        units_30d = st.units_30d + EXCLUDED.units_30d,
+        revenue_30d = st.revenue_30d + EXCLUDED.revenue_30d,
+        units_60d = st.units_60d + EXCLUDED.units_60d,
+        revenue_60d = st.revenue_60d + EXCLUDED.revenue_60d,
+        units_90d = st.units_90d + EXCLUDED.units_90d,
+        revenue_90d = st.revenue_90d + EXCLUDED.revenue_90d;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS product_sales_stats_ins ON public.sale_items;
+CREATE TRIGGER product_sales_stats_ins AFTER INSERT ON public.sale_items
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.product_sales_stats_apply();
+
+-- First install only; `python product_sales_stats.py --rebuild` recomputes from history
+INSERT INTO public.product_sales_daily (product_id, sale_date, units, revenue)
+SELECT si.product_id, s.sale_time::date, SUM(si.quantity), SUM(si.quantity * si.unit_price)
+FROM public.sale_items si
+JOIN public.sales s ON s.sale_id = si.sale_id
+WHERE s.sale_time IS NOT NULL
+  AND NOT EXISTS (SELECT 1 FROM public.product_sales_daily)
+GROUP BY si.product_id, s.sale_time::date;
+
+INSERT INTO public.product_sales_stats
+    (product_id, last_sale_time, lifetime_units, lifetime_revenue,
+     units_7d, revenue_7d, units_30d, revenue_30d, units_60d, revenue_60d, units_90d, revenue_90d)
+SELECT d.product_id, l.last_sale_time, SUM(d.units), SUM(d.revenue),
+       COALESCE(SUM(d.units) FILTER (WHERE d.sale_date >= CURRENT_DATE - 7), 0),
+       COALESCE(SUM(d.revenue) FILTER (WHERE d.sale_date >= CURRENT_DATE - 7), 0),
+       COALESCE(SUM(d.units) FILTER (WHERE d.sale_date >= CURRENT_DATE - 30), 0),
+       COALESCE(SUM(d.revenue) FILTER (WHERE d.sale_date >= CURRENT_DATE - 30), 0),
+       COALESCE(SUM(d.units) FILTER (WHERE d.sale_date >= CURRENT_DATE - 60), 0),
+       COALESCE(SUM(d.revenue) FILTER (WHERE d.sale_date >= CURRENT_DATE - 60), 0),
+       COALESCE(SUM(d.units) FILTER (WHERE d.sale_date >= CURRENT_DATE - 90), 0),
+       COALESCE(SUM(d.revenue) FILTER (WHERE d.sale_date >= CURRENT_DATE - 90), 0)
+FROM public.product_sales_daily d
+JOIN LATERAL (
+    SELECT MAX(s.sale_time) AS last_sale_time
+    FROM public.sale_items si
+    JOIN public.sales s ON s.sale_id = si.sale_id
+    WHERE si.product_id = d.product_id
+) l ON true
+WHERE NOT EXISTS (SELECT 1 FROM public.product_sales_stats)
+GROUP BY d.product_id, l.last_sale_time;
+
+-- Login looks employees up by case-folded username
+CREATE INDEX IF NOT EXISTS employees_username_lower_idx ON public.employees (lower(username));
+
+-- Logged-out API session tokens, kept until they would have expired (see session_tokens.py)
+CREATE TABLE IF NOT EXISTS public.revoked_tokens
+(
+    jti character varying(64) NOT NULL,
+    employee_id integer,
+    expires_at timestamp with time zone NOT NULL,
+    revoked_at timestamp with time zone NOT NULL DEFAULT now(),
+    CONSTRAINT revoked_tokens_pkey PRIMARY KEY (jti)
+);
+CREATE INDEX IF NOT EXISTS revoked_tokens_expires_at_idx ON public.revoked_tokens (expires_at);
@@ -0,0 +1,29 @@
+-- migrate: no-transaction
+-- Secondary indexes for the joins and filters used by checkout, reports and
+-- analytics (sale lines by sale and by product, sales by customer and
+-- employee, the catalog by supplier and category, unread notifications).
+-- Built CONCURRENTLY so checkouts keep writing while they build.
+-- Range scans on sales.sale_time already use sales_sale_time_id_idx (0001).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS sale_items_sale_id_idx
+    ON public.sale_items (sale_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS sale_items_product_id_idx
+    ON public.sale_items (product_id);
+
+-- Most sales have no loyalty customer
+CREATE INDEX CONCURRENTLY IF NOT EXISTS sales_customer_id_idx
+    ON public.sales (customer_id) WHERE customer_id IS NOT NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS sales_employee_id_idx
+    ON public.sales (employee_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS products_supplier_id_idx
+    ON public.products (supplier_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS products_category_id_idx
+    ON public.products (category_id);
+
+-- Unread alerts, newest first (also serves the notifications list order)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS notifications_status_created_at_idx
+    ON public.notifications (status, created_at DESC NULLS LAST, notification_id DESC);
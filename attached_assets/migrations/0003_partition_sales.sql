@@ -0,0 +1,229 @@
+-- Monthly range partitioning of sales and sale_items on sale_time.
+--
+-- sale_items carries its sale's sale_time, so both tables split by the same
+-- month and time-window queries prune partitions on either one. Keys include
+-- the partition key: sales (sale_id, sale_time), sale_items (sale_item_id,
+-- sale_time), and sale_items references sales (sale_id, sale_time). A unique
+-- index on a partitioned table must include sale_time, so client_sale_id
+-- uniqueness (offline batch replays) moves to sale_client_ids.
+--
+-- sales_partitions_ensure(first_day, last_day) creates the monthly
+-- partitions covering a date range (sales_y2025m01, sale_items_y2025m01, ...);
+-- sales_partitions.py keeps months ahead created and retires old months.
+--
+-- Converting an existing database copies both tables once under an exclusive
+-- lock: run it outside trading hours. Later index migrations on these tables
+-- cannot use CREATE INDEX CONCURRENTLY on the parent; build the index ON ONLY
+-- the parent, concurrently on each partition, and ATTACH PARTITION the parts.
+
+CREATE OR REPLACE FUNCTION public.sales_partitions_ensure(first_day date, last_day date) RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    month date := date_trunc('month', first_day)::date;
+    created integer := 0;
+    parent text;
+    partition text;
+BEGIN
+    WHILE month <= last_day LOOP
+        FOREACH parent IN ARRAY ARRAY['sales', 'sale_items'] LOOP
+            partition := parent || to_char(month, '"_y"YYYY"m"MM');
+            IF NOT EXISTS (SELECT 1 FROM pg_class
+                           WHERE relname = partition AND relnamespace = 'public'::regnamespace
+                             AND relispartition) THEN
+                EXECUTE format('CREATE TABLE public.%I PARTITION OF public.%I FOR VALUES FROM (%L) TO (%L)',
+                               partition, parent, month, (month + interval '1 month')::date);
+                created := created + 1;
+            END IF;
+        END LOOP;
+        month := (month + interval '1 month')::date;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+CREATE TABLE IF NOT EXISTS public.sale_client_ids
+(
+    client_sale_id character varying(64) COLLATE pg_catalog."default" NOT NULL,
+    sale_id integer NOT NULL,
+    sale_time timestamp without time zone NOT NULL,
+    CONSTRAINT sale_client_ids_pkey PRIMARY KEY (client_sale_id)
+);
+
+DO $$
+DECLARE
+    r record;
+    first_month timestamp;
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'public.sales'::regclass) THEN
+        RETURN;
+    END IF;
+    LOCK TABLE public.sales, public.sale_items IN ACCESS EXCLUSIVE MODE;
+
+    ALTER TABLE public.sale_items RENAME TO sale_items_unpartitioned;
+    ALTER TABLE public.sales RENAME TO sales_unpartitioned;
+    ALTER SEQUENCE public.sales_sale_id_seq OWNED BY NONE;
+    ALTER SEQUENCE public.sale_items_sale_item_id_seq OWNED BY NONE;
+    -- Free the constraint and index names for the new tables
+    FOR r IN SELECT conrelid::regclass AS tbl, conname FROM pg_constraint
+             WHERE conrelid IN ('public.sales_unpartitioned'::regclass, 'public.sale_items_unpartitioned'::regclass)
+             ORDER BY contype = 'p'
+    LOOP
+        EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', r.tbl, r.conname);
+    END LOOP;
+    FOR r IN SELECT indexrelid::regclass AS idx FROM pg_index
+             WHERE indrelid IN ('public.sales_unpartitioned'::regclass, 'public.sale_items_unpartitioned'::regclass)
+    LOOP
+        EXECUTE format('DROP INDEX %s', r.idx);
+    END LOOP;
+
+    CREATE TABLE public.sales
+    (
+        sale_id integer NOT NULL DEFAULT nextval('public.sales_sale_id_seq'::regclass),
+        sale_time timestamp without time zone NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        total_amount numeric(10, 2) NOT NULL DEFAULT 0,
+        payment_method character varying(50) COLLATE pg_catalog."default" NOT NULL,
+        customer_id integer,
+        employee_id integer,
+        client_sale_id character varying(64) COLLATE pg_catalog."default",
+        CONSTRAINT sales_pkey PRIMARY KEY (sale_id, sale_time)
+    ) PARTITION BY RANGE (sale_time);
+
+    CREATE TABLE public.sale_items
+    (
+        sale_item_id integer NOT NULL DEFAULT nextval('public.sale_items_sale_item_id_seq'::regclass),
+        sale_id integer NOT NULL,
+        sale_time timestamp without time zone NOT NULL,
+        product_id integer NOT NULL,
+        quantity integer NOT NULL,
+        unit_price numeric(10, 2) NOT NULL,
+        subtotal numeric(10, 2) GENERATED ALWAYS AS (((quantity)::numeric * unit_price)) STORED,
+        CONSTRAINT sale_items_pkey PRIMARY KEY (sale_item_id, sale_time)
+    ) PARTITION BY RANGE (sale_time);
+
+    ALTER SEQUENCE public.sales_sale_id_seq OWNED BY public.sales.sale_id;
+    ALTER SEQUENCE public.sale_items_sale_item_id_seq OWNED BY public.sale_items.sale_item_id;
+
+    -- Sales without a sale_time (never written by the application) go to the first month
+    SELECT date_trunc('month', MIN(sale_time)) INTO first_month FROM public.sales_unpartitioned;
+    first_month := COALESCE(first_month, date_trunc('month', CURRENT_DATE));
+    PERFORM public.sales_partitions_ensure(first_month::date, (CURRENT_DATE + interval '3 months')::date);
+
+    INSERT INTO public.sales (sale_id, sale_time, total_amount, payment_method, customer_id, employee_id,
+                              client_sale_id)
+    SELECT sale_id, COALESCE(sale_time, first_month), total_amount, payment_method, customer_id, employee_id,
+           client_sale_id
+    FROM public.sales_unpartitioned;
+
+    INSERT INTO public.sale_items (sale_item_id, sale_id, sale_time, product_id, quantity, unit_price)
+    SELECT si.sale_item_id, si.sale_id, COALESCE(s.sale_time, first_month), si.product_id, si.quantity,
+           si.unit_price
+    FROM public.sale_items_unpartitioned si
+    JOIN public.sales_unpartitioned s ON s.sale_id = si.sale_id;
+
+    INSERT INTO public.sale_client_ids (client_sale_id, sale_id, sale_time)
+    SELECT client_sale_id, sale_id, sale_time FROM public.sales
+    WHERE client_sale_id IS NOT NULL
+    ON CONFLICT (client_sale_id) DO NOTHING;
+
+    DROP TABLE public.sale_items_unpartitioned;
+    DROP TABLE public.sales_unpartitioned;
+
+    ALTER TABLE public.sales
+        ADD CONSTRAINT sales_customer_id_fkey FOREIGN KEY (customer_id)
+            REFERENCES public.customers (customer_id) ON DELETE SET NULL,
+        ADD CONSTRAINT sales_employee_id_fkey FOREIGN KEY (employee_id)
+            REFERENCES public.employees (employee_id) ON DELETE SET NULL;
+    ALTER TABLE public.sale_items
+        ADD CONSTRAINT sale_items_sale_id_fkey FOREIGN KEY (sale_id, sale_time)
+            REFERENCES public.sales (sale_id, sale_time) ON DELETE CASCADE,
+        ADD CONSTRAINT sale_items_product_id_fkey FOREIGN KEY (product_id)
+            REFERENCES public.products (product_id);
+END;
+$$;
+
+-- Partitioned indexes (every partition gets its own copy)
+CREATE INDEX IF NOT EXISTS sales_sale_time_id_idx
+    ON public.sales (sale_time DESC NULLS LAST, sale_id DESC);
+CREATE INDEX IF NOT EXISTS sales_customer_id_idx
+    ON public.sales (customer_id) WHERE customer_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS sales_employee_id_idx ON public.sales (employee_id);
+CREATE INDEX IF NOT EXISTS sale_items_sale_id_idx ON public.sale_items (sale_id);
+CREATE INDEX IF NOT EXISTS sale_items_product_id_idx ON public.sale_items (product_id);
+
+-- Statement-level triggers on the new parents (row counts and sums are unchanged by the copy)
+DROP TRIGGER IF EXISTS dashboard_counters_sales_ins ON public.sales;
+CREATE TRIGGER dashboard_counters_sales_ins AFTER INSERT ON public.sales
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.dashboard_counters_sales();
+DROP TRIGGER IF EXISTS dashboard_counters_sales_upd ON public.sales;
+CREATE TRIGGER dashboard_counters_sales_upd AFTER UPDATE ON public.sales
+    REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.dashboard_counters_sales();
+DROP TRIGGER IF EXISTS dashboard_counters_sales_del ON public.sales;
+CREATE TRIGGER dashboard_counters_sales_del AFTER DELETE ON public.sales
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.dashboard_counters_sales();
+
+DROP TRIGGER IF EXISTS sales_rollups_ins ON public.sales;
+CREATE TRIGGER sales_rollups_ins AFTER INSERT ON public.sales
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.sales_rollups_apply();
+DROP TRIGGER IF EXISTS sales_rollups_upd ON public.sales;
+CREATE TRIGGER sales_rollups_upd AFTER UPDATE ON public.sales
+    REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.sales_rollups_apply();
+DROP TRIGGER IF EXISTS sales_rollups_del ON public.sales;
+CREATE TRIGGER sales_rollups_del AFTER DELETE ON public.sales
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.sales_rollups_apply();
+
+-- sale_items now carries sale_time: no join back to sales
+CREATE OR REPLACE FUNCTION public.product_sales_stats_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    WITH items AS (
+        SELECT product_id, sale_time::date AS sale_date, MAX(sale_time) AS last_sale_time,
+               SUM(quantity) AS units, SUM(quantity * unit_price) AS revenue
+        FROM new_rows
+        GROUP BY product_id, sale_time::date
+    ), daily AS (
+        INSERT INTO public.product_sales_daily (product_id, sale_date, units, revenue)
+        SELECT product_id, sale_date, units, revenue FROM items
+        ON CONFLICT (product_id, sale_date) DO UPDATE
+        SET units = product_sales_daily.units + EXCLUDED.units,
+            revenue = product_sales_daily.revenue + EXCLUDED.revenue
+    )
+    INSERT INTO public.product_sales_stats AS st
+        (product_id, last_sale_time, lifetime_units, lifetime_revenue,
+         units_7d, revenue_7d, units_30d, revenue_30d, units_60d, revenue_60d, units_90d, revenue_90d)
+    SELECT product_id, MAX(last_sale_time), SUM(units), SUM(revenue),
+           COALESCE(SUM(units) FILTER (WHERE sale_date >= CURRENT_DATE - 7), 0),
+           COALESCE(SUM(revenue) FILTER (WHERE sale_date >= CURRENT_DATE - 7), 0),
+           COALESCE(SUM(units) FILTER (WHERE sale_date >= CURRENT_DATE - 30), 0),
+           COALESCE(SUM(revenue) FILTER (WHERE sale_date >= CURRENT_DATE - 30), 0),
+           COALESCE(SUM(units) FILTER (WHERE sale_date >= CURRENT_DATE - 60), 0),
+           COALESCE(SUM(revenue) FILTER (WHERE sale_date >= CURRENT_DATE - 60), 0),
+           COALESCE(SUM(units) FILTER (WHERE sale_date >= CURRENT_DATE - 90), 0),
+           COALESCE(SUM(revenue) FILTER (WHERE sale_date >= CURRENT_DATE - 90), 0)
+    FROM items
+    GROUP BY product_id
+    ON CONFLICT (product_id) DO UPDATE
+    SET last_sale_time = GREATEST(st.last_sale_time, EXCLUDED.last_sale_time),
+        lifetime_units = st.lifetime_units + EXCLUDED.lifetime_units,
+        lifetime_revenue = st.lifetime_revenue + EXCLUDED.lifetime_revenue,
+        units_7d = st.units_7d + EXCLUDED.units_7d,
+        revenue_7d = st.revenue_7d + EXCLUDED.revenue_7d,
+        units_30d = st.units_30d + EXCLUDED.units_30d,
+        revenue_30d = st.revenue_30d + EXCLUDED.revenue_30d,
+        units_60d = st.units_60d + EXCLUDED.units_60d,
+        revenue_60d = st.revenue_60d + EXCLUDED.revenue_60d,
+        units_90d = st.units_90d + EXCLUDED.units_90d,
+        revenue_90d = st.revenue_90d + EXCLUDED.revenue_90d;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS product_sales_stats_ins ON public.sale_items;
+CREATE TRIGGER product_sales_stats_ins AFTER INSERT ON public.sale_items
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION public.product_sales_stats_apply();
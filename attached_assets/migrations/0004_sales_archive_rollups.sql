@@ -0,0 +1,12 @@
+-- Archiving old sales (sales_archive.py) deletes them from sales but keeps
+-- them in the reports: the rollups' DELETE trigger is skipped when the
+-- deleting transaction sets sales.archiving = 'on', as detaching a month
+-- (sales_partitions.py) already leaves the rollups alone. Dashboard counters
+-- still follow the live table.
+
+DROP TRIGGER IF EXISTS sales_rollups_del ON public.sales;
+CREATE TRIGGER sales_rollups_del AFTER DELETE ON public.sales
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT
+    WHEN (current_setting('sales.archiving', true) IS DISTINCT FROM 'on')
+    EXECUTE FUNCTION public.sales_rollups_apply();
@@ -0,0 +1,15 @@
+-- Partial receipts of purchase orders (purchase_receiving.py).
+--
+-- Each line records how much of it has arrived; an order is PENDING until
+-- something arrives, PARTIAL while some lines are short, RECEIVED once every
+-- line is complete. Orders already RECEIVED count as fully delivered.
+
+ALTER TABLE IF EXISTS public.purchase_order_items
+    ADD COLUMN IF NOT EXISTS received_quantity integer NOT NULL DEFAULT 0;
+
+UPDATE public.purchase_order_items poi
+SET received_quantity = poi.quantity
+FROM public.purchase_orders po
+WHERE po.order_id = poi.order_id
+  AND po.status = 'RECEIVED'
+  AND poi.received_quantity <> poi.quantity;
@@ -0,0 +1,6 @@
+-- migrate: no-transaction
+-- Receiving and order details read an order's lines by order_id.
+-- Built CONCURRENTLY so ordering and receiving keep writing while it builds.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS purchase_order_items_order_id_idx
+    ON public.purchase_order_items (order_id);
@@ -0,0 +1,109 @@
+-- Append-only stock movement ledger (stock_ledger.py).
+--
+-- Sales, restocks, purchase order receipts, adjustments and clearance
+-- write-offs INSERT a signed movement instead of updating the product row,
+-- so checkouts of the same fast-moving product no longer queue on one row.
+-- Each movement records the id of the transaction that wrote it (txid).
+--
+-- products.stock_quantity holds every movement written by a transaction
+-- below stock_compaction.folded_before; newer movements are pending. The
+-- compactor folds pending movements into products and advances
+-- folded_before in one transaction, up to the oldest transaction still
+-- running, so no movement is folded twice or missed. Current stock is
+-- products.stock_quantity plus the product's pending movements
+-- (product_stock).
+
+CREATE TABLE IF NOT EXISTS public.stock_movements
+(
+    movement_id bigint GENERATED BY DEFAULT AS IDENTITY,
+    product_id integer NOT NULL,
+    quantity integer NOT NULL,
+    kind character varying(20) COLLATE pg_catalog."default" NOT NULL,
+    reference_id integer,
+    created_at timestamp without time zone NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    txid xid8 NOT NULL DEFAULT pg_current_xact_id(),
+    CONSTRAINT stock_movements_pkey PRIMARY KEY (movement_id),
+    CONSTRAINT stock_movements_product_id_fkey FOREIGN KEY (product_id)
+        REFERENCES public.products (product_id) MATCH SIMPLE,
+    CONSTRAINT stock_movements_kind_check
+        CHECK (kind IN ('SALE', 'RESTOCK', 'PO_RECEIPT', 'ADJUSTMENT', 'CLEARANCE'))
+);
+
+-- Pending movements of a product (current stock), and all pending movements (compaction)
+CREATE INDEX IF NOT EXISTS stock_movements_product_txid_idx
+    ON public.stock_movements (product_id, txid) INCLUDE (quantity);
+CREATE INDEX IF NOT EXISTS stock_movements_txid_idx
+    ON public.stock_movements (txid);
+
+CREATE TABLE IF NOT EXISTS public.stock_compaction
+(
+    id boolean NOT NULL DEFAULT true,
+    folded_before xid8 NOT NULL,
+    compacted_at timestamp without time zone,
+    CONSTRAINT stock_compaction_pkey PRIMARY KEY (id),
+    CONSTRAINT stock_compaction_single_row CHECK (id)
+);
+
+INSERT INTO public.stock_compaction (folded_before)
+VALUES (pg_snapshot_xmin(pg_current_snapshot()))
+ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE VIEW public.product_stock AS
+SELECT p.product_id, (p.stock_quantity + COALESCE(m.quantity, 0))::integer AS stock_quantity
+FROM public.products p
+LEFT JOIN (
+    SELECT sm.product_id, SUM(sm.quantity) AS quantity
+    FROM public.stock_movements sm
+    WHERE sm.txid >= (SELECT folded_before FROM public.stock_compaction)
+    GROUP BY sm.product_id
+) m ON m.product_id = p.product_id;
+
+-- Checkouts no longer lock their products first, which used to serialize
+-- sales of the same products. Upsert the per-product statistics rows in
+-- product_id order so overlapping baskets can't deadlock on them.
+CREATE OR REPLACE FUNCTION public.product_sales_stats_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    WITH items AS (
+        SELECT product_id, sale_time::date AS sale_date, MAX(sale_time) AS last_sale_time,
+               SUM(quantity) AS units, SUM(quantity * unit_price) AS revenue
+        FROM new_rows
+        GROUP BY product_id, sale_time::date
+    ), daily AS (
+        INSERT INTO public.product_sales_daily (product_id, sale_date, units, revenue)
+        SELECT product_id, sale_date, units, revenue FROM items
+        ORDER BY product_id, sale_date
+        ON CONFLICT (product_id, sale_date) DO UPDATE
+        SET units = product_sales_daily.units + EXCLUDED.units,
+            revenue = product_sales_daily.revenue + EXCLUDED.revenue
+    )
+    INSERT INTO public.product_sales_stats AS st
+        (product_id, last_sale_time, lifetime_units, lifetime_revenue,
+         units_7d, revenue_7d, units_30d, revenue_30d, units_60d, revenue_60d, units_90d, revenue_90d)
+    SELECT product_id, MAX(last_sale_time), SUM(units), SUM(revenue),
+           COALESCE(SUM(units) FILTER (WHERE sale_date >= CURRENT_DATE - 7), 0),
+           COALESCE(SUM(revenue) FILTER (WHERE sale_date >= CURRENT_DATE - 7), 0),
+           COALESCE(SUM(units) FILTER (WHERE sale_date >= CURRENT_DATE - 30), 0),
+           COALESCE(SUM(revenue) FILTER (WHERE sale_date >= CURRENT_DATE - 30), 0),
+           COALESCE(SUM(units) FILTER (WHERE sale_date >= CURRENT_DATE - 60), 0),
+           COALESCE(SUM(revenue) FILTER (WHERE sale_date >= CURRENT_DATE - 60), 0),
+           COALESCE(SUM(units) FILTER (WHERE sale_date >= CURRENT_DATE - 90), 0),
+           COALESCE(SUM(revenue) FILTER (WHERE sale_date >= CURRENT_DATE - 90), 0)
+    FROM items
+    GROUP BY product_id
+    ORDER BY product_id
+    ON CONFLICT (product_id) DO UPDATE
+    SET last_sale_time = GREATEST(st.last_sale_time, EXCLUDED.last_sale_time),
+        lifetime_units = st.lifetime_units + EXCLUDED.lifetime_units,
+        lifetime_revenue = st.lifetime_revenue + EXCLUDED.lifetime_revenue,
+        units_7d = st.units_7d + EXCLUDED.units_7d,
+        revenue_7d = st.revenue_7d + EXCLUDED.revenue_7d,
+        units_30d = st.units_30d + EXCLUDED.units_30d,
+        revenue_30d = st.revenue_30d + EXCLUDED.revenue_30d,
+        units_60d = st.units_60d + EXCLUDED.units_60d,
+        revenue_60d = st.revenue_60d + EXCLUDED.revenue_60d,
+        units_90d = st.units_90d + EXCLUDED.units_90d,
+        revenue_90d = st.revenue_90d + EXCLUDED.revenue_90d;
+    RETURN NULL;
+END;
+$$;
@@ -0,0 +1,22 @@
+-- migrate: no-transaction
+-- Login matches usernames case-insensitively, so usernames must also be
+-- unique that way: "Admin" and "admin" would otherwise share one login.
+-- Replaces the plain lower(username) index from 0001; built CONCURRENTLY so
+-- employees can keep logging in while it builds.
+
+-- Rename one of each clash first, then re-run
+DO $$
+DECLARE
+    clashes text;
+BEGIN
+    SELECT string_agg(folded, ', ') INTO clashes
+    FROM (SELECT lower(username) AS folded FROM public.employees GROUP BY 1 HAVING COUNT(*) > 1) c;
+    IF clashes IS NOT NULL THEN
+        RAISE EXCEPTION 'Usernames differing only in case: %', clashes;
+    END IF;
+END $$;
+
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS employees_username_lower_key
+    ON public.employees (lower(username));
+
+DROP INDEX CONCURRENTLY IF EXISTS public.employees_username_lower_idx;
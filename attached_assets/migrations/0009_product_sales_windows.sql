@@ -0,0 +1,40 @@
+-- Rolling sales windows cover whole days only.
+--
+-- product_sales_stats' 7/30/60/90-day windows now count the N complete days
+-- before windows_as_of (sale_date >= windows_as_of - N AND sale_date <
+-- windows_as_of). Checkouts only add to today, so sliding the windows
+-- (product_sales_stats.py) reads days no checkout writes any more and needs
+-- no table lock; offline batches replaying older days are counted by the
+-- next day's slide. The sale_items trigger keeps the daily table, last sale
+-- and lifetime totals current and no longer touches the windows. Windows
+-- slid before this migration also count their last day until the next slide.
+
+CREATE OR REPLACE FUNCTION public.product_sales_stats_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    WITH items AS (
+        SELECT product_id, sale_time::date AS sale_date, MAX(sale_time) AS last_sale_time,
+               SUM(quantity) AS units, SUM(quantity * unit_price) AS revenue
+        FROM new_rows
+        GROUP BY product_id, sale_time::date
+    ), daily AS (
+        INSERT INTO public.product_sales_daily (product_id, sale_date, units, revenue)
+        SELECT product_id, sale_date, units, revenue FROM items
+        ORDER BY product_id, sale_date
+        ON CONFLICT (product_id, sale_date) DO UPDATE
+        SET units = product_sales_daily.units + EXCLUDED.units,
+            revenue = product_sales_daily.revenue + EXCLUDED.revenue
+    )
+    INSERT INTO public.product_sales_stats AS st
+        (product_id, last_sale_time, lifetime_units, lifetime_revenue)
+    SELECT product_id, MAX(last_sale_time), SUM(units), SUM(revenue)
+    FROM items
+    GROUP BY product_id
+    ORDER BY product_id
+    ON CONFLICT (product_id) DO UPDATE
+    SET last_sale_time = GREATEST(st.last_sale_time, EXCLUDED.last_sale_time),
+        lifetime_units = st.lifetime_units + EXCLUDED.lifetime_units,
+        lifetime_revenue = st.lifetime_revenue + EXCLUDED.lifetime_revenue;
+    RETURN NULL;
+END;
+$$;
@@ -19,21 +19,18 @@ current_name = None   # employee name (for greetings)
 def hash_password(plain_password: str) -> str:
     """Return hashed password if bcrypt available; otherwise return plain."""
     if USE_BCRYPT:
-        import bcrypt
-        hashed = bcrypt.hashpw(plain_password.encode('utf-8'), bcrypt.gensalt())
-        return hashed.decode('utf-8')
+        from passwords import hash_password as bcrypt_hash
+        return bcrypt_hash(plain_password)
     else:
         return plain_password  # fallback (not secure)
 
 
 def verify_password(plain_password: str, stored_password: str) -> bool:
     """Verify password against stored value."""
-    if USE_BCRYPT:
-        import bcrypt
-        try:
-            return bcrypt.checkpw(plain_password.encode('utf-8'), stored_password.encode('utf-8'))
-        except Exception:
-            return False
+    if USE_BCRYPT or stored_password.startswith("$2"):
+        # Also accepts hashes written by the API (which upgrades plain-text rows at login)
+        from passwords import verify_password as bcrypt_verify
+        return bcrypt_verify(plain_password, stored_password)
     else:
         # Plain text comparison - for development only
         result = plain_password == stored_password
@@ -0,0 +1,405 @@
+# backup.py
+"""
+Streaming, compressed backups of the store's data, and restore.
+
+backup() writes one gzip CSV file per table to BACKUP_DIR/<name>/ plus a
+manifest.json listing every file with its columns, row count, size and
+SHA-256. Tables are exported with server-side COPY ... TO STDOUT by
+BACKUP_WORKERS connections in parallel (one table per worker at a time,
+largest first). Rows are compressed and checksummed as they stream to disk,
+so no table is ever held in memory.
+
+Every worker reads the same exported snapshot, so the files are consistent
+with each other. To take that snapshot, backup() waits briefly for
+in-flight checkouts (a SHARE lock on the sales tables and stock_movements,
+released as soon as the workers have the snapshot). As a result, every sale
+and stock movement up to the manifest's high-water marks (the highest
+sale_id and movement_id) is in the backup.
+
+An incremental backup copies only sales, sale_items, sale_client_ids and
+stock_movements rows above the previous backup's high-water marks; the
+other (small) tables are copied in full every time. Sales and movements
+are append-only, so a full backup plus its chain of incrementals holds all
+of them. Rows archived, pruned or changed between backups are not
+reflected in later incrementals; take a full backup after an archival run
+or a schema migration.
+
+restore() verifies the checksums of the whole chain, then reloads every
+table in one transaction, as generate_data.py loads data, folds the stock
+movements that were pending when the backup was taken into the products'
+stock (stock_ledger.rebase), and rebuilds the rollups, product statistics
+and dashboard counters. The database must be at the same schema version as
+the backup (python migrate.py).
+
+    python backup.py                     # full backup
+    python backup.py --incremental       # new sales and stock movements since the last backup
+    python backup.py --list
+    python backup.py --restore 20250101T020000_full --replace
+
+Settings (environment):
+    BACKUP_DIR=backups
+    BACKUP_WORKERS=4
+    BACKUP_COMPRESS_LEVEL=1     # gzip level: 1 is fastest, 9 smallest
+    BACKUP_LOCK_TIMEOUT=5s      # wait for in-flight checkouts at most this long per attempt
+"""
+import argparse
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from psycopg2 import errors, extensions
+from db import get_connection, get_engine
+from generate_data import LOADED_TABLES, DERIVED_TABLES, drop_bulk_constraints, reset_sequences
+import dashboard_counters
+import product_sales_stats
+import sales_rollups
+import stock_ledger
+
+BACKUP_DIR = os.getenv("BACKUP_DIR", "backups")
+BACKUP_WORKERS = int(os.getenv("BACKUP_WORKERS", "4"))
+BACKUP_COMPRESS_LEVEL = int(os.getenv("BACKUP_COMPRESS_LEVEL", "1"))
+BACKUP_LOCK_TIMEOUT = os.getenv("BACKUP_LOCK_TIMEOUT", "5s")
+BACKUP_LOCK_RETRIES = 5
+
+TABLES = LOADED_TABLES                  # restore order: referenced tables first
+# Append-only tables an incremental backup copies above the previous high-water mark of their key
+INCREMENTAL_TABLES = {"sales": "sale_id", "sale_items": "sale_id", "sale_client_ids": "sale_id",
+                      "stock_movements": "movement_id"}
+MANIFEST = "manifest.json"
+
+
+class _ChecksumWriter:
+    """Write-only wrapper that counts and SHA-256 hashes the bytes passing through to a file"""
+
+    def __init__(self, f):
+        self.f = f
+        self.sha256 = hashlib.sha256()
+        self.bytes = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.bytes += len(data)
+        return self.f.write(data)
+
+    def flush(self):
+        self.f.flush()
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# ----------------- Listing -----------------
+def read_manifest(name, directory=BACKUP_DIR):
+    with open(os.path.join(directory, name, MANIFEST), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def list_backups(directory=BACKUP_DIR):
+    """Manifests of every complete backup (one with a manifest), oldest first"""
+    if not os.path.isdir(directory):
+        return []
+    return [read_manifest(name, directory) for name in sorted(os.listdir(directory))
+            if os.path.isfile(os.path.join(directory, name, MANIFEST))]
+
+
+def _chain(name, directory):
+    """The manifests a restore of `name` needs: its full backup, then each incremental up to it"""
+    chain = [read_manifest(name, directory)]
+    while chain[0]["base"]:
+        chain.insert(0, read_manifest(chain[0]["base"], directory))
+    return chain
+
+
+# ----------------- Backup -----------------
+def _columns(cur, table):
+    """Stored (non-generated) columns of a table, in table order"""
+    cur.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = %s AND is_generated = 'NEVER'
+        ORDER BY ordinal_position
+    """, (table,))
+    return [row[0] for row in cur.fetchall()]
+
+
+def _snapshot(conn):
+    """
+    Waits for in-flight writes to the sales tables and stock movements, then
+    exports a snapshot in conn's open transaction. Returns (snapshot id,
+    {"sale_id", "movement_id"} high-water marks, stock compaction watermark).
+    """
+    with conn.cursor() as cur:
+        for attempt in range(1, BACKUP_LOCK_RETRIES + 1):
+            try:
+                cur.execute("SET LOCAL lock_timeout = %s", (BACKUP_LOCK_TIMEOUT,))
+                # Conflicts with checkouts only; held until the workers have the snapshot. Taken in
+                # the order checkout.py and sales_archive.py write these tables, so they can't
+                # deadlock; a writer that doesn't (e.g. creating a missing partition) only makes
+                # this attempt fail.
+                cur.execute("LOCK TABLE sale_client_ids, sales, stock_movements, sale_items IN SHARE MODE")
+                break
+            except (errors.LockNotAvailable, errors.DeadlockDetected):
+                conn.rollback()
+                if attempt == BACKUP_LOCK_RETRIES:
+                    raise
+                time.sleep(attempt)
+        cur.execute("SELECT pg_export_snapshot()")
+        snapshot = cur.fetchone()[0]
+        cur.execute("""
+            SELECT (SELECT COALESCE(MAX(sale_id), 0) FROM sales),
+                   (SELECT COALESCE(MAX(movement_id), 0) FROM stock_movements),
+                   (SELECT CAST(folded_before AS TEXT) FROM stock_compaction)
+        """)
+        sale_id, movement_id, folded_before = cur.fetchone()
+        return snapshot, {"sale_id": sale_id, "movement_id": movement_id}, folded_before
+
+
+def _export(cur, path, table, columns, key=None, since=None):
+    """COPYs a table (or its rows with key above since) to a gzip CSV file. Returns the file's entry."""
+    where = f" WHERE {key} > {int(since)}" if since is not None else ""
+    partial = path + ".part"
+    with open(partial, "wb") as raw:
+        checksum = _ChecksumWriter(raw)
+        with gzip.GzipFile(filename="", fileobj=checksum, mode="wb", compresslevel=BACKUP_COMPRESS_LEVEL) as f:
+            cur.copy_expert(f"COPY (SELECT {', '.join(columns)} FROM {table}{where}) "
+                            f"TO STDOUT WITH (FORMAT csv, HEADER)", f)
+        rows = cur.rowcount
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(partial, path)
+    return {"file": os.path.basename(path), "columns": columns, "rows": rows, "bytes": checksum.bytes,
+            "sha256": checksum.sha256.hexdigest(), "key": key, "since": since}
+
+
+def backup(directory=BACKUP_DIR, incremental=False, workers=BACKUP_WORKERS, progress=None):
+    """
+    Takes a full backup, or an incremental one on top of the newest backup
+    in directory. Returns its manifest. progress(table, entry) is called as
+    each table finishes.
+    """
+    base = None
+    if incremental:
+        previous = list_backups(directory)
+        if not previous:
+            raise RuntimeError("No previous backup to build an incremental backup on")
+        base = previous[-1]
+
+    started = datetime.datetime.now()
+    name = f"{started:%Y%m%dT%H%M%S}_{'incremental' if incremental else 'full'}"
+    target = os.path.join(directory, name)
+    os.makedirs(target)
+
+    main = get_connection()
+    connections = []
+    if main is None:
+        raise RuntimeError("Could not connect to the database")
+    try:
+        main.set_session(isolation_level=extensions.ISOLATION_LEVEL_REPEATABLE_READ)
+        snapshot, high_water, folded_before = _snapshot(main)
+        with main.cursor() as cur:
+            cur.execute("SELECT MAX(version) FROM schema_migrations")
+            schema_version = cur.fetchone()[0]
+            if base and base["schema_version"] != schema_version:
+                raise RuntimeError(f"The last backup is at schema version {base['schema_version']}, "
+                                   f"the database at {schema_version}; take a full backup")
+            # Largest first (a partitioned table's size is its partitions'), so no worker is left with a big one last
+            cur.execute("""
+                SELECT c.relname
+                FROM pg_class c
+                WHERE c.relname = ANY(%s) AND c.relnamespace = 'public'::regnamespace
+                ORDER BY pg_total_relation_size(c.oid)
+                         + COALESCE((SELECT SUM(pg_total_relation_size(i.inhrelid))
+                                     FROM pg_inherits i WHERE i.inhparent = c.oid), 0) DESC
+            """, (list(TABLES),))
+            by_size = [row[0] for row in cur.fetchall()]
+            columns = {table: _columns(cur, table) for table in TABLES}
+            # Months that have sales partitions, re-created before a restore loads them
+            cur.execute("""
+                SELECT to_date(substring(c.relname from '_y(\\d{4}m\\d{2})$'), 'YYYY"m"MM')
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'public.sales'::regclass
+            """)
+            months = sorted(row[0].isoformat() for row in cur.fetchall() if row[0] is not None)
+
+        for _ in range(min(workers, len(TABLES))):
+            conn = get_connection()
+            if conn is None:
+                raise RuntimeError("Could not connect to the database")
+            connections.append(conn)
+            conn.set_session(isolation_level=extensions.ISOLATION_LEVEL_REPEATABLE_READ, readonly=True)
+            with conn.cursor() as cur:
+                cur.execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+        main.commit()           # every worker holds the snapshot: let checkouts go on
+
+        tasks = queue.SimpleQueue()
+        for table in by_size:
+            tasks.put(table)
+        entries = {}
+        lock = threading.Lock()
+
+        def work(conn):
+            with conn.cursor() as cur:
+                while True:
+                    try:
+                        table = tasks.get_nowait()
+                    except queue.Empty:
+                        return
+                    key = INCREMENTAL_TABLES.get(table) if base else None
+                    entry = _export(cur, os.path.join(target, f"{table}.csv.gz"), table, columns[table],
+                                    key, base["high_water"][key] if key else None)
+                    with lock:
+                        entries[table] = entry
+                    if progress:
+                        progress(table, entry)
+
+        with ThreadPoolExecutor(max_workers=len(connections)) as pool:
+            for future in [pool.submit(work, conn) for conn in connections]:
+                future.result()
+    finally:
+        for conn in connections + [main]:
+            conn.close()
+
+    manifest = {
+        "name": name,
+        "kind": "incremental" if incremental else "full",
+        "base": base["name"] if base else None,
+        "created_at": started.isoformat(timespec="seconds"),
+        "duration_seconds": round((datetime.datetime.now() - started).total_seconds(), 1),
+        "schema_version": schema_version,
+        "high_water": high_water,
+        "stock_folded_before": folded_before,
+        "sales_months": months,
+        "tables": {table: entries[table] for table in TABLES},
+    }
+    # Written last: a backup directory without a manifest is incomplete and ignored
+    partial = os.path.join(target, MANIFEST + ".part")
+    with open(partial, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(partial, os.path.join(target, MANIFEST))
+    return manifest
+
+
+# ----------------- Restore -----------------
+def verify(name, directory=BACKUP_DIR):
+    """Checks every file a restore of `name` reads against its manifest checksum. Returns the chain."""
+    chain = _chain(name, directory)
+    for manifest in chain:
+        for table, entry in manifest["tables"].items():
+            path = os.path.join(directory, manifest["name"], entry["file"])
+            if not os.path.isfile(path) or _sha256(path) != entry["sha256"]:
+                raise RuntimeError(f"{manifest['name']}/{entry['file']} is missing or corrupt")
+    return chain
+
+
+def _sources(chain, table):
+    """The (backup, entry) pairs to load for a table: the newest full copy and every delta after it"""
+    sources = []
+    for manifest in reversed(chain):
+        entry = manifest["tables"][table]
+        sources.insert(0, (manifest, entry))
+        if entry["since"] is None:
+            break
+    return sources
+
+
+def restore(name, directory=BACKUP_DIR, replace=False, progress=print):
+    """
+    Replaces the store's data with backup `name` (and the backups it builds
+    on), in one transaction, then rebuilds the trigger-maintained
+    summaries. Returns rows loaded by table.
+    """
+    chain = verify(name, directory)
+    counts = {}
+    conn = get_connection()
+    if conn is None:
+        raise RuntimeError("Could not connect to the database")
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT MAX(version) FROM schema_migrations")
+                version = cur.fetchone()[0]
+                if version != chain[-1]["schema_version"]:
+                    raise RuntimeError(f"Backup is at schema version {chain[-1]['schema_version']}, "
+                                       f"the database at {version}")
+                cur.execute("SELECT EXISTS (SELECT 1 FROM products) OR EXISTS (SELECT 1 FROM sales)")
+                if cur.fetchone()[0] and not replace:
+                    raise RuntimeError("The database already has data; pass --replace to overwrite it")
+
+                cur.execute(f"TRUNCATE {', '.join(TABLES + DERIVED_TABLES)} RESTART IDENTITY CASCADE")
+                for table in TABLES:
+                    cur.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+                recreate = drop_bulk_constraints(cur)
+                for month in sorted({m for manifest in chain for m in manifest["sales_months"]}):
+                    cur.execute("SELECT sales_partitions_ensure(%s, %s)", (month, month))
+
+                for table in TABLES:
+                    counts[table] = 0
+                    for manifest, entry in _sources(chain, table):
+                        with gzip.open(os.path.join(directory, manifest["name"], entry["file"]), "rb") as f:
+                            cur.copy_expert(f"COPY {table} ({', '.join(entry['columns'])}) "
+                                            f"FROM STDIN WITH (FORMAT csv, HEADER)", f)
+                        counts[table] += entry["rows"]
+                    progress(f"   ✔ {table}: {counts[table]:,} rows")
+
+                progress("   ✔ Re-creating indexes and foreign keys")
+                for ddl in recreate:
+                    cur.execute(ddl)
+                reset_sequences(cur)
+                # Movement transaction ids belong to the source server; fold what was pending there
+                stock_ledger.rebase(cur, chain[-1]["stock_folded_before"])
+                for table in TABLES:
+                    cur.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+                for table in TABLES:
+                    cur.execute(f"ANALYZE {table}")
+    finally:
+        conn.close()
+
+    progress("   ✔ Rebuilding sales rollups, product statistics and dashboard counters")
+    engine = get_engine("analytics")
+    sales_rollups.backfill(engine)
+    product_sales_stats.rebuild(engine)
+    dashboard_counters.reconcile(engine, days=dashboard_counters.KEEP_DAYS)
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Back up or restore the store's data")
+    parser.add_argument("--dir", default=BACKUP_DIR, help=f"backup directory (default {BACKUP_DIR})")
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--incremental", action="store_true",
+                        help="only sales and stock movements since the last backup")
+    action.add_argument("--list", action="store_true", help="list backups")
+    action.add_argument("--restore", metavar="NAME", help="restore this backup (and the backups it builds on)")
+    parser.add_argument("--workers", type=int, default=BACKUP_WORKERS)
+    parser.add_argument("--replace", action="store_true", help="allow restore over existing data")
+    args = parser.parse_args()
+
+    try:
+        if args.list:
+            for m in list_backups(args.dir):
+                size = sum(entry["bytes"] for entry in m["tables"].values())
+                print(f"{m['name']:<32} {m['kind']:<12} sales ≤ {m['high_water']['sale_id']:<10} "
+                      f"{size / 1048576:>10,.1f} MB")
+        elif args.restore:
+            counts = restore(args.restore, args.dir, replace=args.replace)
+            print(f"✅ Restored {args.restore}: {counts['sales']:,} sales, {counts['products']:,} products")
+        else:
+            manifest = backup(args.dir, incremental=args.incremental, workers=args.workers,
+                              progress=lambda table, entry: print(
+                                  f"   ✔ {table}: {entry['rows']:,} rows, {entry['bytes'] / 1048576:,.1f} MB"))
+            size = sum(entry["bytes"] for entry in manifest["tables"].values())
+            print(f"✅ Backup {manifest['name']} written to {args.dir}/ ({size / 1048576:,.1f} MB in "
+                  f"{manifest['duration_seconds']}s)")
+    except Exception as e:
+        print(f"❌ {'Restore' if args.restore else 'Backup'} failed: {e}")
+        raise SystemExit(1)
@@ -0,0 +1,219 @@
+# catalog_cache.py
+"""
+In-process product catalog cache.
+
+Holds every product as the record `/api/products` returns (with the joined
+category and supplier names), keyed by product_id and by barcode, so catalog
+reads are dictionary lookups instead of queries.
+
+Freshness:
+  * write paths in this process call ``catalog.invalidate([...])`` after they
+    commit (``invalidate()`` with no ids for category/supplier renames), and
+    the next read re-loads just those products;
+  * checkouts write the new stock levels through with ``apply_stock``;
+  * writes made by other processes show up after at most CATALOG_CACHE_TTL
+    seconds (default 60), when the whole catalog is re-loaded.
+
+Readers call ``ensure_fresh(engine)`` (or, on an async connection,
+``await conn.run_sync(catalog.refresh)`` when ``needs_refresh()``) and then
+use get / get_by_barcode / page / all, which never touch the database.
+"""
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from sqlalchemy import text
+
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "60"))
+
+PRODUCT_FIELDS = ["product_id", "name", "barcode", "price", "stock_quantity",
+                  "low_stock_threshold", "category", "supplier"]
+
+# Stock comes from product_stock: the product's level plus its pending movements (stock_ledger.py)
+CATALOG_QUERY = """
+    SELECT p.product_id, p.name, p.barcode, p.price, ps.stock_quantity,
+           p.low_stock_threshold, c.name as category, s.name as supplier
+    FROM products p
+    JOIN product_stock ps ON ps.product_id = p.product_id
+    LEFT JOIN categories c ON p.category_id = c.category_id
+    LEFT JOIN suppliers s ON p.supplier_id = s.supplier_id
+"""
+
+
+def product_record(r):
+    """Maps a CATALOG_QUERY row to the product dict the API returns"""
+    return {
+        "product_id": r[0],
+        "name": r[1],
+        "barcode": r[2],
+        "price": float(r[3]) if r[3] else 0,
+        "stock_quantity": r[4],
+        "low_stock_threshold": r[5],
+        "category": r[6],
+        "supplier": r[7]
+    }
+
+
+class CatalogCache:
+    """Thread-safe product cache. Records are never mutated in place, so callers may keep them."""
+
+    def __init__(self, ttl=CATALOG_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._by_id = {}
+        self._by_barcode = {}
+        self._ids = []              # sorted product ids, for keyset pages
+        self._loaded_at = None      # time.monotonic() of the last full load
+        self._full_reload = True
+        self._refreshing = False
+        self._stale = set()
+        # Every invalidate/apply_stock bumps _version and stamps the products it touched,
+        # so a load that overlapped a write leaves those products stale instead of
+        # installing what may be an older row.
+        self._version = 0
+        self._full_version = 0
+        self._touched = {}
+
+    # ----------------- Freshness -----------------
+    def _expired(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl
+
+    def needs_refresh(self):
+        with self._lock:
+            # While one caller re-loads an expired catalog the others keep serving it
+            return self._full_reload or bool(self._stale) or (self._expired() and not self._refreshing)
+
+    def refresh(self, conn):
+        """Re-loads the whole catalog when expired or invalidated, otherwise only the stale products"""
+        with self._lock:
+            full = self._full_reload or self._expired()
+            stale = set(self._stale)
+            start = self._version
+            if full:
+                self._refreshing = True
+
+        if full:
+            try:
+                rows = conn.execute(text(CATALOG_QUERY + " ORDER BY p.product_id")).fetchall()
+                with self._lock:
+                    self._install_all(rows, start)
+            finally:
+                with self._lock:
+                    self._refreshing = False
+        elif stale:
+            rows = conn.execute(text(CATALOG_QUERY + " WHERE p.product_id = ANY(:pids)"),
+                                {"pids": list(stale)}).fetchall()
+            with self._lock:
+                self._install_some(rows, stale, start)
+
+    def ensure_fresh(self, engine):
+        """Refreshes through a connection from engine, only when something changed or expired"""
+        if self.needs_refresh():
+            with engine.connect() as conn:
+                self.refresh(conn)
+        return self
+
+    def invalidate(self, product_ids=None):
+        """Marks products as changed (call after commit). No ids re-loads everything."""
+        with self._lock:
+            self._version += 1
+            if product_ids is None:
+                self._full_reload = True
+                self._full_version = self._version
+                return
+            for pid in product_ids:
+                self._stale.add(pid)
+                self._touched[pid] = self._version
+
+    def apply_stock(self, stock_levels):
+        """Writes committed stock levels ({product_id: stock_quantity}) straight into the cache"""
+        with self._lock:
+            self._version += 1
+            for pid, quantity in stock_levels.items():
+                record = self._by_id.get(pid)
+                if record is not None:
+                    self._by_id[pid] = {**record, "stock_quantity": quantity}
+                self._touched[pid] = self._version
+
+    def load_barcodes(self, conn, barcodes):
+        """
+        Reads products by barcode through the unique index and adds them to the cache.
+        Used for cache misses, e.g. a product another process added since the last load.
+        """
+        with self._lock:
+            start = self._version
+        rows = conn.execute(text(CATALOG_QUERY + " WHERE p.barcode = ANY(:codes)"),
+                            {"codes": list(barcodes)}).fetchall()
+        records = [product_record(r) for r in rows]
+        with self._lock:
+            for record in records:
+                if self._touched.get(record["product_id"], 0) <= start:
+                    self._remove(record["product_id"])
+                    self._put(record)
+        return records
+
+    # ----------------- Installing loaded rows (lock held) -----------------
+    def _put(self, record):
+        pid = record["product_id"]
+        if pid not in self._by_id:
+            insort(self._ids, pid)
+        self._by_id[pid] = record
+        if record["barcode"]:
+            self._by_barcode[record["barcode"]] = pid
+
+    def _remove(self, pid):
+        record = self._by_id.pop(pid, None)
+        if record is None:
+            return
+        if record["barcode"] and self._by_barcode.get(record["barcode"]) == pid:
+            del self._by_barcode[record["barcode"]]
+        i = bisect_left(self._ids, pid)
+        if i < len(self._ids) and self._ids[i] == pid:
+            del self._ids[i]
+
+    def _install_all(self, rows, start):
+        self._by_id = {}
+        self._by_barcode = {}
+        self._ids = []
+        for r in rows:
+            record = product_record(r)
+            self._by_id[record["product_id"]] = record
+            if record["barcode"]:
+                self._by_barcode[record["barcode"]] = record["product_id"]
+            self._ids.append(record["product_id"])
+        self._loaded_at = time.monotonic()
+        self._full_reload = self._full_version > start
+        self._touched = {pid: v for pid, v in self._touched.items() if v > start}
+        self._stale = set(self._touched)
+
+    def _install_some(self, rows, stale, start):
+        loaded = {r[0]: product_record(r) for r in rows}
+        for pid in stale:
+            self._remove(pid)
+            if pid in loaded:
+                self._put(loaded[pid])
+            if self._touched.get(pid, 0) <= start:
+                self._stale.discard(pid)
+                self._touched.pop(pid, None)
+
+    # ----------------- Reads (no database access) -----------------
+    def get(self, product_id):
+        return self._by_id.get(product_id)
+
+    def get_by_barcode(self, barcode):
+        pid = self._by_barcode.get(barcode)
+        return self._by_id.get(pid) if pid is not None else None
+
+    def page(self, after_id, count):
+        """Up to count products with product_id > after_id (None = from the start), in id order"""
+        with self._lock:
+            i = 0 if after_id is None else bisect_right(self._ids, after_id)
+            return [self._by_id[pid] for pid in self._ids[i:i + count]]
+
+    def all(self):
+        with self._lock:
+            return [self._by_id[pid] for pid in self._ids]
+
+
+# One cache per process, shared by the API routes and the CLI modules
+catalog = CatalogCache()
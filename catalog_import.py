@@ -0,0 +1,220 @@
+# catalog_import.py
+"""
+Bulk product import from CSV: new store catalogs and supplier price files.
+
+A file is loaded in a fixed number of statements, however many rows it has:
+
+    1. COPY every row into a temporary staging table (all text, so a bad
+       value becomes a reject instead of failing the load)
+    2. validate every row in one UPDATE: required fields, number formats,
+       lengths, category / supplier foreign keys (joined as sets) and
+       barcodes repeated within the file
+    3. upsert the valid rows on barcode in one INSERT ... ON CONFLICT
+
+Rows that fail validation are reported with their row number (1 = the first
+row after the header) and reason; the other rows are imported.
+
+Columns (header row required, any order):
+    name, barcode, price, category_id, supplier_id      required
+    stock_quantity                                      new products only (default 0)
+    low_stock_threshold                                 default 10
+    cost_price                                          empty keeps the current cost
+
+An existing product (same barcode) gets the file's name, price, category,
+supplier and, when the file has those columns, threshold and cost price.
+Its stock is left alone: stock changes go through stock adjustments.
+
+The API server streams the request body to COPY (asyncpg); the CLI uses
+import_products() on a psycopg2 connection:
+
+    python catalog_import.py products.csv
+    python catalog_import.py supplier_prices.csv --rejects rejects.csv
+"""
+import argparse
+import csv
+import time
+from sqlalchemy import text
+from db import get_engine
+
+STAGING_TABLE = "product_import"
+REQUIRED_COLUMNS = ("name", "barcode", "price", "category_id", "supplier_id")
+OPTIONAL_COLUMNS = ("stock_quantity", "low_stock_threshold", "cost_price")
+MAX_REPORTED_REJECTS = 1000           # per API response; the CLI writes every reject to a file
+
+_AMOUNT = r"^\d{1,8}(\.\d{1,2})?$"    # numeric(10,2), not negative
+_COUNT = r"^\d{1,9}$"                 # integer, not negative
+
+
+class CatalogImportError(Exception):
+    """Raised when a file cannot be imported at all (bad header or malformed CSV)"""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+def parse_header(line):
+    """Returns the staging columns named by a CSV header line (bytes or str), in file order"""
+    if isinstance(line, bytes):
+        try:
+            line = line.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise CatalogImportError("The file must be UTF-8 encoded")
+    columns = [c.strip().lower() for c in next(csv.reader([line]), [])]
+    unknown = [c for c in columns if c not in REQUIRED_COLUMNS + OPTIONAL_COLUMNS]
+    if unknown:
+        raise CatalogImportError(f"Unknown column(s) {', '.join(unknown)}; expected "
+                                 f"{', '.join(REQUIRED_COLUMNS + OPTIONAL_COLUMNS)}")
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise CatalogImportError(f"Missing required column(s) {', '.join(missing)}")
+    if len(set(columns)) != len(columns):
+        raise CatalogImportError("A column appears more than once in the header")
+    return columns
+
+
+def is_data_error(error):
+    """True for database errors caused by the file's content (class 22: bad CSV, bad encoding, ...)"""
+    code = getattr(error, "pgcode", None) or getattr(error, "sqlstate", None)
+    return bool(code) and code.startswith("22")
+
+
+def create_staging(conn):
+    """Creates the staging table for this transaction; rows are numbered in COPY order"""
+    conn.execute(text(f"""
+        CREATE TEMPORARY TABLE {STAGING_TABLE} (
+            row_number integer GENERATED ALWAYS AS IDENTITY,
+            {', '.join(f'{c} text' for c in REQUIRED_COLUMNS + OPTIONAL_COLUMNS)},
+            error text
+        ) ON COMMIT DROP
+    """))
+
+
+def copy_statement(columns):
+    return f"COPY {STAGING_TABLE} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+
+
+def apply_import(conn, columns, max_rejects=None):
+    """
+    Validates the staged rows and upserts the valid ones, in the caller's
+    transaction. Returns counts and the rejected rows (up to max_rejects).
+    """
+    # Row numbers and reasons for every invalid row, in one pass
+    conn.execute(text(f"""
+        UPDATE {STAGING_TABLE} i
+        SET error = v.error
+        FROM (
+            SELECT s.row_number,
+                   CASE
+                       WHEN COALESCE(btrim(s.name), '') = '' THEN 'name is required'
+                       WHEN length(btrim(s.name)) > 100 THEN 'name is longer than 100 characters'
+                       WHEN COALESCE(btrim(s.barcode), '') = '' THEN 'barcode is required'
+                       WHEN length(btrim(s.barcode)) > 50 THEN 'barcode is longer than 50 characters'
+                       WHEN COALESCE(btrim(s.price), '') !~ '{_AMOUNT}' THEN 'price must be an amount like 12.50'
+                       WHEN NULLIF(btrim(s.cost_price), '') !~ '{_AMOUNT}' THEN 'cost_price must be an amount like 12.50'
+                       WHEN NULLIF(btrim(s.stock_quantity), '') !~ '{_COUNT}' THEN 'stock_quantity must be a whole number'
+                       WHEN NULLIF(btrim(s.low_stock_threshold), '') !~ '{_COUNT}'
+                           THEN 'low_stock_threshold must be a whole number'
+                       WHEN c.category_id IS NULL THEN 'unknown category_id'
+                       WHEN su.supplier_id IS NULL THEN 'unknown supplier_id'
+                       WHEN s.first_row <> s.row_number THEN 'barcode repeats row ' || s.first_row
+                   END AS error
+            FROM (
+                SELECT *, MIN(row_number) OVER (PARTITION BY btrim(barcode)) AS first_row
+                FROM {STAGING_TABLE}
+            ) s
+            LEFT JOIN categories c
+                   ON c.category_id = CASE WHEN btrim(s.category_id) ~ '{_COUNT}' THEN btrim(s.category_id)::integer END
+            LEFT JOIN suppliers su
+                   ON su.supplier_id = CASE WHEN btrim(s.supplier_id) ~ '{_COUNT}' THEN btrim(s.supplier_id)::integer END
+        ) v
+        WHERE v.row_number = i.row_number AND v.error IS NOT NULL
+    """))
+
+    updates = ["name = EXCLUDED.name", "price = EXCLUDED.price", "category_id = EXCLUDED.category_id",
+               "supplier_id = EXCLUDED.supplier_id",
+               "cost_price = COALESCE(EXCLUDED.cost_price, p.cost_price)"]
+    if "low_stock_threshold" in columns:
+        updates.append("low_stock_threshold = EXCLUDED.low_stock_threshold")
+    inserted, updated = conn.execute(text(f"""
+        WITH upserted AS (
+            INSERT INTO products AS p
+                (name, barcode, price, stock_quantity, category_id, supplier_id, low_stock_threshold, cost_price)
+            SELECT btrim(name), btrim(barcode), btrim(price)::numeric, COALESCE(NULLIF(btrim(stock_quantity), '')::integer, 0),
+                   btrim(category_id)::integer, btrim(supplier_id)::integer,
+                   COALESCE(NULLIF(btrim(low_stock_threshold), '')::integer, 10),
+                   NULLIF(btrim(cost_price), '')::numeric
+            FROM {STAGING_TABLE}
+            WHERE error IS NULL
+            ORDER BY row_number
+            ON CONFLICT (barcode) DO UPDATE
+            SET {', '.join(updates)}
+            RETURNING xmax = 0 AS inserted
+        )
+        SELECT COUNT(*) FILTER (WHERE inserted), COUNT(*) FILTER (WHERE NOT inserted) FROM upserted
+    """)).one()
+
+    rows, rejected = conn.execute(text(f"""
+        SELECT COUNT(*), COUNT(error) FROM {STAGING_TABLE}
+    """)).one()
+    rejects = conn.execute(text(f"""
+        SELECT row_number, barcode, error FROM {STAGING_TABLE}
+        WHERE error IS NOT NULL
+        ORDER BY row_number
+        {'LIMIT ' + str(int(max_rejects)) if max_rejects is not None else ''}
+    """)).fetchall()
+    return {
+        "rows": rows,
+        "inserted": inserted,
+        "updated": updated,
+        "rejected": rejected,
+        "rejects": [{"row": r[0], "barcode": r[1], "error": r[2]} for r in rejects],
+    }
+
+
+def import_products(conn, stream, max_rejects=None):
+    """
+    Imports a CSV file (a binary stream, header first) on a synchronous
+    psycopg2-backed Connection, in the caller's transaction.
+    """
+    columns = parse_header(stream.readline())
+    create_staging(conn)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(copy_statement(columns), stream)
+    except Exception as e:
+        if is_data_error(e):
+            raise CatalogImportError(f"Malformed CSV: {str(e).strip()}")
+        raise
+    finally:
+        cursor.close()
+    return apply_import(conn, columns, max_rejects)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import or update products from a CSV file")
+    parser.add_argument("file", help="CSV with a header row (see catalog_import.py)")
+    parser.add_argument("--rejects", help="write rejected rows to this CSV file")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    try:
+        with get_engine("oltp").begin() as conn, open(args.file, "rb") as f:
+            result = import_products(conn, f)
+        print(f"✅ {result['rows']:,} rows in {time.monotonic() - started:.1f}s: {result['inserted']:,} added, "
+              f"{result['updated']:,} updated, {result['rejected']:,} rejected")
+        for reject in result["rejects"][:20]:
+            print(f"   ⚠️ row {reject['row']} ({reject['barcode'] or 'no barcode'}): {reject['error']}")
+        if args.rejects and result["rejects"]:
+            with open(args.rejects, "w", newline="", encoding="utf-8") as out:
+                writer = csv.DictWriter(out, fieldnames=["row", "barcode", "error"])
+                writer.writeheader()
+                writer.writerows(result["rejects"])
+            print(f"   ✔ All rejects written to {args.rejects}")
+        print("💡 Running API servers pick up the changes within CATALOG_CACHE_TTL seconds")
+    except CatalogImportError as e:
+        print(f"❌ {e.message}")
+        raise SystemExit(1)
+    except Exception as e:
+        print(f"❌ Import failed: {e}")
+        raise SystemExit(1)
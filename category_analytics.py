@@ -4,8 +4,9 @@ from tabulate import tabulate
 from db import get_engine
 from auth import has_permission
 from report import fetch_report
+from catalog_cache import catalog
 
-engine = get_engine()
+engine = get_engine("analytics")
 
 def category_performance_dashboard():
     """Comprehensive category performance analytics"""
@@ -23,7 +24,7 @@ def category_performance_dashboard():
                     COUNT(p.product_id) as total_products,
                     SUM(p.stock_quantity) as total_stock,
                     COALESCE(SUM(si.quantity * si.unit_price), 0) as total_revenue,
-                    COALESCE(COUNT(DISTINCT s.sale_id), 0) as total_transactions,
+                    COALESCE(COUNT(DISTINCT si.sale_id), 0) as total_transactions,
                     COALESCE(SUM(si.quantity), 0) as total_units_sold,
                     CASE 
                         WHEN COALESCE(SUM(si.quantity), 0) = 0 THEN 0
@@ -36,7 +37,6 @@ def category_performance_dashboard():
                 FROM categories c
                 LEFT JOIN products p ON c.category_id = p.category_id
                 LEFT JOIN sale_items si ON p.product_id = si.product_id
-                LEFT JOIN sales s ON si.sale_id = s.sale_id
                 GROUP BY c.category_id, c.name, c.description
                 ORDER BY total_revenue DESC
             """)).fetchall()
@@ -60,15 +60,14 @@ def category_performance_dashboard():
             monthly_trends = conn.execute(text("""
                 SELECT 
                     c.name as category_name,
-                    TO_CHAR(s.sale_time, 'YYYY-MM') as month,
+                    TO_CHAR(si.sale_time, 'YYYY-MM') as month,
                     SUM(si.quantity * si.unit_price) as monthly_revenue,
                     SUM(si.quantity) as monthly_units
                 FROM categories c
                 JOIN products p ON c.category_id = p.category_id
                 JOIN sale_items si ON p.product_id = si.product_id
-                JOIN sales s ON si.sale_id = s.sale_id
-                WHERE s.sale_time >= CURRENT_DATE - INTERVAL '6 months'
-                GROUP BY c.category_id, c.name, TO_CHAR(s.sale_time, 'YYYY-MM')
+                WHERE si.sale_time >= CURRENT_DATE - INTERVAL '6 months'
+                GROUP BY c.category_id, c.name, TO_CHAR(si.sale_time, 'YYYY-MM')
                 ORDER BY c.name, month DESC
             """)).fetchall()
             
@@ -170,7 +169,7 @@ def set_category_thresholds():
         return
         
     try:
-        with engine.connect() as conn:
+        with engine.begin() as conn:
             categories = conn.execute(text("""
                 SELECT category_id, name, description 
                 FROM categories 
@@ -194,13 +193,15 @@ def set_category_thresholds():
                 UPDATE products 
                 SET low_stock_threshold = :threshold
                 WHERE category_id = :cat_id
-                RETURNING COUNT(*)
+                RETURNING product_id
             """), {"threshold": int(new_threshold), "cat_id": int(category_id)})
             
-            updated_count = result.fetchone()[0]
+            updated_ids = [r[0] for r in result]
+            updated_count = len(updated_ids)
             category_name = next((cat[1] for cat in categories if cat[0] == int(category_id)), "Unknown")
             
             print(f"✅ Updated {updated_count} products in '{category_name}' to threshold: {new_threshold}")
+        catalog.invalidate(updated_ids)
             
     except Exception as e:
         print(f"❌ Error updating category thresholds: {e}")
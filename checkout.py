@@ -0,0 +1,353 @@
+# checkout.py
+"""
+Set-based checkout shared by the API server and the CLI.
+
+A sale is validated and written inside the caller's transaction using a fixed
+number of statements, however many lines the basket has:
+
+    1. check the customer (only when one is given)
+    2. read price and current stock of every product in the cart
+    3. insert the sale header              -- one INSERT ... RETURNING
+    4. record a SALE stock movement per product (stock_ledger.py)
+    5. insert every sale item              -- one INSERT ... SELECT FROM unnest()
+    6. lock the products and re-check their stock, this sale included
+
+Products are locked only for the last step and the commit; the re-check
+under the lock sees every sale committed before, so stock never goes below
+zero. Concurrent sales of the same product still queue for that lock (and
+the sale_items statistics trigger updates one product_sales_daily and one
+product_sales_stats row per product sold), so sales of one hot product
+commit one at a time; only the work before the last step runs in parallel.
+
+complete_sales_batch applies the same approach to a whole batch of sales
+replayed by an offline terminal.
+
+Functions take a synchronous SQLAlchemy Connection. The CLI passes its own
+connection; the API server runs them on its async connection with
+``await conn.run_sync(complete_sale, ...)``.
+"""
+from decimal import Decimal
+from sqlalchemy import text
+from sales_partitions import ensure_partitions
+from stock_ledger import PENDING_BY_PRODUCT, lock_products, locked_stock, record_movements
+
+PAYMENT_METHODS = ('CASH', 'CARD', 'UPI', 'WALLET')
+
+# Price and current stock (stock_ledger.py) of the products in :pids
+PRODUCT_STOCK_QUERY = f"""
+    SELECT p.product_id, p.name, p.price, p.stock_quantity + COALESCE(m.quantity, 0)
+    FROM products p
+    LEFT JOIN {PENDING_BY_PRODUCT} m ON m.product_id = p.product_id
+    WHERE p.product_id = ANY(:pids)
+"""
+
+
+class CheckoutError(Exception):
+    """Raised when a cart cannot be sold. status_code is the HTTP status the API should answer with."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def _merge_lines(items):
+    """Collapse (product_id, quantity) pairs into {product_id: quantity}, keeping first-seen order."""
+    quantities = {}
+    for product_id, quantity in items:
+        if quantity <= 0:
+            raise CheckoutError(f"Quantity for product {product_id} must be positive")
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    if not quantities:
+        raise CheckoutError("Cart is empty")
+    return quantities
+
+
+def _price_lines(rows, quantities):
+    """Match cart quantities against product rows. Returns (lines, problems)."""
+    products = {r[0]: r for r in rows}
+    lines, problems = [], []
+    for product_id, quantity in quantities.items():
+        product = products.get(product_id)
+        if product is None:
+            problems.append((product_id, 404, f"Product {product_id} not found"))
+            continue
+        _, name, price, stock = product
+        if stock < quantity:
+            problems.append((product_id, 400, f"Only {stock} units in stock for {name}"))
+            continue
+        lines.append({
+            'product_id': product_id,
+            'name': name,
+            'quantity': quantity,
+            'price': price,
+            'subtotal': price * quantity,
+        })
+    return lines, problems
+
+
+def price_cart(conn, items):
+    """
+    Price a cart in one query without locking anything (used for previews).
+    Returns {"lines": [...], "total": Decimal, "problems": [(product_id, message), ...]}.
+    """
+    quantities = _merge_lines(items)
+    rows = conn.execute(text(PRODUCT_STOCK_QUERY), {"pids": list(quantities)}).fetchall()
+
+    lines, problems = _price_lines(rows, quantities)
+    return {
+        "lines": lines,
+        "total": sum((line['subtotal'] for line in lines), Decimal('0')),
+        "problems": [(product_id, message) for product_id, _, message in problems],
+    }
+
+
+def complete_sale(conn, items, payment_method, employee_id, customer_id=None):
+    """
+    Validate and record a sale in the caller's transaction.
+
+    items is an iterable of (product_id, quantity) pairs. Raises CheckoutError
+    if the cart cannot be sold: before anything is written for unknown
+    products or customers and plainly short stock, or after the sale has been
+    written when the re-check under the lock finds a product oversold, so the
+    caller must roll its transaction back on CheckoutError.
+    Returns {"sale_id", "total", "lines", "stock_levels"}.
+    """
+    quantities = _merge_lines(items)
+    if payment_method not in PAYMENT_METHODS:
+        raise CheckoutError(f"Invalid payment method {payment_method!r}")
+
+    if customer_id is not None:
+        res = conn.execute(text("SELECT 1 FROM customers WHERE customer_id = :cid"), {"cid": customer_id})
+        if res.fetchone() is None:
+            raise CheckoutError("Customer not found", status_code=404)
+
+    # Unlocked: rejects what is plainly out of stock before anything is written
+    rows = conn.execute(text(PRODUCT_STOCK_QUERY), {"pids": list(quantities)}).fetchall()
+
+    lines, problems = _price_lines(rows, quantities)
+    if problems:
+        _, status_code, message = problems[0]
+        raise CheckoutError(message, status_code=status_code)
+
+    total = sum((line['subtotal'] for line in lines), Decimal('0'))
+
+    sale_id, sale_time = conn.execute(text("""
+        INSERT INTO sales (total_amount, payment_method, customer_id, employee_id)
+        VALUES (:total, :pm, :cid, :eid)
+        RETURNING sale_id, sale_time
+    """), {
+        "total": total,
+        "pm": payment_method,
+        "cid": customer_id,
+        "eid": employee_id
+    }).one()
+
+    pids = [line['product_id'] for line in lines]
+    qtys = [line['quantity'] for line in lines]
+
+    record_movements(conn, "SALE", pids, [-qty for qty in qtys], [sale_id] * len(pids))
+
+    # sale_items is partitioned by its sale's sale_time, like sales
+    conn.execute(text("""
+        INSERT INTO sale_items (sale_id, sale_time, product_id, quantity, unit_price)
+        SELECT CAST(:sale_id AS INTEGER), CAST(:sale_time AS TIMESTAMP), v.product_id, v.quantity, v.unit_price
+        FROM unnest(CAST(:pids AS INTEGER[]), CAST(:qtys AS INTEGER[]), CAST(:prices AS NUMERIC[]))
+             AS v(product_id, quantity, unit_price)
+    """), {
+        "sale_id": sale_id,
+        "sale_time": sale_time,
+        "pids": pids,
+        "qtys": qtys,
+        "prices": [line['price'] for line in lines]
+    })
+
+    # Last, so the products stay locked only until commit. The lock waits for sales of these
+    # products that are committing; the re-read then includes them and this sale.
+    stock = locked_stock(conn, pids)
+    for line in lines:
+        if stock[line['product_id']] < 0:
+            raise CheckoutError(f"Only {stock[line['product_id']] + line['quantity']} units in stock for "
+                                f"{line['name']}")
+
+    return {
+        "sale_id": sale_id,
+        "total": total,
+        "lines": lines,
+        "stock_levels": stock,
+    }
+
+
+def _naive_local(value):
+    """sales.sale_time is timestamp without time zone; store aware datetimes as server-local time."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def complete_sales_batch(conn, sales):
+    """
+    Record a batch of sales replayed by an offline terminal, in the caller's transaction.
+
+    sales is a list of dicts with client_sale_id, items [(product_id, quantity, unit_price or None)],
+    payment_method, employee_id and optional customer_id / sale_time. These sales already
+    happened at the till, so stock is decremented even if it goes below zero; a sale is only
+    rejected when it references an unknown product, customer or employee or is malformed.
+    A client_sale_id that was already recorded is reported as a duplicate, which makes
+    replaying the same batch safe.
+
+    Uses a fixed number of statements whatever the batch size and returns one result dict
+    per input sale, in input order.
+    """
+    results = [{"client_sale_id": sale.get('client_sale_id'), "status": None, "sale_id": None, "total": None,
+                "error": None}
+               for sale in sales]
+
+    def reject(index, message):
+        results[index]["status"] = "rejected"
+        results[index]["error"] = message
+
+    # Structural checks need no database access
+    seen = set()
+    for i, sale in enumerate(sales):
+        client_id = sale.get('client_sale_id')
+        if not client_id:
+            reject(i, "client_sale_id is required")
+        elif client_id in seen:
+            reject(i, f"client_sale_id {client_id!r} appears more than once in the batch")
+        elif sale['payment_method'] not in PAYMENT_METHODS:
+            reject(i, f"Invalid payment method {sale['payment_method']!r}")
+        elif not sale['items']:
+            reject(i, "Cart is empty")
+        elif any(quantity <= 0 for _, quantity, _ in sale['items']):
+            reject(i, "Quantities must be positive")
+        seen.add(client_id)
+
+    pending = [i for i, r in enumerate(results) if r["status"] is None]
+    if not pending:
+        return results
+
+    existing = dict(conn.execute(text("""
+        SELECT client_sale_id, sale_id FROM sale_client_ids WHERE client_sale_id = ANY(:ids)
+    """), {"ids": [sales[i]['client_sale_id'] for i in pending]}).fetchall())
+
+    customer_ids = {sales[i].get('customer_id') for i in pending} - {None}
+    known_customers = set()
+    if customer_ids:
+        known_customers = {r[0] for r in conn.execute(text("""
+            SELECT customer_id FROM customers WHERE customer_id = ANY(:cids)
+        """), {"cids": list(customer_ids)})}
+
+    employee_ids = {sales[i]['employee_id'] for i in pending}
+    known_employees = {r[0] for r in conn.execute(text("""
+        SELECT employee_id FROM employees WHERE employee_id = ANY(:eids)
+    """), {"eids": list(employee_ids - {None})})}
+
+    product_ids = {pid for i in pending for pid, _, _ in sales[i]['items']}
+    prices = dict(conn.execute(text("""
+        SELECT product_id, price
+        FROM products
+        WHERE product_id = ANY(:pids)
+    """), {"pids": list(product_ids)}).fetchall())
+
+    to_insert = []
+    for i in pending:
+        sale = sales[i]
+        if sale['client_sale_id'] in existing:
+            results[i]["status"] = "duplicate"
+            results[i]["sale_id"] = existing[sale['client_sale_id']]
+            continue
+        if sale.get('customer_id') is not None and sale['customer_id'] not in known_customers:
+            reject(i, "Customer not found")
+            continue
+        if sale['employee_id'] not in known_employees:
+            reject(i, "Employee not found")
+            continue
+        missing = [pid for pid, _, _ in sale['items'] if pid not in prices]
+        if missing:
+            reject(i, f"Product {missing[0]} not found")
+            continue
+        lines = [(pid, qty, Decimal(str(unit_price)) if unit_price is not None else prices[pid])
+                 for pid, qty, unit_price in sale['items']]
+        to_insert.append((i, lines, sum((qty * price for _, qty, price in lines), Decimal('0'))))
+
+    if not to_insert:
+        return results
+
+    # Claim each client_sale_id first. Its primary key makes a concurrent replay of the same
+    # sale wait for this transaction, then skip the sale (ON CONFLICT) once this one commits.
+    claimed = {r[0]: (r[1], r[2]) for r in conn.execute(text("""
+        INSERT INTO sale_client_ids (client_sale_id, sale_id, sale_time)
+        SELECT v.client_sale_id, nextval('sales_sale_id_seq'), COALESCE(v.sale_time, CURRENT_TIMESTAMP)
+        FROM unnest(CAST(:client_ids AS VARCHAR[]), CAST(:times AS TIMESTAMP[])) AS v(client_sale_id, sale_time)
+        ON CONFLICT (client_sale_id) DO NOTHING
+        RETURNING client_sale_id, sale_id, sale_time
+    """), {
+        "client_ids": [sales[i]['client_sale_id'] for i, _, _ in to_insert],
+        "times": [_naive_local(sales[i].get('sale_time')) for i, _, _ in to_insert],
+    })}
+    for i, _, _ in to_insert:
+        if sales[i]['client_sale_id'] not in claimed:
+            results[i]["status"] = "duplicate"
+    to_insert = [entry for entry in to_insert if sales[entry[0]]['client_sale_id'] in claimed]
+    if claimed:
+        # Sales replayed from long ago may fall in months that have no partition yet
+        for month in sorted({sale_time.date().replace(day=1) for _, sale_time in claimed.values()}):
+            ensure_partitions(conn, month, month)
+        conn.execute(text("""
+            INSERT INTO sales (sale_id, client_sale_id, sale_time, total_amount, payment_method, customer_id,
+                               employee_id)
+            SELECT v.sale_id, v.client_sale_id, v.sale_time, v.total_amount, v.payment_method, v.customer_id,
+                   v.employee_id
+            FROM unnest(CAST(:sale_ids AS INTEGER[]), CAST(:client_ids AS VARCHAR[]), CAST(:times AS TIMESTAMP[]),
+                        CAST(:totals AS NUMERIC[]), CAST(:pms AS VARCHAR[]), CAST(:cids AS INTEGER[]),
+                        CAST(:eids AS INTEGER[]))
+                 AS v(sale_id, client_sale_id, sale_time, total_amount, payment_method, customer_id, employee_id)
+        """), {
+            "sale_ids": [claimed[sales[i]['client_sale_id']][0] for i, _, _ in to_insert],
+            "client_ids": [sales[i]['client_sale_id'] for i, _, _ in to_insert],
+            "times": [claimed[sales[i]['client_sale_id']][1] for i, _, _ in to_insert],
+            "totals": [total for _, _, total in to_insert],
+            "pms": [sales[i]['payment_method'] for i, _, _ in to_insert],
+            "cids": [sales[i].get('customer_id') for i, _, _ in to_insert],
+            "eids": [sales[i]['employee_id'] for i, _, _ in to_insert],
+        })
+
+    item_sale_ids, item_times, item_pids, item_qtys, item_prices = [], [], [], [], []
+    for i, lines, total in to_insert:
+        sale_id, sale_time = claimed[sales[i]['client_sale_id']]
+        results[i]["status"] = "created"
+        results[i]["sale_id"] = sale_id
+        results[i]["total"] = total
+        for pid, qty, price in lines:
+            item_sale_ids.append(sale_id)
+            item_times.append(sale_time)
+            item_pids.append(pid)
+            item_qtys.append(qty)
+            item_prices.append(price)
+
+    if item_sale_ids:
+        # One movement per product for the whole batch, referencing the sale when only one sale
+        # sold it; no product row is rewritten. Recorded before the items, in the order checkouts
+        # and backups take these tables (backup.py).
+        sold, references = {}, {}
+        for pid, qty, sale_id in zip(item_pids, item_qtys, item_sale_ids):
+            sold[pid] = sold.get(pid, 0) + qty
+            references[pid] = sale_id if references.get(pid, sale_id) == sale_id else None
+        sold_ids = sorted(sold)
+        record_movements(conn, "SALE", sold_ids, [-sold[pid] for pid in sold_ids],
+                         [references[pid] for pid in sold_ids])
+        conn.execute(text("""
+            INSERT INTO sale_items (sale_id, sale_time, product_id, quantity, unit_price)
+            SELECT v.sale_id, v.sale_time, v.product_id, v.quantity, v.unit_price
+            FROM unnest(CAST(:sale_ids AS INTEGER[]), CAST(:times AS TIMESTAMP[]), CAST(:pids AS INTEGER[]),
+                        CAST(:qtys AS INTEGER[]), CAST(:prices AS NUMERIC[]))
+                 AS v(sale_id, sale_time, product_id, quantity, unit_price)
+        """), {"sale_ids": item_sale_ids, "times": item_times, "pids": item_pids, "qtys": item_qtys,
+               "prices": item_prices})
+
+        # Offline sales may take stock below zero, but still commit under the product locks like
+        # every stock writer
+        lock_products(conn, sold_ids)
+
+    return results
@@ -4,14 +4,14 @@ from auth import login, logout, get_current_role, get_current_name
 
 # Import all management modules
 try:
-    from product_management import add_product, view_products, set_stock_thresholds
+    from product_management import add_product, view_products, set_stock_thresholds, import_catalog
     from sales_management import process_sale
     from employee_management import manage_employees
     from analytics import notification_center, alert_dashboard
     from report import enhanced_report_mode
     from inventory_management import restock_products, bulk_stock_update
     from customer_management import manage_customers
-    from system_admin import system_health_check, system_backup, purge_old_data
+    from system_admin import system_health_check, system_backup, system_restore, purge_old_data
     from inventory_optimization import apply_clearance_pricing,inventory_health_dashboard
     # New analytics modules
     from category_analytics import category_performance_dashboard, set_category_thresholds
@@ -129,6 +129,8 @@ def main_menu():
             print("21. 🚪 Logout / Exit")
             print("22. 🏥 Inventory Health Dashboard")
             print("23. 🎪 Apply Clearance Pricing")
+            print("24. ♻️ System Restore")
+            print("25. 📥 Import Products (CSV)")
             choice = input("Enter choice: ").strip()
             if choice == '1':
                 add_product()
@@ -178,6 +180,10 @@ def main_menu():
                 
                 apply_clearance_pricing()  
                 break
+            elif choice == '24':
+                system_restore()
+            elif choice == '25':
+                import_catalog()
             else:
                 print("❌ Invalid choice, try again!")
 
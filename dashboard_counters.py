@@ -0,0 +1,169 @@
+# dashboard_counters.py
+"""
+Dashboard counters maintained incrementally by database triggers.
+
+Triggers on sales and products (attached_assets/migrations) add each
+statement's net change to the dashboard_counters table in the same
+transaction, split across 16 shard rows per counter so concurrent checkouts
+don't queue on one row. Reading a counter sums its shards.
+
+Counters:
+    products, low_stock, inventory_units        period 'all'
+    sales_count, sales_revenue                  period 'all' and per sale day
+
+Drift (e.g. rows changed while triggers were disabled, TRUNCATE) is fixed by
+reconcile(), which also folds the shards back into one row and drops old
+day counters. Run it periodically:
+
+    python dashboard_counters.py              # once
+    python dashboard_counters.py --every 300  # every 5 minutes
+"""
+import argparse
+import os
+import time
+from decimal import Decimal
+from sqlalchemy import text
+from db import get_engine
+
+# Day counters older than this are dropped by compact(); only today's is read
+KEEP_DAYS = int(os.getenv("DASHBOARD_COUNTER_KEEP_DAYS", "35"))
+# reconcile() re-checks the day counters of this many recent days
+RECONCILE_DAYS = int(os.getenv("DASHBOARD_COUNTER_RECONCILE_DAYS", "2"))
+
+_TRUTH_ALL = """
+    SELECT 'products' AS counter_name, 'all' AS counter_period, COUNT(*)::numeric AS value FROM products
+    UNION ALL
+    SELECT 'low_stock', 'all', COUNT(*) FILTER (WHERE stock_quantity <= low_stock_threshold) FROM products
+    UNION ALL
+    SELECT 'inventory_units', 'all', COALESCE(SUM(stock_quantity), 0) FROM products
+    UNION ALL
+    SELECT 'sales_count', 'all', COUNT(*) FROM sales
+    UNION ALL
+    SELECT 'sales_revenue', 'all', COALESCE(SUM(total_amount), 0) FROM sales
+"""
+
+_TRUTH_DAYS = """
+    SELECT c.counter_name, to_char(d.day, 'YYYY-MM-DD') AS counter_period, c.value
+    FROM generate_series(CURRENT_DATE - (:days - 1), CURRENT_DATE, interval '1 day') AS d(day)
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*)::numeric AS n, COALESCE(SUM(total_amount), 0) AS revenue
+        FROM sales
+        WHERE sale_time >= d.day AND sale_time < d.day + interval '1 day'
+    ) s
+    CROSS JOIN LATERAL (VALUES ('sales_count', s.n), ('sales_revenue', s.revenue)) AS c(counter_name, value)
+"""
+
+
+def read_counters(conn):
+    """Returns the dashboard figures from the counters table (a few index lookups)"""
+    rows = conn.execute(text("""
+        SELECT counter_name, counter_period = 'all' AS lifetime, SUM(value)
+        FROM dashboard_counters
+        WHERE counter_name IN ('products', 'low_stock', 'inventory_units', 'sales_count', 'sales_revenue')
+          AND counter_period IN ('all', to_char(CURRENT_DATE, 'YYYY-MM-DD'))
+        GROUP BY counter_name, counter_period
+    """)).fetchall()
+    values = {(name if lifetime else f"today_{name}"): value for name, lifetime, value in rows}
+    get = lambda name: values.get(name, Decimal("0"))
+    return {
+        "total_products": int(get("products")),
+        "low_stock_count": int(get("low_stock")),
+        "inventory_units": int(get("inventory_units")),
+        "total_sales": int(get("sales_count")),
+        "total_revenue": get("sales_revenue"),
+        "today_sales_count": int(get("today_sales_count")),
+        "today_revenue": get("today_sales_revenue"),
+    }
+
+
+def reconcile(engine=None, days=RECONCILE_DAYS):
+    """
+    Recomputes the counters from the base tables and adds the difference.
+
+    Truth and counters are read in one REPEATABLE READ snapshot, so the
+    difference is exact for that moment; it is then added as a delta rather
+    than overwriting, which keeps increments committed in the meantime.
+    Returns [(counter_name, counter_period, correction), ...].
+    """
+    engine = engine or get_engine("analytics")
+    with engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="REPEATABLE READ")
+        with conn.begin():
+            truth = {(r[0], r[1]): r[2] for r in conn.execute(text(_TRUTH_ALL))}
+            truth.update({(r[0], r[1]): r[2] for r in conn.execute(text(_TRUTH_DAYS), {"days": days})})
+            current = {(r[0], r[1]): r[2] for r in conn.execute(text("""
+                SELECT counter_name, counter_period, SUM(value)
+                FROM dashboard_counters
+                WHERE counter_period = 'all'
+                   OR counter_period >= to_char(CURRENT_DATE - (:days - 1), 'YYYY-MM-DD')
+                GROUP BY counter_name, counter_period
+            """), {"days": days})}
+
+    corrections = [(name, period, value - current.get((name, period), 0))
+                   for (name, period), value in truth.items()
+                   if value != current.get((name, period), 0)]
+    if corrections:
+        with engine.begin() as conn:
+            conn.execute(text("""
+                INSERT INTO dashboard_counters (counter_name, counter_period, shard, value)
+                SELECT * FROM unnest(CAST(:names AS VARCHAR[]), CAST(:periods AS VARCHAR[]),
+                                     CAST(:shards AS SMALLINT[]), CAST(:deltas AS NUMERIC[]))
+                ON CONFLICT (counter_name, counter_period, shard)
+                DO UPDATE SET value = dashboard_counters.value + EXCLUDED.value
+            """), {
+                "names": [c[0] for c in corrections],
+                "periods": [c[1] for c in corrections],
+                "shards": [0] * len(corrections),
+                "deltas": [c[2] for c in corrections],
+            })
+    return corrections
+
+
+def compact(engine=None, keep_days=KEEP_DAYS):
+    """Folds every counter's shards into shard 0 and drops day counters older than keep_days"""
+    engine = engine or get_engine("analytics")
+    with engine.begin() as conn:
+        conn.execute(text("""
+            DELETE FROM dashboard_counters
+            WHERE counter_period <> 'all'
+              AND counter_period < to_char(CURRENT_DATE - :keep_days, 'YYYY-MM-DD')
+        """), {"keep_days": keep_days})
+        conn.execute(text("""
+            WITH moved AS (
+                DELETE FROM dashboard_counters WHERE shard <> 0
+                RETURNING counter_name, counter_period, value
+            )
+            INSERT INTO dashboard_counters (counter_name, counter_period, shard, value)
+            SELECT counter_name, counter_period, 0, SUM(value)
+            FROM moved
+            GROUP BY counter_name, counter_period
+            ON CONFLICT (counter_name, counter_period, shard)
+            DO UPDATE SET value = dashboard_counters.value + EXCLUDED.value
+        """))
+
+
+def run_maintenance(engine=None):
+    """One reconciliation pass: fix drift, then compact"""
+    corrections = reconcile(engine)
+    compact(engine)
+    return corrections
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile and compact dashboard counters")
+    parser.add_argument("--every", type=int, default=0, help="repeat every N seconds (default: run once)")
+    args = parser.parse_args()
+
+    while True:
+        try:
+            corrections = run_maintenance()
+            if corrections:
+                for name, period, delta in corrections:
+                    print(f"⚠️ Corrected {name} [{period}] by {delta}")
+            else:
+                print("✅ Dashboard counters match the base tables")
+        except Exception as e:
+            print(f"❌ Counter reconciliation failed: {e}")
+        if not args.every:
+            break
+        time.sleep(args.every)
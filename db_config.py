@@ -1,6 +1,12 @@
 import os
+import threading
+import time
 from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 import urllib.parse
+from query_log import instrument
 
 # PostgreSQL Configuration (using environment variables)
 DB_HOST = os.getenv("PGHOST", "localhost")
@@ -12,6 +18,22 @@ DB_PORT = os.getenv("PGPORT", "5432")
 # URL encode special characters in password for SQLAlchemy
 encoded_pass = urllib.parse.quote_plus(DB_PASS)
 CONNECTION_STRING = f"postgresql+psycopg2://{DB_USER}:{encoded_pass}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+ASYNC_CONNECTION_STRING = f"postgresql+asyncpg://{DB_USER}:{encoded_pass}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+
+# Named connection pools. Every module in a process shares one engine per pool:
+#   oltp      - checkout, stock and CRUD paths (short transactions)
+#   analytics - reports and dashboards (few, long-running queries)
+# Each setting can be overridden for all pools (DB_POOL_SIZE=...) or for one
+# pool (DB_ANALYTICS_POOL_SIZE=...). A process opens at most
+# pool_size + max_overflow connections per pool and engine flavour (sync/async).
+POOL_DEFAULTS = {
+    "oltp": {"pool_size": 10, "max_overflow": 10, "pool_recycle": 1800, "pool_timeout": 10},
+    "analytics": {"pool_size": 2, "max_overflow": 2, "pool_recycle": 1800, "pool_timeout": 60},
+}
+
+_engines = {}
+_async_engines = {}
+_registry_lock = threading.Lock()
 
 
 def get_connection_string():
@@ -19,11 +41,162 @@ def get_connection_string():
     return CONNECTION_STRING
 
 
-def get_engine():
-    """Creates and returns a SQLAlchemy engine instance"""
-    try:
-        engine = create_engine(get_connection_string(), echo=False, pool_pre_ping=True)
-        return engine
-    except Exception as e:
-        print(f"Error creating SQLAlchemy engine: {e}")
-        return None
+def get_async_connection_string():
+    """Returns the PostgreSQL connection string for the SQLAlchemy asyncio (asyncpg) engine"""
+    return ASYNC_CONNECTION_STRING
+
+
+def pool_settings(name):
+    """Returns pool sizing for a named pool, applying DB_POOL_* / DB_<NAME>_POOL_* overrides"""
+    if name not in POOL_DEFAULTS:
+        raise ValueError(f"Unknown connection pool {name!r}; expected one of {', '.join(POOL_DEFAULTS)}")
+    env_names = {
+        "pool_size": "POOL_SIZE",
+        "max_overflow": "MAX_OVERFLOW",
+        "pool_recycle": "POOL_RECYCLE",
+        "pool_timeout": "POOL_TIMEOUT",
+    }
+    settings = {}
+    for key, default in POOL_DEFAULTS[name].items():
+        suffix = env_names[key]
+        value = os.getenv(f"DB_{name.upper()}_{suffix}", os.getenv(f"DB_{suffix}", default))
+        settings[key] = int(value)
+    return settings
+
+
+class PoolStats:
+    """Running checkout / wait counters for one pool (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def start_wait(self):
+        with self._lock:
+            self.waiting += 1
+
+    def record_checkout(self, waited, timed_out=False):
+        with self._lock:
+            self.waiting -= 1
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+            }
+
+
+class _TimedPoolMixin:
+    """Times every connection checkout. `stats` is bound per pool by _timed_pool_class."""
+    stats = None
+
+    def _do_get(self):
+        self.stats.start_wait()
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record_checkout(time.perf_counter() - start, timed_out=True)
+            raise
+        except Exception:
+            self.stats.record_checkout(time.perf_counter() - start)
+            raise
+        self.stats.record_checkout(time.perf_counter() - start)
+        return conn
+
+
+def _timed_pool_class(base, stats):
+    # A class per pool keeps the stats attached when SQLAlchemy recreates the pool (dispose())
+    return type(f"Timed{base.__name__}", (_TimedPoolMixin, base), {"stats": stats})
+
+
+def _engine_kwargs(name, pool_base):
+    settings = pool_settings(name)
+    return dict(
+        echo=False,
+        pool_pre_ping=True,
+        poolclass=_timed_pool_class(pool_base, PoolStats()),
+        **settings,
+    )
+
+
+def get_engine(name="oltp"):
+    """Returns the process-wide SQLAlchemy engine for the named pool, creating it on first use"""
+    with _registry_lock:
+        if name not in _engines:
+            kwargs = _engine_kwargs(name, QueuePool)
+            try:
+                _engines[name] = instrument(create_engine(get_connection_string(), **kwargs), name)
+            except Exception as e:
+                print(f"Error creating SQLAlchemy engine: {e}")
+                return None
+        return _engines[name]
+
+
+def get_async_engine(name="oltp"):
+    """Returns the process-wide AsyncEngine (asyncpg) for the named pool, for use inside async code"""
+    with _registry_lock:
+        if name not in _async_engines:
+            kwargs = _engine_kwargs(name, AsyncAdaptedQueuePool)
+            try:
+                _async_engines[name] = create_async_engine(get_async_connection_string(), **kwargs)
+                instrument(_async_engines[name].sync_engine, name)
+            except Exception as e:
+                print(f"Error creating SQLAlchemy async engine: {e}")
+                return None
+        return _async_engines[name]
+
+
+def _describe_pool(name, driver, pool):
+    settings = pool_settings(name)
+    return {
+        "pool": name,
+        "driver": driver,
+        "size": pool.size(),
+        "max_overflow": settings["max_overflow"],
+        "max_connections": settings["pool_size"] + settings["max_overflow"],
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        **type(pool).stats.snapshot(),
+    }
+
+
+def pool_stats():
+    """Returns live statistics for every pool opened by this process"""
+    with _registry_lock:
+        sync_engines = list(_engines.items())
+        async_engines = list(_async_engines.items())
+    stats = [_describe_pool(name, "psycopg2", engine.pool) for name, engine in sync_engines]
+    stats += [_describe_pool(name, "asyncpg", engine.sync_engine.pool) for name, engine in async_engines]
+    return stats
+
+
+def dispose_engines():
+    """Closes every pooled connection held by the synchronous engines"""
+    with _registry_lock:
+        engines = list(_engines.values())
+    for engine in engines:
+        engine.dispose()
+
+
+async def dispose_async_engines():
+    """Closes every pooled connection held by the async engines"""
+    with _registry_lock:
+        engines = list(_async_engines.values())
+    for engine in engines:
+        await engine.dispose()
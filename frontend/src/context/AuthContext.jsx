@@ -1,4 +1,5 @@
 import { createContext, useState, useContext, useEffect } from 'react';
+import { auth } from '../services/api';
 
 const AuthContext = createContext(null);
 
@@ -19,7 +20,9 @@ export const AuthProvider = ({ children }) => {
     localStorage.setItem('user', JSON.stringify(userData));
   };
 
-  const logout = () => {
+  const logout = async () => {
+    // Revoke the token server-side before forgetting it
+    await auth.logout().catch(() => {});
     setUser(null);
     localStorage.removeItem('user');
   };
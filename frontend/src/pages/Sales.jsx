@@ -13,6 +13,7 @@ function Sales() {
   const [cart, setCart] = useState([]);
   const [selectedCustomer, setSelectedCustomer] = useState('');
   const [paymentMethod, setPaymentMethod] = useState('CASH');
+  const [barcode, setBarcode] = useState('');
 
   useEffect(() => {
     loadData();
@@ -48,6 +49,19 @@ function Sales() {
     }
   };
 
+  const handleScan = async (e) => {
+    e.preventDefault();
+    const code = barcode.trim();
+    if (!code) return;
+    try {
+      const res = await products.getByBarcode(code);
+      addToCart(res.data);
+      setBarcode('');
+    } catch (error) {
+      alert('Barcode not found: ' + (error.response?.data?.detail || error.message));
+    }
+  };
+
   const updateQuantity = (productId, newQuantity) => {
     if (newQuantity <= 0) {
       setCart(cart.filter(item => item.product_id !== productId));
@@ -79,7 +93,6 @@ function Sales() {
         })),
         payment_method: paymentMethod,
         customer_id: selectedCustomer ? parseInt(selectedCustomer) : null,
-        employee_id: user.employee_id,
       };
 
       await sales.create(saleData);
@@ -144,6 +157,16 @@ function Sales() {
             <div className="sale-form-container">
               <div className="products-section">
                 <h3>Select Products</h3>
+                <form className="barcode-scan" onSubmit={handleScan}>
+                  <input
+                    type="text"
+                    placeholder="Scan or type barcode"
+                    value={barcode}
+                    onChange={(e) => setBarcode(e.target.value)}
+                    autoFocus
+                  />
+                  <button type="submit" className="btn-small">Add</button>
+                </form>
                 <div className="product-grid">
                   {productList.map((product) => (
                     <div key={product.product_id} className="product-card">
@@ -9,44 +9,106 @@ const api = axios.create({
   },
 });
 
+// Every request carries the session token issued at login; a 401 means it
+// expired or was logged out, so drop the stored session and start over.
+api.interceptors.request.use((config) => {
+  const stored = localStorage.getItem('user');
+  const token = stored && JSON.parse(stored).access_token;
+  if (token) {
+    config.headers.Authorization = `Bearer ${token}`;
+  }
+  return config;
+});
+
+api.interceptors.response.use(
+  (response) => response,
+  (error) => {
+    if (error.response?.status === 401 && !error.config.url.startsWith('/auth/')) {
+      localStorage.removeItem('user');
+      window.location.assign('/login');
+    }
+    return Promise.reject(error);
+  }
+);
+
+// List endpoints are keyset-paginated: each response carries `next_cursor`
+// (null on the last page). fetchPages yields one page of rows at a time so
+// callers can stream through large lists; fetchAll collects every page into
+// the same `{ data: { [key]: rows } }` shape a single response has.
+const PAGE_SIZE = 1000;
+
+export async function* fetchPages(url, key, params = {}) {
+  let cursor = null;
+  do {
+    const res = await api.get(url, { params: { limit: PAGE_SIZE, ...params, ...(cursor && { cursor }) } });
+    yield res.data[key];
+    cursor = res.data.next_cursor;
+  } while (cursor);
+}
+
+export const fetchAll = async (url, key, params = {}) => {
+  const rows = [];
+  for await (const page of fetchPages(url, key, params)) {
+    rows.push(...page);
+  }
+  return { data: { [key]: rows, next_cursor: null } };
+};
+
+const getPage = (url, limit, cursor) =>
+  api.get(url, { params: { limit, ...(cursor && { cursor }) } });
+
+// Whole-list export, streamed by the server as 'csv' or 'ndjson'
+const exportList = (url, format = 'csv') =>
+  api.get(url, { params: { format }, responseType: 'blob' });
+
 export const auth = {
   login: (credentials) => api.post('/auth/login', credentials),
+  logout: () => api.post('/auth/logout'),
 };
 
 export const products = {
-  getAll: () => api.get('/products'),
+  getAll: () => fetchAll('/products', 'products'),
+  pages: () => fetchPages('/products', 'products'),
+  export: (format) => exportList('/products', format),
+  getByBarcode: (code) => api.get(`/products/by-barcode/${encodeURIComponent(code)}`),
+  getByBarcodes: (barcodes) => api.post('/products/by-barcode', { barcodes }),
   add: (product) => api.post('/products', product),
   updateStock: (productId, quantity) => 
     api.put(`/products/${productId}/stock`, { product_id: productId, quantity }),
 };
 
 export const categories = {
-  getAll: () => api.get('/categories'),
+  getAll: () => fetchAll('/categories', 'categories'),
   add: (category) => api.post('/categories', category),
   update: (categoryId, category) => api.put(`/categories/${categoryId}`, category),
   delete: (categoryId) => api.delete(`/categories/${categoryId}`),
 };
 
 export const suppliers = {
-  getAll: () => api.get('/suppliers'),
+  getAll: () => fetchAll('/suppliers', 'suppliers'),
   add: (supplier) => api.post('/suppliers', supplier),
   update: (supplierId, supplier) => api.put(`/suppliers/${supplierId}`, supplier),
   delete: (supplierId) => api.delete(`/suppliers/${supplierId}`),
 };
 
 export const sales = {
-  getAll: (limit = 50) => api.get(`/sales?limit=${limit}`),
+  getAll: (limit = 50, cursor = null) => getPage('/sales', limit, cursor),
+  pages: () => fetchPages('/sales', 'sales'),
+  export: (format) => exportList('/sales', format),
   getDetails: (saleId) => api.get(`/sales/${saleId}`),
   create: (sale) => api.post('/sales', sale),
+  createBatch: (salesBatch) => api.post('/sales/batch', { sales: salesBatch }),
 };
 
 export const customers = {
-  getAll: () => api.get('/customers'),
+  getAll: () => fetchAll('/customers', 'customers'),
+  pages: () => fetchPages('/customers', 'customers'),
+  export: (format) => exportList('/customers', format),
   add: (customer) => api.post('/customers', customer),
 };
 
 export const employees = {
-  getAll: () => api.get('/employees'),
+  getAll: () => fetchAll('/employees', 'employees'),
   add: (employee) => api.post('/employees', employee),
 };
 
@@ -61,12 +123,12 @@ export const reports = {
 };
 
 export const notifications = {
-  getAll: () => api.get('/notifications'),
+  getAll: (limit = 50, cursor = null) => getPage('/notifications', limit, cursor),
   update: (notificationId, status) => api.put(`/notifications/${notificationId}`, { status }),
 };
 
 export const purchaseOrders = {
-  getAll: () => api.get('/purchase-orders'),
+  getAll: (limit = 50, cursor = null) => getPage('/purchase-orders', limit, cursor),
   getDetails: (orderId) => api.get(`/purchase-orders/${orderId}`),
   create: (order) => api.post('/purchase-orders', order),
   receive: (orderId) => api.put(`/purchase-orders/${orderId}/receive`),
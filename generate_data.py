@@ -0,0 +1,468 @@
+# generate_data.py
+"""
+Synthetic data generator for scale testing.
+
+Fills every table of the schema (categories, suppliers, products, customers,
+employees, sales, sale_items, purchase_orders, notifications) with a
+reproducible dataset: the same --seed, scale and --end always produce the
+same rows.
+
+Distributions:
+  * product popularity is Zipfian (--zipf exponent over a shuffled ranking),
+    so a few hundred SKUs carry most of the volume, as in a real store;
+    repeat customers are Zipfian too;
+  * sales per day follow a yearly season (peak late December), a weekly
+    cycle (busy weekends), a month-start payday bump, slow growth and
+    day-to-day noise; within a day, sales follow opening-hours traffic with
+    lunch and evening peaks;
+  * basket sizes are geometric around --basket-size, mostly one unit per line.
+
+Loading goes through COPY in one transaction, which replaces the existing
+data (--replace is required when there is any). While loading, foreign keys
+and secondary indexes on sales / sale_items are dropped and re-created at
+the end, and user triggers are disabled; the rollups, per-product statistics
+and dashboard counters they maintain are rebuilt from the loaded rows
+afterwards. Restart a running API server afterwards (catalog cache).
+
+    python generate_data.py --scale small --replace
+    python generate_data.py --scale large --seed 7 --end 2025-12-31 --replace
+    python generate_data.py --products 100000 --sale-items 50000000 --days 730 --replace
+
+Every generated employee logs in with --password; the admin's username is 'admin'.
+"""
+import argparse
+import datetime
+import io
+import itertools
+import math
+import random
+import time
+from db import get_connection, get_engine
+from checkout import PAYMENT_METHODS
+from passwords import hash_password
+import dashboard_counters
+import product_sales_stats
+import sales_rollups
+
+SCALES = {
+    "small": {"products": 2_000, "suppliers": 50, "customers": 5_000, "employees": 12,
+              "sale_items": 200_000, "days": 180},
+    "medium": {"products": 20_000, "suppliers": 300, "customers": 100_000, "employees": 40,
+               "sale_items": 5_000_000, "days": 365},
+    "large": {"products": 100_000, "suppliers": 1_000, "customers": 1_000_000, "employees": 150,
+              "sale_items": 50_000_000, "days": 730},
+}
+
+# (name, median price) - prices are log-normal around the median
+CATEGORIES = [
+    ("Fruits & Vegetables", 60), ("Dairy & Eggs", 55), ("Bakery", 45), ("Meat & Seafood", 320),
+    ("Frozen Foods", 180), ("Rice & Grains", 120), ("Pulses & Lentils", 110), ("Oils & Ghee", 190),
+    ("Spices & Masalas", 70), ("Snacks", 40), ("Beverages", 65), ("Tea & Coffee", 210),
+    ("Breakfast & Cereals", 160), ("Sweets & Chocolates", 90), ("Baby Care", 350), ("Personal Care", 140),
+    ("Household Cleaning", 130), ("Kitchenware", 420), ("Pet Supplies", 280), ("Stationery", 50),
+]
+BRANDS = ["Amrit", "Sunrise", "GreenLeaf", "Royal", "Daily", "Nature's Best", "Golden", "Fresh Farm",
+          "Heritage", "Everyday", "Prime", "Valley", "Crest", "Harvest", "Metro", "Classic"]
+ADJECTIVES = ["Organic", "Premium", "Classic", "Lite", "Family Pack", "Select", "Pure", "Spicy",
+              "Mild", "Crunchy", "Fresh", "Value", "Extra", "Natural", "Roasted", "Instant"]
+SIZES = ["100g", "200g", "250g", "500g", "1kg", "2kg", "5kg", "200ml", "500ml", "1L", "2L", "6 pcs", "12 pcs"]
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Vihaan", "Arjun", "Sai", "Reyansh", "Ishaan", "Ananya",
+               "Diya", "Saanvi", "Aadhya", "Kavya", "Meera", "Priya", "Riya", "Rahul", "Rohan", "Neha",
+               "Pooja", "Amit", "Sunita", "Vikram", "Lakshmi", "Farhan", "Zara", "John", "Maria"]
+LAST_NAMES = ["Sharma", "Verma", "Iyer", "Reddy", "Nair", "Patel", "Gupta", "Singh", "Khan", "Das",
+              "Mehta", "Joshi", "Kulkarni", "Menon", "Rao", "Bose", "Chopra", "Pillai", "D'Souza", "Fernandes"]
+CITIES = ["Mumbai", "Pune", "Bengaluru", "Chennai", "Hyderabad", "Delhi", "Kolkata", "Kochi", "Jaipur"]
+
+# Relative store traffic per hour of day (closed overnight)
+HOURLY_WEIGHTS = [0, 0, 0, 0, 0, 0, 0, 1, 2, 3, 4, 5, 7, 7, 5, 4, 5, 7, 9, 9, 7, 4, 2, 0.5]
+# Monday .. Sunday
+WEEKDAY_WEIGHTS = [0.85, 0.80, 0.85, 0.95, 1.10, 1.35, 1.20]
+SEASONAL_AMPLITUDE = 0.25   # +-25% over the year, peaking around December 21st
+ANNUAL_GROWTH = 0.15
+PAYDAY_BOOST = 0.10         # first three days of the month
+DAILY_NOISE = 0.08
+PAYMENT_WEIGHTS = {"CASH": 35, "CARD": 30, "UPI": 30, "WALLET": 5}
+CUSTOMER_SHARE = 0.45       # sales attributed to a loyalty customer
+CUSTOMER_ZIPF = 0.7
+MAX_BASKET = 40
+ORDER_RECEIVED_AFTER_DAYS = 7
+
+CHUNK_SALES = 50_000        # sales per COPY round trip
+BULK_TABLES = ("sales", "sale_items")
+LOADED_TABLES = ("categories", "suppliers", "products", "customers", "employees", "sales", "sale_items",
+                 "sale_client_ids", "purchase_orders", "purchase_order_items", "notifications", "stock_movements")
+DERIVED_TABLES = ("dashboard_counters", "sales_rollup_hourly", "sales_rollup_daily",
+                  "product_sales_daily", "product_sales_stats")
+
+
+# ----------------- Helpers -----------------
+def _copy(cur, table, columns, lines):
+    """COPYs tab-separated lines (NULL = \\N) into table"""
+    if lines:
+        cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", io.StringIO("".join(lines)))
+
+
+def _zipf_cum_weights(n, exponent):
+    return list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, n + 1)))
+
+
+def _money(cents):
+    return f"{cents // 100}.{cents % 100:02d}"
+
+
+def _ean13(number):
+    """EAN-13 barcode in the 890 (India) prefix range"""
+    digits = f"890{number:09d}"
+    checksum = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits))
+    return digits + str((10 - checksum % 10) % 10)
+
+
+def _day_weight(day, start, rng):
+    seasonal = 1 + SEASONAL_AMPLITUDE * math.cos(2 * math.pi * (day.timetuple().tm_yday - 355) / 365.25)
+    trend = 1 + ANNUAL_GROWTH * (day - start).days / 365
+    payday = 1 + PAYDAY_BOOST if day.day <= 3 else 1
+    noise = max(0.5, rng.gauss(1, DAILY_NOISE))
+    return seasonal * WEEKDAY_WEIGHTS[day.weekday()] * trend * payday * noise
+
+
+def _sales_per_day(total, days, rng):
+    """Splits total sales across days by weight (largest remainder, so the sum is exact)"""
+    weights = [_day_weight(day, days[0], rng) for day in days]
+    scale = total / sum(weights)
+    exact = [w * scale for w in weights]
+    counts = [int(x) for x in exact]
+    by_remainder = sorted(range(len(days)), key=lambda i: exact[i] - counts[i], reverse=True)
+    for i in by_remainder[:total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+# ----------------- Reference data -----------------
+def _categories(cur):
+    _copy(cur, "categories", ("category_id", "name", "description"),
+          [f"{i}\t{name}\t{name} (generated)\n" for i, (name, _) in enumerate(CATEGORIES, 1)])
+
+
+def _suppliers(cur, rng, count):
+    lines = []
+    for i in range(1, count + 1):
+        name = f"{rng.choice(BRANDS)} {rng.choice(['Traders', 'Distributors', 'Foods', 'Wholesale', 'Agencies'])} {i}"
+        lines.append(f"{i}\t{name}\t+91 80{i:08d}\torders@supplier{i:05d}.example.com\t"
+                     f"{rng.choice(CITIES)}\t{rng.randint(60, 100)}\t\\N\n")
+    _copy(cur, "suppliers", ("supplier_id", "name", "phone", "email", "address",
+                             "reliability_score", "last_delivery_date"), lines)
+
+
+def _products(cur, rng, count, suppliers):
+    """Returns (unit price in cents by product id, cost in cents by product id, supplier id by product id)"""
+    prices, costs, product_suppliers = [0], [0], [0]
+    lines = []
+    for pid in range(1, count + 1):
+        category_id = rng.randrange(len(CATEGORIES)) + 1
+        median = CATEGORIES[category_id - 1][1]
+        cents = max(500, int(median * math.exp(rng.gauss(0, 0.6)) * 100))
+        cents = cents - cents % 100 + rng.choice((0, 50, 99))
+        cost = int(cents * rng.uniform(0.55, 0.85))
+        supplier_id = rng.randint(1, suppliers)
+        threshold = rng.choice((5, 10, 10, 20, 25))
+        stock = rng.randint(0, 400) if rng.random() > 0.05 else rng.randint(0, threshold)
+        name = f"{rng.choice(BRANDS)} {rng.choice(ADJECTIVES)} {CATEGORIES[category_id - 1][0].split(' ')[0]} {rng.choice(SIZES)}"
+        prices.append(cents)
+        costs.append(cost)
+        product_suppliers.append(supplier_id)
+        lines.append(f"{pid}\t{name}\t{_ean13(pid)}\t{_money(cents)}\t{stock}\t{category_id}\t"
+                     f"{threshold}\t{supplier_id}\t{_money(cost)}\n")
+    _copy(cur, "products", ("product_id", "name", "barcode", "price", "stock_quantity", "category_id",
+                            "low_stock_threshold", "supplier_id", "cost_price"), lines)
+    return prices, costs, product_suppliers
+
+
+def _customers(cur, rng, count, start):
+    lines = []
+    for cid in range(1, count + 1):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        joined = datetime.datetime.combine(start, datetime.time(10)) - datetime.timedelta(
+            days=rng.randint(0, 730), seconds=rng.randint(0, 36000))
+        lines.append(f"{cid}\t{first} {last}\t9{cid:09d}\t"
+                     f"{first.lower()}.{last.lower().replace(chr(39), '')}{cid}@example.com\t"
+                     f"{rng.randint(1, 999)} Main Road, {rng.choice(CITIES)}\t{joined:%Y-%m-%d %H:%M:%S}\n")
+        if len(lines) >= CHUNK_SALES:
+            _copy(cur, "customers", ("customer_id", "name", "phone", "email", "address", "created_at"), lines)
+            lines = []
+    _copy(cur, "customers", ("customer_id", "name", "phone", "email", "address", "created_at"), lines)
+
+
+def _employees(cur, count, password):
+    """Returns the ids of employees who ring up sales (managers and cashiers)"""
+    hashed = hash_password(password)
+    managers = max(1, count // 10)
+    lines = [f"1\tStore Admin\tADMIN\tadmin\t{hashed}\n"]
+    for eid in range(2, count + 1):
+        role, n = ("MANAGER", eid - 1) if eid <= managers + 1 else ("CASHIER", eid - managers - 1)
+        lines.append(f"{eid}\t{role.title()} {n}\t{role}\t{role.lower()}{n}\t{hashed}\n")
+    _copy(cur, "employees", ("employee_id", "name", "role", "username", "password"), lines)
+    return list(range(2, count + 1)) or [1]
+
+
+# ----------------- Sales -----------------
+def _sales(cur, rng, settings, days, prices, progress=None):
+    """Generates and COPYs sales and sale_items day by day. Returns (sales, sale_items) loaded."""
+    product_ranking = list(range(1, settings["products"] + 1))
+    rng.shuffle(product_ranking)
+    product_cum = _zipf_cum_weights(len(product_ranking), settings["zipf"])
+    customer_ranking = list(range(1, settings["customers"] + 1))
+    rng.shuffle(customer_ranking)
+    customer_cum = _zipf_cum_weights(len(customer_ranking), CUSTOMER_ZIPF) if customer_ranking else None
+    methods = list(PAYMENT_METHODS)
+    method_cum = list(itertools.accumulate(PAYMENT_WEIGHTS[m] for m in methods))
+    hour_cum = list(itertools.accumulate(HOURLY_WEIGHTS))
+    sellers = settings["sellers"]
+    price_text = [_money(c) for c in prices]
+    basket_mean = max(1.0, settings["basket_size"])
+    max_basket = min(MAX_BASKET, len(product_ranking))
+    # size = 1 + geometric, so the mean size is basket_mean
+    log_stay = math.log(1 - 1 / basket_mean) if basket_mean > 1 else None
+
+    total_sales = max(1, round(settings["sale_items"] / basket_mean))
+    per_day = _sales_per_day(total_sales, days, rng)
+    choices, random_ = rng.choices, rng.random
+
+    sale_id = item_id = 0
+    sale_lines, item_lines = [], []
+
+    def flush():
+        _copy(cur, "sales", ("sale_id", "sale_time", "total_amount", "payment_method", "customer_id",
+                             "employee_id"), sale_lines)
+        _copy(cur, "sale_items", ("sale_item_id", "sale_id", "sale_time", "product_id", "quantity", "unit_price"),
+              item_lines)
+        sale_lines.clear()
+        item_lines.clear()
+        if progress:
+            progress(sale_id, total_sales, item_id)
+
+    for day, count in zip(days, per_day):
+        day_text = day.isoformat()
+        hours = choices(range(24), cum_weights=hour_cum, k=count)
+        seconds = sorted(h * 3600 + rng.randrange(3600) for h in hours)
+        for second in seconds:
+            sale_id += 1
+            time_text = f"{day_text} {second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}"
+            size = 1
+            if log_stay is not None:
+                size = min(max_basket, 1 + int(math.log(1.0 - random_()) / log_stay))
+            # Repeat picks of a product are drawn again, so the basket has size distinct products
+            basket = dict.fromkeys(choices(product_ranking, cum_weights=product_cum, k=size))
+            while len(basket) < size:
+                basket.update(dict.fromkeys(choices(product_ranking, cum_weights=product_cum, k=size - len(basket))))
+            total = 0
+            for pid in basket:
+                quantity = 1 if random_() < 0.8 else rng.randint(2, 6)
+                item_id += 1
+                total += quantity * prices[pid]
+                item_lines.append(f"{item_id}\t{sale_id}\t{time_text}\t{pid}\t{quantity}\t{price_text[pid]}\n")
+            customer = "\\N"
+            if customer_cum and random_() < CUSTOMER_SHARE:
+                customer = choices(customer_ranking, cum_weights=customer_cum)[0]
+            sale_lines.append(
+                f"{sale_id}\t{time_text}\t{_money(total)}\t{choices(methods, cum_weights=method_cum)[0]}\t{customer}\t"
+                f"{sellers[int(random_() * len(sellers))]}\n")
+            if len(sale_lines) >= CHUNK_SALES:
+                flush()
+    flush()
+    return sale_id, item_id
+
+
+def _purchase_orders(cur, rng, days, costs, product_suppliers):
+    """A restocking order every 10-21 days per supplier; recent ones are still pending"""
+    by_supplier = {}
+    for pid in range(1, len(product_suppliers)):
+        by_supplier.setdefault(product_suppliers[pid], []).append(pid)
+    received_before = days[-1] - datetime.timedelta(days=ORDER_RECEIVED_AFTER_DAYS)
+    order_lines, item_lines = [], []
+    order_id = item_id = 0
+    for supplier_id in sorted(by_supplier):
+        products = by_supplier[supplier_id]
+        day = days[0] + datetime.timedelta(days=rng.randint(0, 14))
+        while day <= days[-1]:
+            order_id += 1
+            status = "RECEIVED" if day < received_before else "PENDING"
+            order_lines.append(f"{order_id}\t{supplier_id}\t{day.isoformat()}\t{status}\n")
+            for pid in rng.sample(products, min(len(products), rng.randint(3, 12))):
+                item_id += 1
+                quantity = rng.randint(2, 20) * 10
+                item_lines.append(f"{item_id}\t{order_id}\t{pid}\t{quantity}\t{_money(costs[pid])}\t"
+                                  f"{quantity if status == 'RECEIVED' else 0}\n")
+            day += datetime.timedelta(days=rng.randint(10, 21))
+    _copy(cur, "purchase_orders", ("order_id", "supplier_id", "order_date", "status"), order_lines)
+    _copy(cur, "purchase_order_items",
+          ("order_item_id", "order_id", "product_id", "quantity", "unit_price", "received_quantity"), item_lines)
+    return order_id
+
+
+# ----------------- Loading -----------------
+def drop_bulk_constraints(cur):
+    """Drops foreign keys and secondary indexes on the big tables; returns the DDL that re-creates them"""
+    cur.execute("""
+        SELECT format('ALTER TABLE %%s ADD CONSTRAINT %%I %%s', conrelid::regclass, conname,
+                      pg_get_constraintdef(oid)),
+               format('ALTER TABLE %%s DROP CONSTRAINT %%I', conrelid::regclass, conname)
+        FROM pg_constraint
+        WHERE contype = 'f' AND conparentid = 0 AND conrelid = ANY (CAST(%s AS regclass[]))
+    """, (list(BULK_TABLES),))
+    constraints = cur.fetchall()
+    cur.execute("""
+        SELECT pg_get_indexdef(i.indexrelid), format('DROP INDEX %%s', i.indexrelid::regclass)
+        FROM pg_index i
+        WHERE i.indrelid = ANY (CAST(%s AS regclass[]))
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+    """, (list(BULK_TABLES),))
+    indexes = cur.fetchall()
+    for _, drop in constraints + indexes:
+        cur.execute(drop)
+    # Indexes on the partitioned parents are listed "ON ONLY"; re-create them on every partition
+    return [create.replace(" ON ONLY ", " ON ", 1) for create, _ in indexes + constraints]
+
+
+def _finish(cur):
+    """Derived columns and rows the application would have produced, and sequences past the loaded ids"""
+    cur.execute("""
+        UPDATE customers c
+        SET total_spent = s.spent, loyalty_points = FLOOR(s.spent / 100)
+        FROM (SELECT customer_id, SUM(total_amount) AS spent FROM sales
+              WHERE customer_id IS NOT NULL GROUP BY customer_id) s
+        WHERE s.customer_id = c.customer_id
+    """)
+    cur.execute("""
+        UPDATE employees e
+        SET total_sales = s.n, total_revenue = s.revenue
+        FROM (SELECT employee_id, COUNT(*) AS n, SUM(total_amount) AS revenue FROM sales
+              WHERE employee_id IS NOT NULL GROUP BY employee_id) s
+        WHERE s.employee_id = e.employee_id
+    """)
+    cur.execute("""
+        UPDATE suppliers su
+        SET last_delivery_date = po.last_date
+        FROM (SELECT supplier_id, MAX(order_date) AS last_date FROM purchase_orders
+              WHERE status = 'RECEIVED' GROUP BY supplier_id) po
+        WHERE po.supplier_id = su.supplier_id
+    """)
+    cur.execute("""
+        INSERT INTO notifications (product_id, message, notification_type)
+        SELECT product_id, 'Low stock: ' || name || ' has ' || stock_quantity || ' left', 'low_stock'
+        FROM products
+        WHERE stock_quantity <= low_stock_threshold
+    """)
+    reset_sequences(cur)
+
+
+def reset_sequences(cur):
+    """Moves each loaded table's id sequence past the highest id present"""
+    for table, column in (("categories", "category_id"), ("suppliers", "supplier_id"),
+                          ("products", "product_id"), ("customers", "customer_id"),
+                          ("employees", "employee_id"), ("sales", "sale_id"), ("sale_items", "sale_item_id"),
+                          ("purchase_orders", "order_id"), ("purchase_order_items", "order_item_id"),
+                          ("notifications", "notification_id"), ("stock_movements", "movement_id")):
+        cur.execute(f"""
+            SELECT setval(pg_get_serial_sequence('{table}', '{column}'),
+                          COALESCE((SELECT MAX({column}) FROM {table}), 0) + 1, false)
+        """)
+
+
+def generate(settings, replace=False, progress=print):
+    """
+    Replaces the store's data with a generated dataset (one transaction), then
+    rebuilds the trigger-maintained summaries. Returns row counts by table.
+    """
+    rng = random.Random(settings["seed"])
+    end = settings["end"]
+    days = [end - datetime.timedelta(days=n) for n in range(settings["days"] - 1, -1, -1)]
+    counts = {}
+
+    conn = get_connection()
+    if conn is None:
+        raise RuntimeError("Could not connect to the database")
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT EXISTS (SELECT 1 FROM products) OR EXISTS (SELECT 1 FROM sales)")
+                if cur.fetchone()[0] and not replace:
+                    raise RuntimeError("The database already has data; pass --replace to overwrite it")
+                cur.execute(f"TRUNCATE {', '.join(LOADED_TABLES + DERIVED_TABLES)} RESTART IDENTITY CASCADE")
+                for table in LOADED_TABLES:
+                    cur.execute(f"ALTER TABLE {table} DISABLE TRIGGER USER")
+                recreate = drop_bulk_constraints(cur)
+                cur.execute("SELECT sales_partitions_ensure(%s, %s)", (days[0], days[-1]))
+
+                _categories(cur)
+                _suppliers(cur, rng, settings["suppliers"])
+                prices, costs, product_suppliers = _products(cur, rng, settings["products"], settings["suppliers"])
+                _customers(cur, rng, settings["customers"], days[0])
+                settings = dict(settings, sellers=_employees(cur, settings["employees"], settings["password"]))
+                progress(f"   ✔ Reference data: {settings['products']:,} products, "
+                         f"{settings['customers']:,} customers")
+
+                started = time.monotonic()
+                counts["sales"], counts["sale_items"] = _sales(
+                    cur, rng, settings, days, prices,
+                    progress=lambda s, total, items: progress(
+                        f"   ✔ Sales {s:,} / {total:,} ({items:,} items, "
+                        f"{items / max(time.monotonic() - started, 1e-9):,.0f} items/s)", end="\r"))
+                progress("")
+                counts["purchase_orders"] = _purchase_orders(cur, rng, days, costs, product_suppliers)
+
+                progress("   ✔ Re-creating indexes and foreign keys")
+                for ddl in recreate:
+                    cur.execute(ddl)
+                _finish(cur)
+                for table in LOADED_TABLES:
+                    cur.execute(f"ALTER TABLE {table} ENABLE TRIGGER USER")
+                for table in LOADED_TABLES:
+                    cur.execute(f"ANALYZE {table}")
+    finally:
+        conn.close()
+
+    progress("   ✔ Rebuilding sales rollups, product statistics and dashboard counters")
+    engine = get_engine("analytics")
+    sales_rollups.backfill(engine, days[0], days[-1])
+    product_sales_stats.rebuild(engine)
+    dashboard_counters.reconcile(engine, days=dashboard_counters.KEEP_DAYS)
+    counts.update(products=settings["products"], customers=settings["customers"],
+                  employees=settings["employees"], suppliers=settings["suppliers"])
+    return counts
+
+
+def _parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fill the database with a reproducible synthetic dataset")
+    parser.add_argument("--scale", choices=SCALES, default="small", help="preset sizes (default: small)")
+    for name in ("products", "suppliers", "customers", "employees", "sale-items", "days"):
+        parser.add_argument(f"--{name}", type=int, help=f"override the preset's {name.replace('-', ' ')}")
+    parser.add_argument("--basket-size", type=float, default=3.5, help="mean distinct products per sale")
+    parser.add_argument("--zipf", type=float, default=1.0, help="Zipf exponent of product popularity")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end", type=datetime.date.fromisoformat, default=datetime.date.today(),
+                        help="last sale day, YYYY-MM-DD (default: today)")
+    parser.add_argument("--password", default="password123", help="password of every generated employee")
+    parser.add_argument("--replace", action="store_true", help="overwrite existing data")
+    args = parser.parse_args(argv)
+
+    settings = dict(SCALES[args.scale])
+    for key in settings:
+        if getattr(args, key) is not None:
+            settings[key] = getattr(args, key)
+    settings.update(basket_size=args.basket_size, zipf=args.zipf, seed=args.seed, end=args.end,
+                    password=args.password)
+    return settings, args.replace
+
+
+if __name__ == "__main__":
+    settings, replace = _parse_args()
+    started = time.monotonic()
+    try:
+        counts = generate(settings, replace=replace)
+        print(f"✅ Generated {counts['sales']:,} sales / {counts['sale_items']:,} sale items over "
+              f"{settings['days']} days ending {settings['end']} in {time.monotonic() - started:,.0f}s "
+              f"(seed {settings['seed']})")
+        print(f"👤 Log in as admin / {settings['password']}")
+    except Exception as e:
+        print(f"❌ Data generation failed: {e}")
+        raise SystemExit(1)
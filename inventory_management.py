@@ -2,6 +2,9 @@
 from sqlalchemy import text
 from db import get_engine
 from auth import has_permission
+from catalog_cache import catalog
+from stock_adjustments import apply_adjustments, StockAdjustmentError
+from stock_ledger import lock_products, record_movements
 
 engine = get_engine()
 
@@ -12,15 +15,16 @@ def restock_products():
     
     try:
         # Show products needing restock
-        with engine.connect() as conn:
+        with engine.begin() as conn:
             low_stock = conn.execute(text("""
-                SELECT p.product_id, p.name, p.stock_quantity, 
+                SELECT p.product_id, p.name, ps.stock_quantity, 
                        p.low_stock_threshold, s.name as supplier,
                        s.contact_info
                 FROM products p
+                JOIN product_stock ps ON ps.product_id = p.product_id
                 JOIN suppliers s ON p.supplier_id = s.supplier_id
-                WHERE p.stock_quantity < p.low_stock_threshold
-                ORDER BY p.stock_quantity ASC
+                WHERE ps.stock_quantity < p.low_stock_threshold
+                ORDER BY ps.stock_quantity ASC
             """)).fetchall()
             
             if not low_stock:
@@ -41,14 +45,17 @@ def restock_products():
                 
             quantity = int(input("Enter restock quantity: ").strip())
             
-            # Update stock
-            conn.execute(text("""
-                UPDATE products 
-                SET stock_quantity = stock_quantity + :qty
-                WHERE product_id = :pid
-            """), {"qty": quantity, "pid": int(product_id)})
-            
-            print(f"✅ Restocked {quantity} units successfully!")
+            found = conn.execute(text("SELECT 1 FROM products WHERE product_id = :pid"),
+                                 {"pid": int(product_id)}).first()
+            if found is None:
+                print("❌ Product not found!")
+                return
+
+            # Recorded as a stock movement (stock_ledger.py)
+            record_movements(conn, "RESTOCK", [int(product_id)], [quantity])
+            lock_products(conn, [int(product_id)])
+        catalog.invalidate([int(product_id)])
+        print(f"✅ Restocked {quantity} units successfully!")
             
     except Exception as e:
         print(f"❌ Restock error: {e}")
@@ -59,27 +66,33 @@ def bulk_stock_update():
         return
     
     print("\n📦 BULK STOCK UPDATE")
-    print("Enter product ID and new quantity (enter 'done' to finish)")
+    print("Enter product ID and quantity: 40 sets the level, +5 / -3 adjusts it (enter 'done' to finish)")
     
-    updates = []
+    adjustments = []
     while True:
         pid = input("Product ID: ").strip()
         if pid.lower() == 'done':
             break
         try:
-            qty = int(input("New Quantity: ").strip())
-            updates.append((int(pid), qty))
+            qty = input("Quantity: ").strip()
+            mode = "add" if qty.startswith(("+", "-")) else "set"
+            adjustments.append((int(pid), int(qty), mode))
         except ValueError:
             print("❌ Invalid input")
             
-    if updates:
+    if adjustments:
         try:
             with engine.begin() as conn:
-                for pid, qty in updates:
-                    conn.execute(text("""
-                        UPDATE products SET stock_quantity = :qty 
-                        WHERE product_id = :pid
-                    """), {"qty": qty, "pid": pid})
-                print(f"✅ Updated {len(updates)} products!")
+                result = apply_adjustments(conn, adjustments)
+            catalog.apply_stock({r["product_id"]: r["stock_quantity"]
+                                 for r in result["results"] if r["status"] == "updated"})
+            print(f"✅ Updated {result['updated']} products!")
+            for r in result["results"]:
+                if r["status"] == "not_found":
+                    print(f"   ⚠️ Product {r['product_id']} not found")
+                elif r["status"] == "rejected":
+                    print(f"   ⚠️ Product {r['product_id']} has only {r['previous']} in stock; not changed")
+        except StockAdjustmentError as e:
+            print(f"❌ {e.message}")
         except Exception as e:
-            print(f"❌ Bulk update failed: {e}")
\ No newline at end of file
+            print(f"❌ Bulk update failed: {e}")
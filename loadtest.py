@@ -0,0 +1,352 @@
+# loadtest.py
+"""
+Load-testing harness for the REST API.
+
+Drives a running api_server with a mix of store traffic from N concurrent
+virtual clients (threads with keep-alive connections), then reports
+throughput and p50/p95/p99 latency per endpoint and saves everything as
+JSON so runs can be compared across commits.
+
+Scenarios (weights set with --mix):
+    checkout   scan each item of a basket by barcode, then POST /api/sales
+    lookup     one barcode lookup (price check)
+    dashboard  GET /api/dashboard/stats
+    report     one of the /api/reports/* endpoints
+    receive    create a purchase order and receive it
+
+Basket sizes follow a geometric distribution (mean --basket-mean) and items
+are drawn with Zipf-like popularity, so a few products are in most baskets.
+Stock is topped up before the run (--no-restock to skip) so checkouts don't
+fail with insufficient stock. Run it against a disposable database: it
+records real sales and purchase orders.
+
+    uvicorn api_server:app --port 8000 --workers 1
+    python loadtest.py --username alicej --password admin123 --duration 60 --concurrency 32
+    python loadtest.py ... --compare loadtest_results/<earlier run>.json
+"""
+import argparse
+import datetime
+import http.client
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import threading
+import time
+import urllib.parse
+
+DEFAULT_MIX = "checkout=60,lookup=15,dashboard=15,report=7,receive=3"
+PAYMENT_METHODS = ("CASH", "CARD", "UPI", "WALLET")
+REPORTS = ("/api/reports/sales-by-date?days=30", "/api/reports/category-sales", "/api/reports/top-products")
+RESTOCK_QUANTITY = 100000
+
+
+class ApiClient:
+    """One keep-alive HTTP connection that times every request under an endpoint label"""
+
+    def __init__(self, base_url, token=None, recorder=None, timeout=30):
+        url = urllib.parse.urlsplit(base_url)
+        self.host, self.port = url.hostname, url.port or (443 if url.scheme == "https" else 80)
+        self.connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        self.timeout = timeout
+        self.token = token
+        self.recorder = recorder
+        self._conn = None
+
+    def request(self, method, path, body=None, label=None):
+        headers = {"Accept": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+
+        start = time.perf_counter()
+        try:
+            if self._conn is None:
+                self._conn = self.connection_class(self.host, self.port, timeout=self.timeout)
+            self._conn.request(method, path, body=payload, headers=headers)
+            response = self._conn.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = None
+            data, status = b"", 0
+        elapsed = time.perf_counter() - start
+
+        if self.recorder:
+            self.recorder.record(label or f"{method} {path.split('?')[0]}", elapsed, status)
+        try:
+            return status, json.loads(data) if data else None
+        except ValueError:
+            return status, None
+
+
+class Recorder:
+    """Latencies and status codes per endpoint label (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.statuses = {}
+
+    def record(self, label, elapsed, status):
+        with self._lock:
+            self.latencies.setdefault(label, []).append(elapsed)
+            codes = self.statuses.setdefault(label, {})
+            codes[status] = codes.get(status, 0) + 1
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+def summarize(recorder, elapsed):
+    endpoints = {}
+    all_latencies = []
+    for label, values in sorted(recorder.latencies.items()):
+        values = sorted(values)
+        all_latencies.extend(values)
+        codes = recorder.statuses[label]
+        errors = sum(n for code, n in codes.items() if code == 0 or code >= 400)
+        endpoints[label] = _stats(values, elapsed, errors, codes)
+    total_errors = sum(e["errors"] for e in endpoints.values())
+    return endpoints, _stats(sorted(all_latencies), elapsed, total_errors)
+
+
+def _stats(values, elapsed, errors, codes=None):
+    ms = lambda v: round(v * 1000, 2) if v is not None else None
+    stats = {
+        "requests": len(values),
+        "errors": errors,
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed else 0,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(values[-1] if values else None),
+        "mean_ms": ms(sum(values) / len(values) if values else None),
+    }
+    if codes is not None:
+        stats["status_codes"] = {str(code): n for code, n in sorted(codes.items())}
+    return stats
+
+
+# ----------------- Store traffic -----------------
+class Store:
+    """Catalog and reference data the scenarios draw from, loaded once before the run"""
+
+    def __init__(self, client, zipf_s):
+        self.products = []
+        cursor = None
+        while True:
+            path = "/api/products?limit=1000" + (f"&cursor={cursor}" if cursor else "")
+            status, body = client.request("GET", path)
+            if status != 200:
+                raise SystemExit(f"❌ Could not load products ({status}): {body}")
+            self.products.extend(body["products"])
+            cursor = body.get("next_cursor")
+            if not cursor:
+                break
+        self.products = [p for p in self.products if p.get("barcode")]
+        if not self.products:
+            raise SystemExit("❌ No products with barcodes to sell; load some data first")
+
+        status, body = client.request("GET", "/api/suppliers?limit=1000")
+        self.suppliers = [s["supplier_id"] for s in (body or {}).get("suppliers", [])] if status == 200 else []
+
+        # Zipf-like popularity over a shuffled catalog: weight(rank) = 1 / rank^s. Cumulative
+        # weights are built once, so each pick is a binary search rather than a pass over the catalog.
+        random.shuffle(self.products)
+        self.cum_weights = list(itertools.accumulate(1 / (rank ** zipf_s)
+                                                     for rank in range(1, len(self.products) + 1)))
+
+    def pick(self, rng, k=1):
+        return rng.choices(self.products, cum_weights=self.cum_weights, k=k)
+
+    def basket(self, mean_size, rng):
+        # Geometric basket size with the given mean (at least one item)
+        p = 1 / max(mean_size, 1)
+        size = 1
+        while rng.random() > p and size < 100:
+            size += 1
+        picks = self.pick(rng, size)
+        lines = {}
+        for product in picks:
+            lines[product["product_id"]] = (product, lines.get(product["product_id"], (None, 0))[1] + 1)
+        return list(lines.values())
+
+
+def checkout(client, store, args, rng):
+    basket = store.basket(args.basket_mean, rng)
+    for product, _ in basket:
+        client.request("GET", f"/api/products/by-barcode/{urllib.parse.quote(product['barcode'])}",
+                       label="GET /api/products/by-barcode/{code}")
+    client.request("POST", "/api/sales", {
+        "items": [{"product_id": product["product_id"], "quantity": qty} for product, qty in basket],
+        "payment_method": rng.choice(PAYMENT_METHODS),
+    })
+
+
+def lookup(client, store, args, rng):
+    product = store.pick(rng)[0]
+    client.request("GET", f"/api/products/by-barcode/{urllib.parse.quote(product['barcode'])}",
+                   label="GET /api/products/by-barcode/{code}")
+
+
+def dashboard(client, store, args, rng):
+    client.request("GET", "/api/dashboard/stats")
+
+
+def report(client, store, args, rng):
+    client.request("GET", rng.choice(REPORTS))
+
+
+def receive(client, store, args, rng):
+    if not store.suppliers:
+        return
+    items = [{"product_id": p["product_id"], "quantity": rng.randint(10, 200), "unit_price": p["price"]}
+             for p in rng.sample(store.products, min(len(store.products), rng.randint(3, 15)))]
+    status, body = client.request("POST", "/api/purchase-orders",
+                                  {"supplier_id": rng.choice(store.suppliers), "items": items})
+    if status == 200:
+        client.request("PUT", f"/api/purchase-orders/{body['order_id']}/receive",
+                       label="PUT /api/purchase-orders/{order_id}/receive")
+
+
+SCENARIOS = {"checkout": checkout, "lookup": lookup, "dashboard": dashboard, "report": report, "receive": receive}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"unknown scenario {name!r}; expected {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def restock(client, store):
+    """Tops up every product so checkouts during the run don't fail on stock"""
+    for product in store.products:
+        if product["stock_quantity"] < RESTOCK_QUANTITY:
+            client.request("PUT", f"/api/products/{product['product_id']}/stock",
+                           {"product_id": product["product_id"], "quantity": RESTOCK_QUANTITY})
+
+
+def run(args):
+    setup = ApiClient(args.url)
+    status, body = setup.request("POST", "/api/auth/login", {"username": args.username, "password": args.password})
+    if status != 200:
+        raise SystemExit(f"❌ Login failed ({status}): {body}")
+    token = body["access_token"]
+    setup.token = token
+
+    store = Store(setup, args.zipf)
+    if not args.no_restock:
+        print(f"📦 Restocking {len(store.products)} products...")
+        restock(setup, store)
+
+    recorder = Recorder()
+    names, weights = zip(*args.mix.items())
+    cum_weights = list(itertools.accumulate(weights))
+    started = time.perf_counter()
+    deadline = started + args.duration
+
+    def worker(index):
+        # One generator per client: with --seed every client draws the same sequence on every run
+        rng = random.Random(f"{args.seed}:{index}" if args.seed is not None else None)
+        client = ApiClient(args.url, token, recorder)
+        while time.perf_counter() < deadline:
+            SCENARIOS[rng.choices(names, cum_weights=cum_weights)[0]](client, store, args, rng)
+
+    mix = ", ".join(f"{name}={weight:g}" for name, weight in args.mix.items())
+    print(f"🚀 {args.concurrency} clients for {args.duration:g}s against {args.url} ({mix})")
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    endpoints, overall = summarize(recorder, elapsed)
+    return {
+        "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "config": {
+            "url": args.url, "duration_s": args.duration, "concurrency": args.concurrency,
+            "mix": args.mix, "basket_mean": args.basket_mean, "zipf": args.zipf, "seed": args.seed,
+            "products": len(store.products),
+        },
+        "elapsed_s": round(elapsed, 2),
+        "overall": overall,
+        "endpoints": endpoints,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_results(results, baseline=None):
+    rows = [("overall", results["overall"])] + list(results["endpoints"].items())
+    print(f"\n{'endpoint':<48}{'req':>8}{'err':>6}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for label, s in rows:
+        line = (f"{label:<48}{s['requests']:>8}{s['errors']:>6}{s['throughput_rps']:>9}"
+                f"{s['p50_ms'] or 0:>9}{s['p95_ms'] or 0:>9}{s['p99_ms'] or 0:>9}")
+        if baseline:
+            old = baseline["overall"] if label == "overall" else baseline["endpoints"].get(label)
+            if old and old.get("p99_ms") and s.get("p99_ms"):
+                line += f"   p99 {(s['p99_ms'] / old['p99_ms'] - 1) * 100:+.0f}%"
+                line += f", req/s {(s['throughput_rps'] / old['throughput_rps'] - 1) * 100:+.0f}%" \
+                    if old["throughput_rps"] else ""
+        print(line)
+    print("(latencies in ms)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the SuperMarket API with a realistic traffic mix")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", required=True, help="a MANAGER or ADMIN account (receiving and restock)")
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--duration", type=float, default=30, help="seconds (default 30)")
+    parser.add_argument("--concurrency", type=int, default=16, help="virtual clients (default 16)")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help=f"scenario weights (default {DEFAULT_MIX})")
+    parser.add_argument("--basket-mean", type=float, default=8, help="mean items per basket (default 8)")
+    parser.add_argument("--zipf", type=float, default=1.1, help="product popularity skew (default 1.1)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--no-restock", action="store_true")
+    parser.add_argument("--out", help="results file (default loadtest_results/<time>_<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    results = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    out = args.out
+    if not out:
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        out = os.path.join("loadtest_results", f"{stamp}_{results['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 Results saved to {out}")
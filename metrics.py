@@ -0,0 +1,247 @@
+# metrics.py
+"""
+Prometheus metrics for the API server, served at ``GET /metrics``.
+
+A deliberately small, dependency-free implementation of counters, gauges
+and histograms with the Prometheus text exposition format (0.0.4).
+
+Exposed series:
+    http_requests_total{method,route,status}
+    http_request_duration_seconds{method,route}      histogram
+    http_requests_in_flight
+    db_query_total{query}, db_query_duration_seconds{query}   histogram
+    db_pool_*{pool,driver}                           from db_config.pool_stats()
+    sales_completed_total{channel}, sale_items_total{channel}, sales_revenue_total{channel}
+
+Routes are labelled by their path template (``/api/sales/{sale_id}``), so
+label cardinality stays fixed. Queries are labelled by the ``query_name``
+execution option when a caller sets one, else by statement verb and first
+table (``SELECT products``).
+
+Each process keeps its own metrics: with several uvicorn workers, scrape
+each worker (or run one worker per port) and aggregate in Prometheus.
+"""
+import re
+import threading
+import time
+from functools import lru_cache
+from sqlalchemy import event
+from db_config import pool_stats
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(labels.get(n, "") for n in self.labelnames)
+
+    def set(self, value, **labels):
+        """Sets a series' value (gauges, or totals mirrored from another source at scrape time)"""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, key, None, value) for key, value in items]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self.samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(s[0]), s[1], s[2]) for key, s in self._values.items()]
+        out = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                out.append((f"{self.name}_bucket", key, ("le", _format_value(bound)), cumulative))
+            out.append((f"{self.name}_sum", key, None, total))
+            out.append((f"{self.name}_count", key, None, count))
+        return out
+
+
+# ----------------- HTTP -----------------
+http_requests = Counter("http_requests_total", "HTTP requests handled", ("method", "route", "status"))
+http_latency = Histogram("http_request_duration_seconds",
+                         "Time until the response headers were sent", ("method", "route"))
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests being handled")
+
+
+async def http_middleware(request, call_next):
+    """Starlette/FastAPI middleware recording request count, latency and concurrency"""
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    http_in_flight.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        http_in_flight.dec()
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        http_requests.inc(method=request.method, route=path, status=str(status))
+        http_latency.observe(elapsed, method=request.method, route=path)
+
+
+# ----------------- Database -----------------
+db_queries = Counter("db_query_total", "SQL statements executed", ("query",))
+db_query_latency = Histogram("db_query_duration_seconds", "SQL statement execution time", ("query",))
+
+_VERB = re.compile(r"\b(SELECT|INSERT|UPDATE|DELETE|LOCK|COPY|TRUNCATE)\b", re.IGNORECASE)
+_TABLE_AFTER = {
+    # "(?!\s*\))" skips EXTRACT(EPOCH FROM col) and the like
+    verb: re.compile(prefix + r"(?:ONLY\s+|TABLE\s+)?([A-Za-z_][\w.]*)\b(?!\s*\))", re.IGNORECASE)
+    for verb, prefix in {
+        "SELECT": r"\bFROM\s+", "DELETE": r"\bFROM\s+", "INSERT": r"\bINTO\s+",
+        "UPDATE": r"\bUPDATE\s+", "LOCK": r"\bTABLE\s+", "COPY": r"\bCOPY\s+", "TRUNCATE": r"\bTRUNCATE\s+",
+    }.items()
+}
+
+
+@lru_cache(maxsize=1024)
+def query_name(statement):
+    """'SELECT products' style label for a statement: its first verb and the table it reads or writes"""
+    verb = _VERB.search(statement)
+    if verb is None:
+        words = statement.split(None, 1)
+        return words[0].upper() if words else "unknown"
+    name = verb.group(1).upper()
+    match = _TABLE_AFTER[name].search(statement, verb.start())
+    return f"{name} {match.group(1).split('.')[-1].lower()}" if match else name
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_start
+    name = context.execution_options.get("query_name") or query_name(statement)
+    db_queries.inc(query=name)
+    db_query_latency.observe(elapsed, query=name)
+
+
+def instrument_engine(engine):
+    """Times every statement run through engine (pass AsyncEngine.sync_engine for async engines)"""
+    if not event.contains(engine, "before_cursor_execute", _before_execute):
+        event.listen(engine, "before_cursor_execute", _before_execute)
+        event.listen(engine, "after_cursor_execute", _after_execute)
+
+
+_POOL_GAUGES = {
+    "size": Gauge("db_pool_size", "Connections kept open by the pool", ("pool", "driver")),
+    "max_connections": Gauge("db_pool_max_connections", "pool_size + max_overflow", ("pool", "driver")),
+    "checked_out": Gauge("db_pool_checked_out", "Connections in use", ("pool", "driver")),
+    "overflow": Gauge("db_pool_overflow", "Connections open beyond pool_size", ("pool", "driver")),
+    "waiting": Gauge("db_pool_waiting", "Callers waiting for a connection", ("pool", "driver")),
+    "checkouts": Counter("db_pool_checkouts_total", "Connection checkouts", ("pool", "driver")),
+    "timeouts": Counter("db_pool_timeouts_total", "Checkouts that timed out", ("pool", "driver")),
+    "wait_seconds_total": Counter("db_pool_wait_seconds_total", "Time spent waiting for a connection",
+                                  ("pool", "driver")),
+}
+
+
+def _collect_pools():
+    for pool in pool_stats():
+        for field, metric in _POOL_GAUGES.items():
+            metric.set(pool[field], pool=pool["pool"], driver=pool["driver"])
+
+
+# ----------------- Business -----------------
+sales_completed = Counter("sales_completed_total", "Sales recorded", ("channel",))
+sale_items_sold = Counter("sale_items_total", "Sale line items recorded", ("channel",))
+sales_revenue = Counter("sales_revenue_total", "Revenue of recorded sales", ("channel",))
+
+
+def record_sales(channel, sales, items, revenue):
+    sales_completed.inc(sales, channel=channel)
+    sale_items_sold.inc(items, channel=channel)
+    sales_revenue.inc(float(revenue), channel=channel)
+
+
+def render():
+    """Returns every metric in the Prometheus text format"""
+    _collect_pools()
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,256 @@
+# migrate.py
+"""
+Versioned schema migrations.
+
+Migrations are the files attached_assets/migrations/NNNN_description.sql,
+applied in version order. schema_migrations records each applied version
+with a checksum of its file, so an edited migration is reported. On an empty
+database the base schema (attached_assets/schema_*.sql) is loaded first.
+
+    python migrate.py            # apply pending migrations
+    python migrate.py --status   # list applied and pending migrations
+
+A migration normally runs in one transaction, together with its
+schema_migrations row. DDL there waits at most MIGRATION_LOCK_TIMEOUT for
+table locks (and is retried) rather than queueing every checkout behind it.
+
+A file whose first line is ``-- migrate: no-transaction`` runs statement by
+statement in autocommit instead. Use that for CREATE INDEX CONCURRENTLY,
+which builds an index without blocking writes, so a live store can migrate
+during opening hours. Such files must be idempotent (IF NOT EXISTS): after a
+failure, fix the cause and re-run. An index left INVALID by an interrupted
+concurrent build is dropped and built again.
+
+Only one migrate.py runs at a time (advisory lock).
+
+Settings (environment):
+    MIGRATION_LOCK_TIMEOUT=5s
+    MIGRATION_LOCK_RETRIES=5
+"""
+import argparse
+import glob
+import hashlib
+import os
+import re
+import time
+from psycopg2 import errors
+from db import get_connection
+
+MIGRATION_LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "5s")
+MIGRATION_LOCK_RETRIES = int(os.getenv("MIGRATION_LOCK_RETRIES", "5"))
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "attached_assets")
+MIGRATIONS_DIR = os.path.join(ASSETS_DIR, "migrations")
+NO_TRANSACTION = "-- migrate: no-transaction"
+_ADVISORY_LOCK_ID = 7301001          # arbitrary, shared by every migrate.py
+
+_FILE_NAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+# Statement boundaries: skip comments, quoted strings and dollar-quoted bodies
+_SQL_TOKEN = re.compile(r"--[^\n]*|/\*.*?\*/|'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|(\$\w*\$).*?\1|;", re.DOTALL)
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_CONCURRENT_INDEX = re.compile(
+    r"CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)", re.IGNORECASE)
+
+
+class Migration:
+    """One migration file"""
+
+    def __init__(self, path):
+        match = _FILE_NAME.match(os.path.basename(path))
+        if match is None:
+            raise ValueError(f"Migration file names must look like 0001_description.sql: {path}")
+        self.version = int(match.group(1))
+        self.name = match.group(2)
+        self.path = path
+        with open(path, encoding="utf-8") as f:
+            self.sql = f.read()
+        self.checksum = hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+        self.transactional = not self.sql.lstrip().startswith(NO_TRANSACTION)
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """Every migration file, in version order"""
+    migrations = sorted((Migration(p) for p in glob.glob(os.path.join(directory, "*.sql"))),
+                        key=lambda m: m.version)
+    for earlier, later in zip(migrations, migrations[1:]):
+        if earlier.version == later.version:
+            raise ValueError(f"Duplicate migration version {later.version}: {earlier.path}, {later.path}")
+    return migrations
+
+
+def split_statements(sql):
+    """Splits a SQL script on top-level semicolons, dropping empty statements"""
+    statements, start = [], 0
+    for match in _SQL_TOKEN.finditer(sql):
+        if match.group(0) == ";":
+            statements.append(sql[start:match.start()])
+            start = match.end()
+    statements.append(sql[start:])
+    return [s.strip() for s in statements if _COMMENTS.sub("", s).strip()]
+
+
+# ----------------- Bookkeeping -----------------
+def _ensure_tables(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('public.products') IS NULL")
+        if cur.fetchone()[0]:
+            base = sorted(glob.glob(os.path.join(ASSETS_DIR, "schema_*.sql")))[-1]
+            print(f"   ✔ Empty database: loading base schema {os.path.basename(base)}")
+            with open(base, encoding="utf-8") as f:
+                cur.execute(f.read())        # the file has its own BEGIN / END
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS public.schema_migrations
+            (
+                version integer NOT NULL,
+                name character varying(200) NOT NULL,
+                checksum character(64) NOT NULL,
+                applied_at timestamp with time zone NOT NULL DEFAULT now(),
+                execution_ms integer,
+                CONSTRAINT schema_migrations_pkey PRIMARY KEY (version)
+            )
+        """)
+
+
+def applied_versions(conn):
+    """{version: checksum} of the migrations recorded as applied"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('public.schema_migrations') IS NOT NULL")
+        if not cur.fetchone()[0]:
+            return {}
+        cur.execute("SELECT version, checksum FROM schema_migrations")
+        return dict(cur.fetchall())
+
+
+def _record(cur, migration, started):
+    cur.execute("""
+        INSERT INTO schema_migrations (version, name, checksum, execution_ms)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (version) DO UPDATE
+        SET name = EXCLUDED.name, checksum = EXCLUDED.checksum,
+            applied_at = now(), execution_ms = EXCLUDED.execution_ms
+    """, (migration.version, migration.name, migration.checksum, int((time.monotonic() - started) * 1000)))
+
+
+# ----------------- Applying -----------------
+def _apply_in_transaction(conn, migration):
+    for attempt in range(1, MIGRATION_LOCK_RETRIES + 1):
+        started = time.monotonic()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SET LOCAL lock_timeout = %s", (MIGRATION_LOCK_TIMEOUT,))
+                cur.execute(migration.sql)
+                _record(cur, migration, started)
+            conn.commit()
+            return
+        except errors.LockNotAvailable:
+            conn.rollback()
+            if attempt == MIGRATION_LOCK_RETRIES:
+                raise
+            print(f"   ⏳ {migration.name}: table busy, retrying ({attempt}/{MIGRATION_LOCK_RETRIES})")
+            time.sleep(attempt)
+        except Exception:
+            conn.rollback()
+            raise
+
+
+def _drop_invalid_index(cur, name):
+    """Drops an index an interrupted CREATE INDEX CONCURRENTLY left INVALID, so IF NOT EXISTS rebuilds it"""
+    cur.execute("""
+        SELECT NOT i.indisvalid
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s AND c.relnamespace = 'public'::regnamespace
+    """, (name,))
+    row = cur.fetchone()
+    if row and row[0]:
+        print(f"   ⚠️ Rebuilding invalid index {name}")
+        cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS public."{name}"')
+
+
+def _apply_statements(conn, migration):
+    started = time.monotonic()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            for statement in split_statements(migration.sql):
+                index = _CONCURRENT_INDEX.search(statement)
+                if index:
+                    _drop_invalid_index(cur, index.group(1))
+                    print(f"   … building index {index.group(1)}")
+                cur.execute(statement)
+            _record(cur, migration, started)
+    finally:
+        conn.autocommit = False
+
+
+def migrate(target=None):
+    """Applies every pending migration (up to version target). Returns the versions applied."""
+    migrations = load_migrations()
+    conn = get_connection()
+    if conn is None:
+        raise RuntimeError("Could not connect to the database")
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (_ADVISORY_LOCK_ID,))
+            if not cur.fetchone()[0]:
+                print("⏳ Another migration is running; waiting for it to finish")
+                cur.execute("SELECT pg_advisory_lock(%s)", (_ADVISORY_LOCK_ID,))
+        _ensure_tables(conn)
+        conn.autocommit = False
+
+        applied = applied_versions(conn)
+        conn.commit()
+        done = []
+        for migration in migrations:
+            if target is not None and migration.version > target:
+                break
+            if migration.version in applied:
+                if applied[migration.version] != migration.checksum:
+                    print(f"⚠️ {migration.version:04d}_{migration.name} changed after it was applied "
+                          f"(not re-run; add a new migration instead)")
+                continue
+            print(f"➡️ Applying {migration.version:04d}_{migration.name}")
+            if migration.transactional:
+                _apply_in_transaction(conn, migration)
+            else:
+                _apply_statements(conn, migration)
+            done.append(migration.version)
+        return done
+    finally:
+        conn.close()   # also releases the advisory lock
+
+
+def status():
+    """[(version, name, applied?, checksum matches?)] for every migration file"""
+    conn = get_connection()
+    if conn is None:
+        raise RuntimeError("Could not connect to the database")
+    try:
+        applied = applied_versions(conn)
+    finally:
+        conn.close()
+    return [(m.version, m.name, m.version in applied, applied.get(m.version, m.checksum) == m.checksum)
+            for m in load_migrations()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument("--status", action="store_true", help="list migrations instead of applying them")
+    parser.add_argument("--to", type=int, dest="target", help="stop after this version")
+    args = parser.parse_args()
+
+    try:
+        if args.status:
+            for version, name, applied, unchanged in status():
+                mark = ("✅" if unchanged else "⚠️ changed since applied") if applied else "⏳ pending"
+                print(f"{version:04d}_{name}  {mark}")
+        else:
+            versions = migrate(args.target)
+            if versions:
+                print(f"✅ Applied {len(versions)} migration(s)")
+            else:
+                print("✅ Database schema is up to date")
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        raise SystemExit(1)
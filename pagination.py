@@ -0,0 +1,122 @@
+# pagination.py
+"""
+Keyset (cursor) pagination for the API list endpoints.
+
+Every list is ordered by a stable, unique key (e.g. product_id, or
+(name, customer_id)). A page ends with an opaque cursor holding the key of its
+last row; the next page starts with ``WHERE (key) > (cursor)``, which an index
+on the key answers directly, so page N costs the same as page 1.
+
+    where, order_by, params = keyset_page([("c.name", str), ("c.customer_id", int)], cursor, limit)
+    rows = conn.execute(text(f"SELECT ... {where} ORDER BY {order_by} LIMIT :limit"), params)
+    rows, next_cursor = split_page(rows.fetchall(), limit, lambda r: (r[1], r[0]))
+"""
+import base64
+import datetime
+import json
+from decimal import Decimal
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class CursorError(ValueError):
+    """Raised for a cursor that was not produced by this API (the API answers 400)."""
+
+
+def _encode_value(value):
+    # JSON has no timestamp / decimal types; tag them so they decode to the same type
+    if isinstance(value, datetime.datetime):
+        return {"ts": value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {"date": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"dec": str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "ts" in value:
+            return datetime.datetime.fromisoformat(value["ts"])
+        if "date" in value:
+            return datetime.date.fromisoformat(value["date"])
+        if "dec" in value:
+            return Decimal(value["dec"])
+        raise ValueError("unknown cursor value")
+    return value
+
+
+def encode_cursor(values):
+    """Returns an opaque, URL-safe cursor for a row's sort key."""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, size, types=None):
+    """
+    Returns the sort key stored in a cursor. Raises CursorError if it is
+    malformed or, when types are given, a value is not of its column's type.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("wrong key size")
+        values = [_decode_value(v) for v in values]
+        # JSON true / false would pass for int
+        if types and any(isinstance(v, bool) or not isinstance(v, t) for v, t in zip(values, types)):
+            raise ValueError("wrong key type")
+        return values
+    except (ValueError, TypeError, UnicodeError):
+        raise CursorError("Invalid pagination cursor")
+
+
+def keyset_page(columns, cursor, limit, descending=False, nullable_lead=False):
+    """
+    Builds the WHERE / ORDER BY fragments and bind parameters for one page.
+
+    columns is the sort key as (column, Python type) pairs, most significant
+    first, ending in a unique column; a cursor whose values are not of those
+    types raises CursorError. nullable_lead means the first column may be
+    NULL; those rows sort last.
+    The returned params fetch limit + 1 rows so split_page can tell whether
+    another page exists.
+    """
+    types = [t for _, t in columns]
+    columns = [c for c, _ in columns]
+    direction = "DESC" if descending else "ASC"
+    order_by = ", ".join(
+        f"{col} {direction} NULLS LAST" if i == 0 and nullable_lead else f"{col} {direction}"
+        for i, col in enumerate(columns)
+    )
+    params = {"limit": limit + 1}
+    if cursor is None:
+        return "", order_by, params
+
+    if nullable_lead:
+        types[0] = (types[0], type(None))
+    values = decode_cursor(cursor, len(columns), types)
+    op = "<" if descending else ">"
+    names = [f"k{i}" for i in range(len(columns))]
+    params.update(zip(names, values))
+
+    if nullable_lead and values[0] is None:
+        # Already inside the trailing NULL block: page on the remaining columns only
+        rest = ", ".join(columns[1:])
+        rest_params = ", ".join(f":{n}" for n in names[1:])
+        params.pop(names[0])
+        return f"WHERE {columns[0]} IS NULL AND ({rest}) {op} ({rest_params})", order_by, params
+
+    condition = f"({', '.join(columns)}) {op} ({', '.join(f':{n}' for n in names)})"
+    if nullable_lead:
+        condition = f"({condition} OR {columns[0]} IS NULL)"
+    return f"WHERE {condition}", order_by, params
+
+
+def split_page(rows, limit, key):
+    """Trims the look-ahead row. Returns (rows, next_cursor); next_cursor is None on the last page."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(key(rows[-1]))
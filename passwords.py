@@ -0,0 +1,84 @@
+# passwords.py
+"""
+bcrypt password hashing for the API.
+
+bcrypt is deliberately slow (~250 ms at cost 12), so the async API must not
+run it on the event loop: a burst of logins would stall every other request.
+The *_async helpers run it on a small dedicated thread pool instead (bcrypt
+releases the GIL while hashing), which also caps how many CPU cores logins
+can take at once.
+
+Settings (environment):
+    BCRYPT_ROUNDS   cost factor for new hashes (default 12). Raising it takes
+                    effect for each employee at their next successful login.
+    BCRYPT_WORKERS  threads hashing concurrently (default: CPU count, max 8)
+"""
+import asyncio
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(min(os.cpu_count() or 1, 8))))
+
+_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_dummy_hash = None
+
+
+def is_bcrypt_hash(stored_password):
+    return stored_password.startswith(("$2a$", "$2b$", "$2y$"))
+
+
+def hash_password(plain_password, rounds=None):
+    """Returns a bcrypt hash of plain_password at BCRYPT_ROUNDS (or rounds)"""
+    salt = bcrypt.gensalt(rounds or BCRYPT_ROUNDS)
+    return bcrypt.hashpw(plain_password.encode("utf-8"), salt).decode("utf-8")
+
+
+def verify_password(plain_password, stored_password):
+    """
+    Checks plain_password against a stored bcrypt hash. Rows still holding a
+    plain-text password (created with auth.USE_BCRYPT off) are compared in
+    constant time; needs_rehash() reports them so login can upgrade them.
+    """
+    if not is_bcrypt_hash(stored_password):
+        return hmac.compare_digest(plain_password.encode("utf-8"), stored_password.encode("utf-8"))
+    try:
+        return bcrypt.checkpw(plain_password.encode("utf-8"), stored_password.encode("utf-8"))
+    except ValueError:
+        return False
+
+
+def needs_rehash(stored_password):
+    """True when the stored value is not a bcrypt hash at the configured cost"""
+    if not is_bcrypt_hash(stored_password):
+        return True
+    try:
+        return int(stored_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+def _reject_unknown_user(plain_password):
+    # Spend the same time as a real check so response times don't reveal which usernames exist
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = hash_password("unused")
+    verify_password(plain_password, _dummy_hash)
+    return False
+
+
+async def _run(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(_executor, fn, *args)
+
+
+async def hash_password_async(plain_password):
+    return await _run(hash_password, plain_password)
+
+
+async def verify_password_async(plain_password, stored_password):
+    """verify_password on the bcrypt pool; stored_password None means the user does not exist"""
+    if stored_password is None:
+        return await _run(_reject_unknown_user, plain_password)
+    return await _run(verify_password, plain_password, stored_password)
@@ -4,6 +4,8 @@ from sqlalchemy import text
 from tabulate import tabulate
 from db import get_engine
 from auth import has_permission, get_current_user, get_current_name
+from catalog_cache import catalog
+from catalog_import import import_products, CatalogImportError
 
 engine = get_engine()
 
@@ -27,9 +29,10 @@ def add_product():
 
     try:
         with engine.begin() as conn:
-            conn.execute(text("""
+            product_id = conn.execute(text("""
                 INSERT INTO products (name, barcode, price, stock_quantity, category_id, supplier_id, low_stock_threshold)
                 VALUES (:name, :barcode, :price, :stock, :category_id, :supplier_id, :threshold)
+                RETURNING product_id
             """), {
                 "name": name,
                 "barcode": barcode,
@@ -38,28 +41,51 @@ def add_product():
                 "category_id": category_id,
                 "supplier_id": supplier_id,
                 "threshold": low_stock_threshold
-            })
+            }).scalar_one()
+        catalog.invalidate([product_id])
         print("✅ Product added successfully!")
     except Exception as e:
         print(f"❌ Error adding product: {e}")
 
 
+# ----------------- Import Products from CSV (Admin only) -----------------
+def import_catalog():
+    """Adds or updates products from a CSV file in one COPY. Admin only."""
+    if not has_permission(["ADMIN"]):
+        return
+
+    path = input("Enter CSV file path (columns: name, barcode, price, category_id, supplier_id, ...): ").strip()
+    try:
+        with engine.begin() as conn, open(path, "rb") as f:
+            result = import_products(conn, f)
+        if result["inserted"] or result["updated"]:
+            catalog.invalidate()
+        print(f"✅ {result['rows']:,} rows: {result['inserted']:,} added, {result['updated']:,} updated, "
+              f"{result['rejected']:,} rejected")
+        for reject in result["rejects"][:20]:
+            print(f"   ⚠️ row {reject['row']} ({reject['barcode'] or 'no barcode'}): {reject['error']}")
+        if result["rejected"] > 20:
+            print("💡 Run `python catalog_import.py FILE --rejects rejects.csv` to list every rejected row")
+    except OSError as e:
+        print(f"❌ Cannot read file: {e}")
+    except CatalogImportError as e:
+        print(f"❌ {e.message}")
+    except Exception as e:
+        print(f"❌ Error importing products: {e}")
+
+
 # ----------------- View Products (All roles) -----------------
 def view_products():
-    """Displays product inventory in a table."""
+    """Displays product inventory in a table (served from the catalog cache)."""
     try:
-        with engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT product_id, name, price, stock_quantity, low_stock_threshold 
-                FROM products ORDER BY product_id;
-            """))
-            rows = result.fetchall()
+        rows = catalog.ensure_fresh(engine).all()
 
         if not rows:
             print("\n⚠️ No products found.\n")
             return
 
-        df = [dict(product_id=r[0], name=r[1], price=float(r[2]), stock_quantity=r[3], low_stock_threshold=r[4]) for r in rows]
+        df = [dict(product_id=r["product_id"], name=r["name"], price=r["price"],
+                   stock_quantity=r["stock_quantity"], low_stock_threshold=r["low_stock_threshold"]) for r in rows]
         print("\n--- Product Inventory ---")
         print(tabulate(df, headers="keys", tablefmt="psql"))
         print("-------------------------\n")
@@ -91,10 +117,11 @@ def set_stock_thresholds():
             """), {"threshold": int(new_threshold), "pid": int(product_id)})
             
             updated_product = result.fetchone()
-            if updated_product:
-                print(f"✅ Threshold updated for '{updated_product[0]}' to {new_threshold}")
-            else:
-                print("❌ Product not found.")
+        if updated_product:
+            catalog.invalidate([int(product_id)])
+            print(f"✅ Threshold updated for '{updated_product[0]}' to {new_threshold}")
+        else:
+            print("❌ Product not found.")
                 
     except ValueError:
         print("❌ Please enter valid numbers.")
@@ -0,0 +1,150 @@
+# product_sales_stats.py
+"""
+Per-product sales statistics.
+
+product_sales_daily holds units and revenue per product per sale day, and
+product_sales_stats holds, per product, the last sale time, lifetime units
+and revenue, and rolling 7/30/60/90-day units and revenue. A trigger on
+sale_items (attached_assets/migrations) adds every committed sale to both,
+so dead-stock, clearance and turnover analysis read one row per product
+instead of joining the whole sales history.
+
+The rolling windows count the N complete days before windows_as_of; the
+trigger leaves them alone. slide_windows() moves them forward to today from
+the daily table, a batch of products per short transaction, without locking
+any table: checkouts only write today's rows, which the windows don't read.
+The API server slides every SALES_WINDOWS_INTERVAL seconds (a no-op once a
+day is done); without it, run this module daily. Reports read the windows
+as they are and warn when they are behind. rebuild() recomputes everything
+from sale_items (e.g. after loading history with triggers disabled):
+
+    python product_sales_stats.py             # slide windows to today
+    python product_sales_stats.py --rebuild   # recompute from sale_items
+
+Settings (environment):
+    SALES_WINDOWS_INTERVAL=600
+    SALES_WINDOWS_BATCH=1000
+"""
+import argparse
+import os
+from sqlalchemy import text
+from db import get_engine
+
+WINDOWS = (7, 30, 60, 90)
+SALES_WINDOWS_INTERVAL = float(os.getenv("SALES_WINDOWS_INTERVAL", "600"))
+SALES_WINDOWS_BATCH = int(os.getenv("SALES_WINDOWS_BATCH", "1000"))
+
+_WINDOW_COLUMNS = ", ".join(f"units_{n}d, revenue_{n}d" for n in WINDOWS)
+# Whole days before today only
+_WINDOW_SUMS = ",\n".join(
+    f"COALESCE(SUM(d.units) FILTER (WHERE d.sale_date >= CURRENT_DATE - {n} AND d.sale_date < CURRENT_DATE), 0)"
+    f" AS units_{n}d,\n"
+    f"COALESCE(SUM(d.revenue) FILTER (WHERE d.sale_date >= CURRENT_DATE - {n} AND d.sale_date < CURRENT_DATE), 0)"
+    f" AS revenue_{n}d"
+    for n in WINDOWS
+)
+
+
+def slide_windows(conn, after_product_id=0, batch=SALES_WINDOWS_BATCH):
+    """
+    Slides the windows of the next batch of products after after_product_id
+    that are behind today, in the caller's transaction. Returns the
+    product_ids done, in order; none when every product is up to date.
+    """
+    sets = ", ".join(f"units_{n}d = w.units_{n}d, revenue_{n}d = w.revenue_{n}d" for n in WINDOWS)
+    # Rows are locked in product_id order, like the sale_items trigger, so they can't deadlock
+    done = conn.execute(text(f"""
+        WITH batch AS (
+            SELECT product_id FROM product_sales_stats
+            WHERE product_id > :after AND windows_as_of < CURRENT_DATE
+            ORDER BY product_id
+            LIMIT :batch
+            FOR NO KEY UPDATE
+        ), w AS (
+            SELECT b.product_id, {_WINDOW_SUMS}
+            FROM batch b
+            LEFT JOIN product_sales_daily d
+                   ON d.product_id = b.product_id AND d.sale_date >= CURRENT_DATE - {max(WINDOWS)}
+            GROUP BY b.product_id
+        )
+        UPDATE product_sales_stats st
+        SET {sets}, windows_as_of = CURRENT_DATE
+        FROM w
+        WHERE w.product_id = st.product_id
+        RETURNING st.product_id
+    """), {"after": after_product_id, "batch": batch}).scalars().all()
+    return sorted(done)
+
+
+def refresh_windows(engine=None):
+    """
+    Slides every product's windows to today, one batch per transaction.
+    Returns the number of products updated (0 when already current).
+    """
+    engine = engine or get_engine("analytics")
+    count, after = 0, 0
+    while True:
+        with engine.begin() as conn:
+            done = slide_windows(conn, after)
+        if not done:
+            return count
+        count += len(done)
+        after = done[-1]
+
+
+def warn_if_behind(engine=None):
+    """Prints a warning when reports would read windows older than today"""
+    engine = engine or get_engine("analytics")
+    with engine.connect() as conn:
+        today, as_of = conn.execute(text("SELECT CURRENT_DATE, MIN(windows_as_of) FROM product_sales_stats")).one()
+    if as_of is not None and as_of < today:
+        print(f"⚠️ Sales windows are as of {as_of}; run python product_sales_stats.py to slide them to today")
+
+
+def rebuild(engine=None):
+    """
+    Recomputes both tables from sale_items and sales. Sales already archived
+    out of those tables drop out of the lifetime figures.
+    Returns the number of products with sales.
+    """
+    engine = engine or get_engine("analytics")
+    with engine.begin() as conn:
+        # SHARE mode waits for open checkouts and holds new ones back until commit
+        conn.execute(text("LOCK TABLE sale_items IN SHARE MODE"))
+        conn.execute(text("DELETE FROM product_sales_stats"))
+        conn.execute(text("DELETE FROM product_sales_daily"))
+        conn.execute(text("""
+            INSERT INTO product_sales_daily (product_id, sale_date, units, revenue)
+            SELECT product_id, sale_time::date, SUM(quantity), SUM(quantity * unit_price)
+            FROM sale_items
+            GROUP BY product_id, sale_time::date
+        """))
+        result = conn.execute(text(f"""
+            INSERT INTO product_sales_stats
+                (product_id, last_sale_time, lifetime_units, lifetime_revenue, {_WINDOW_COLUMNS}, windows_as_of)
+            SELECT d.product_id, l.last_sale_time, SUM(d.units), SUM(d.revenue), {_WINDOW_SUMS}, CURRENT_DATE
+            FROM product_sales_daily d
+            JOIN (
+                SELECT product_id, MAX(sale_time) AS last_sale_time
+                FROM sale_items
+                GROUP BY product_id
+            ) l ON l.product_id = d.product_id
+            GROUP BY d.product_id, l.last_sale_time
+        """))
+        return result.rowcount
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain per-product sales statistics")
+    parser.add_argument("--rebuild", action="store_true", help="recompute everything from sale_items")
+    args = parser.parse_args()
+
+    try:
+        if args.rebuild:
+            count = rebuild()
+            print(f"✅ Rebuilt sales statistics for {count} product(s)")
+        else:
+            count = refresh_windows()
+            print(f"✅ Rolling windows refreshed for {count} product(s)")
+    except Exception as e:
+        print(f"❌ Product sales statistics failed: {e}")
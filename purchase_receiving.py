@@ -0,0 +1,153 @@
+# purchase_receiving.py
+"""
+Set-based, idempotent receiving of purchase orders.
+
+A delivery is recorded in one statement, however many lines the order has:
+lock the order and its lines, work out each line's received quantity, record
+the difference as a PO_RECEIPT stock movement per product (stock_ledger.py),
+set the order's status and return the lines.
+
+Quantities are received totals, not increments: "30 of product 7 have
+arrived" (so far, across deliveries). Sending the same receipt again, e.g.
+a client retry after a timeout, changes nothing; a later delivery sends the
+new totals. Without quantities the whole order is received. Totals never go
+down; correct a miscount with a stock adjustment (stock_adjustments.py).
+
+Two receipts of the same order racing each other are serialized by the
+lock; the second sees what the first recorded, so stock is never added
+twice.
+
+Order status: PENDING (nothing received), PARTIAL, RECEIVED (every line
+complete). Functions take a synchronous SQLAlchemy Connection; the API
+server runs them with ``await conn.run_sync(receive_order, ...)``.
+"""
+from sqlalchemy import text
+from stock_ledger import locked_stock
+
+
+class ReceivingError(Exception):
+    """Raised when a receipt cannot be recorded. status_code is the HTTP status the API should answer with."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def _merge_received(received):
+    """Collapse (product_id, received total) pairs into {product_id: total}; the last total given wins."""
+    totals = {}
+    for product_id, quantity in received:
+        if quantity < 0:
+            raise ReceivingError(f"Received quantity for product {product_id} cannot be negative")
+        totals[product_id] = quantity
+    return totals
+
+
+def receive_order(conn, order_id, received=None):
+    """
+    Records a delivery for order_id in the caller's transaction. received is
+    [(product_id, quantity received so far), ...], or None for the whole order.
+    A product on several lines of the order fills them in line order.
+    Returns {"order_id", "previous_status", "status", "lines": [...], "stock_levels": {product_id: stock}}.
+    """
+    totals = _merge_received(received or [])
+    rows = conn.execute(text("""
+        WITH po AS (
+            SELECT order_id, status FROM purchase_orders WHERE order_id = :oid FOR UPDATE
+        ),
+        r AS (
+            SELECT * FROM unnest(CAST(:pids AS INTEGER[]), CAST(:received AS INTEGER[])) AS r(product_id, received)
+        ),
+        -- Locked rows are read as last committed, so a receipt that waited for another sees its result
+        cur AS (
+            SELECT poi.order_item_id, poi.product_id, poi.quantity, poi.received_quantity
+            FROM po
+            JOIN purchase_order_items poi ON poi.order_id = po.order_id
+            FOR UPDATE OF poi
+        ),
+        t AS (
+            SELECT c.order_item_id, c.product_id, c.quantity, c.received_quantity AS previous,
+                   GREATEST(c.received_quantity, CASE
+                       WHEN CAST(:whole AS BOOLEAN) THEN c.quantity
+                       WHEN r.product_id IS NULL THEN 0
+                       -- the product's total fills its lines in order
+                       ELSE LEAST(c.quantity, r.received - (SUM(c.quantity) OVER (
+                           PARTITION BY c.product_id ORDER BY c.order_item_id) - c.quantity))
+                   END) AS received
+            FROM cur c
+            LEFT JOIN r ON r.product_id = c.product_id
+        ),
+        lines AS (
+            UPDATE purchase_order_items poi
+            SET received_quantity = t.received
+            FROM t
+            WHERE poi.order_item_id = t.order_item_id AND t.received > t.previous
+            RETURNING poi.order_item_id, poi.product_id, t.received - t.previous AS added
+        ),
+        -- Stock arrives as ledger movements; the products are locked afterwards, until commit
+        stock AS (
+            INSERT INTO stock_movements (product_id, quantity, kind, reference_id)
+            SELECT product_id, SUM(added), 'PO_RECEIPT', CAST(:oid AS INTEGER)
+            FROM lines
+            GROUP BY product_id
+        ),
+        new_status AS (
+            SELECT CASE WHEN bool_and(received >= quantity) THEN 'RECEIVED'
+                        WHEN bool_or(received > 0) THEN 'PARTIAL'
+                        ELSE 'PENDING' END AS status
+            FROM t
+        ),
+        orders AS (
+            UPDATE purchase_orders o
+            SET status = n.status
+            FROM new_status n
+            WHERE o.order_id = :oid AND n.status IS NOT NULL AND o.status IS DISTINCT FROM n.status
+        )
+        SELECT po.status, n.status, t.order_item_id, t.product_id, t.quantity, t.previous, t.received,
+               COALESCE(l.added, 0)
+        FROM po
+        CROSS JOIN new_status n
+        LEFT JOIN t ON true
+        LEFT JOIN lines l ON l.order_item_id = t.order_item_id
+        ORDER BY t.order_item_id
+    """), {
+        "oid": order_id,
+        "pids": list(totals),
+        "received": list(totals.values()),
+        "whole": received is None,
+    }).fetchall()
+
+    if not rows:
+        raise ReceivingError("Purchase order not found", status_code=404)
+    if rows[0][2] is None:
+        raise ReceivingError("Purchase order has no items", status_code=400)
+
+    # Problems found after the statement roll back with the caller's transaction
+    ordered = {}
+    for r in rows:
+        ordered[r[3]] = ordered.get(r[3], 0) + r[4]
+    for product_id, quantity in totals.items():
+        if product_id not in ordered:
+            raise ReceivingError(f"Product {product_id} is not on purchase order {order_id}")
+        if quantity > ordered[product_id]:
+            raise ReceivingError(f"Received {quantity} of product {product_id} but only {ordered[product_id]} "
+                                 f"were ordered")
+
+    stocked = {r[3] for r in rows if r[7]}
+    return {
+        "order_id": order_id,
+        "previous_status": rows[0][0],
+        "status": rows[0][1],
+        "lines": [
+            {
+                "order_item_id": r[2],
+                "product_id": r[3],
+                "quantity": r[4],
+                "received": r[6],
+                "added": r[7],
+            }
+            for r in rows
+        ],
+        "stock_levels": locked_stock(conn, sorted(stocked)) if stocked else {},
+    }
@@ -0,0 +1,193 @@
+# query_log.py
+"""
+SQL instrumentation: caller tags, timing and a slow-query log.
+
+Every engine from db_config is instrumented on creation. For each statement:
+
+  * the calling function in this project (e.g.
+    ``supplier_analytics.supplier_scorecard_system``) is found from the stack
+    and appended to the SQL as a comment, ``/*caller='...'*/``, so it also
+    shows up in pg_stat_activity and the PostgreSQL logs;
+  * execution is timed, and statements slower than SQL_SLOW_QUERY_MS are
+    written as one JSON object per line to the slow-query log;
+  * with SQL_EXPLAIN_SLOW=1, slow read-only statements are re-run under
+    ``EXPLAIN (ANALYZE, BUFFERS)`` (inside a savepoint that is always rolled
+    back, at most once per statement every SQL_EXPLAIN_INTERVAL seconds) and
+    the plan is logged too. This runs the statement a second time, so enable
+    it while diagnosing.
+
+Settings (environment):
+    SQL_TAG_CALLER=1            append the caller comment (0 to disable)
+    SQL_SLOW_QUERY_MS=500       slow-query threshold
+    SQL_SLOW_QUERY_LOG=path     log file (default: stderr)
+    SQL_SLOW_QUERY_PARAMS=0     include bind parameters (may contain personal data)
+    SQL_EXPLAIN_SLOW=0          capture plans for slow SELECTs
+    SQL_EXPLAIN_INTERVAL=300
+"""
+import datetime
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from sqlalchemy import event
+
+try:
+    from greenlet import getcurrent
+except ImportError:  # only installed with SQLAlchemy's asyncio support
+    getcurrent = None
+
+SQL_TAG_CALLER = os.getenv("SQL_TAG_CALLER", "1") == "1"
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "500"))
+SQL_SLOW_QUERY_LOG = os.getenv("SQL_SLOW_QUERY_LOG")
+SQL_SLOW_QUERY_PARAMS = os.getenv("SQL_SLOW_QUERY_PARAMS", "0") == "1"
+SQL_EXPLAIN_SLOW = os.getenv("SQL_EXPLAIN_SLOW", "0") == "1"
+SQL_EXPLAIN_INTERVAL = float(os.getenv("SQL_EXPLAIN_INTERVAL", "300"))
+
+_PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Plumbing modules are never reported as the caller
+_SKIP_MODULES = {"db", "db_config", "query_log", "metrics"}
+_WRITES = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|CREATE|DROP|ALTER|COPY|LOCK|CALL|DO)\b",
+                     re.IGNORECASE)
+
+_caller_names = {}     # code object -> 'module.function' or None
+_explained = {}        # (caller, statement) -> time.monotonic() of the last EXPLAIN
+_explain_lock = threading.Lock()
+
+slow_log = logging.getLogger("slow_queries")
+slow_log.propagate = False
+if not slow_log.handlers:
+    _handler = logging.FileHandler(SQL_SLOW_QUERY_LOG) if SQL_SLOW_QUERY_LOG else logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    slow_log.addHandler(_handler)
+    slow_log.setLevel(logging.WARNING)
+
+
+# ----------------- Caller tagging -----------------
+def _project_function(code):
+    """'module.function' when code belongs to a project module, else None (memoised per code object)"""
+    name = _caller_names.get(code, False)
+    if name is False:
+        path = os.path.abspath(code.co_filename)
+        module = os.path.splitext(os.path.basename(path))[0]
+        if os.path.dirname(path) == _PROJECT_DIR and module not in _SKIP_MODULES:
+            name = f"{module}.{code.co_name}"
+        else:
+            name = None
+        _caller_names[code] = name
+    return name
+
+
+def _frames():
+    """Yields the current stack, innermost first, continuing into the greenlet that awaits us"""
+    # Async engines run each statement in a greenlet whose stack ends inside SQLAlchemy;
+    # the calling coroutine (an API route) is suspended in the parent greenlet.
+    frame = sys._getframe(3)
+    current = getcurrent() if getcurrent else None
+    while frame is not None:
+        yield frame
+        frame = frame.f_back
+        if frame is None and current is not None and current.parent is not None:
+            current = current.parent
+            frame = current.gr_frame
+
+
+def find_caller():
+    """
+    The project functions that issued the current statement, outermost first:
+    'analytics.peak_hours_analysis/report.fetch_report'. Two levels are kept so
+    shared helpers still name the report or route that called them.
+    """
+    names = []
+    for frame in _frames():
+        name = _project_function(frame.f_code)
+        if name and name not in names:
+            names.append(name)
+            if len(names) == 2:
+                break
+    return "/".join(reversed(names)) or "unknown"
+
+
+# ----------------- Plan capture -----------------
+def _should_explain(caller, statement, context, executemany):
+    if executemany or context.execution_options.get("stream_results") or _WRITES.search(statement):
+        return False
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return False
+    now = time.monotonic()
+    with _explain_lock:
+        if now - _explained.get((caller, statement), -SQL_EXPLAIN_INTERVAL) < SQL_EXPLAIN_INTERVAL:
+            return False
+        _explained[(caller, statement)] = now
+    return True
+
+
+def _explain(conn, statement, parameters):
+    """
+    Runs EXPLAIN (ANALYZE, BUFFERS) on the statement's own connection and
+    always rolls it back, so whatever the second run does is never kept.
+    """
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if getattr(conn.connection.dbapi_connection, "autocommit", False):
+            begin, undo = "BEGIN", ["ROLLBACK"]
+        else:
+            begin, undo = "SAVEPOINT query_log_explain", ["ROLLBACK TO SAVEPOINT query_log_explain",
+                                                          "RELEASE SAVEPOINT query_log_explain"]
+        cursor.execute(begin)
+        try:
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS) " + statement, parameters)
+            return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            return [f"EXPLAIN failed: {e}"]
+        finally:
+            for sql in undo:
+                cursor.execute(sql)
+    finally:
+        cursor.close()
+
+
+# ----------------- Engine events -----------------
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_log_caller = caller = find_caller()
+    context._query_log_statement = statement
+    context._query_log_start = time.perf_counter()
+    if SQL_TAG_CALLER:
+        statement = f"{statement}\n/*caller='{caller}'*/"
+    return statement, parameters
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - context._query_log_start) * 1000
+    if elapsed_ms < SQL_SLOW_QUERY_MS:
+        return
+    caller = context._query_log_caller
+    statement = context._query_log_statement
+    record = {
+        "time": datetime.datetime.now().isoformat(timespec="milliseconds"),
+        "caller": caller,
+        "duration_ms": round(elapsed_ms, 1),
+        "rows": cursor.rowcount,
+        "pool": getattr(conn.engine, "pool_name", None),
+        "statement": " ".join(statement.split()),
+    }
+    if SQL_SLOW_QUERY_PARAMS:
+        record["parameters"] = parameters
+    if SQL_EXPLAIN_SLOW and _should_explain(caller, statement, context, executemany):
+        try:
+            record["plan"] = _explain(conn, statement, parameters)
+        except Exception as e:
+            record["plan"] = [f"EXPLAIN failed: {e}"]
+    slow_log.warning(json.dumps(record, default=str))
+
+
+def instrument(engine, pool_name=None):
+    """Attaches caller tagging, timing and the slow-query log to a sync Engine (or AsyncEngine.sync_engine)"""
+    if event.contains(engine, "before_cursor_execute", _before_execute):
+        return engine
+    engine.pool_name = pool_name
+    event.listen(engine, "before_cursor_execute", _before_execute, retval=True)
+    event.listen(engine, "after_cursor_execute", _after_execute)
+    return engine
@@ -1,12 +1,13 @@
 # report.py
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from tabulate import tabulate
-from db import get_connection_string 
+from db import get_engine
 import datetime
 
 # ------------------ Setup Engine ------------------
-engine = create_engine(get_connection_string(), echo=False, future=True)
+# Reports share the process-wide analytics pool
+engine = get_engine("analytics")
 
 # ------------------ Helper Function ------------------
 def fetch_report(query, report_name, file_name, params=None):
@@ -51,11 +52,27 @@ def fetch_report(query, report_name, file_name, params=None):
 
 # ------------------ Report Functions ------------------
 def daily_sales_report(start_date=None, end_date=None):
-    query = "SELECT * FROM daily_sales_report"
+    # Answered from the daily sales rollup (see sales_rollups.py)
+    where = ""
     params = None
     if start_date and end_date:
-        query += " WHERE date BETWEEN :start AND :end"
+        where = "WHERE sale_date BETWEEN :start AND :end"
         params = {"start": start_date, "end": end_date}
+    query = f"""
+        SELECT sale_date as date,
+               SUM(sale_count) as transactions,
+               SUM(revenue) as total_revenue,
+               ROUND(SUM(revenue) / NULLIF(SUM(sale_count), 0), 2) as avg_ticket,
+               SUM(revenue) FILTER (WHERE payment_method = 'CASH') as cash,
+               SUM(revenue) FILTER (WHERE payment_method = 'CARD') as card,
+               SUM(revenue) FILTER (WHERE payment_method = 'UPI') as upi,
+               SUM(revenue) FILTER (WHERE payment_method = 'WALLET') as wallet
+        FROM sales_rollup_daily
+        {where}
+        GROUP BY sale_date
+        HAVING SUM(sale_count) > 0
+        ORDER BY sale_date DESC
+    """
     fetch_report(query, "Daily Sales Report", "daily_sales_report", params)
 
 def best_selling_products(top_n=10):
@@ -0,0 +1,163 @@
+# sales_archive.py
+"""
+Archival of old sales to compressed CSV files, a small batch at a time.
+
+archive_sales() moves every sale before a cutoff, with its sale_items, out
+of the database. Each batch is one short transaction:
+
+    1. lock the oldest ARCHIVE_BATCH_SALES sales before the cutoff
+    2. COPY them and their items to gzip CSV files (written and fsynced)
+    3. delete them, commit, then pause ARCHIVE_BATCH_PAUSE seconds
+
+so checkouts never wait long behind it and a year of history can be
+archived during trading hours. Files go to ARCHIVE_DIR/YYYY-MM/ (month of
+the batch's first sale) as sales_<first sale>.csv.gz and
+sale_items_<first sale>.csv.gz, with a header row; load them back with
+COPY ... FROM ... WITH (FORMAT csv, HEADER).
+
+A run can be interrupted and started again: archived batches are gone from
+the database, and a batch that did not commit is picked again and rewrites
+the same files.
+
+Archived sales stay in the sales rollups (the rollups' DELETE trigger is
+skipped; see attached_assets/migrations), like months retired by
+sales_partitions.py. Months left empty can then be dropped with
+``python sales_partitions.py --retire-before ... --drop``.
+
+    python sales_archive.py --before 2025-01-01
+    python sales_archive.py --older-than-days 365 --batch-size 1000 --pause 1
+
+Settings (environment):
+    SALES_ARCHIVE_DIR=archive
+    SALES_ARCHIVE_BATCH_SALES=2000
+    SALES_ARCHIVE_BATCH_PAUSE=0.2
+"""
+import argparse
+import datetime
+import gzip
+import os
+import time
+from db import get_engine
+
+ARCHIVE_DIR = os.getenv("SALES_ARCHIVE_DIR", "archive")
+ARCHIVE_BATCH_SALES = int(os.getenv("SALES_ARCHIVE_BATCH_SALES", "2000"))
+ARCHIVE_BATCH_PAUSE = float(os.getenv("SALES_ARCHIVE_BATCH_PAUSE", "0.2"))
+
+SALE_COLUMNS = ("sale_id", "sale_time", "total_amount", "payment_method", "customer_id", "employee_id",
+                "client_sale_id")
+ITEM_COLUMNS = ("sale_item_id", "sale_id", "sale_time", "product_id", "quantity", "unit_price")
+
+
+def _copy_out(cur, path, table, columns, sale_ids, first, last):
+    """COPYs one batch's rows of table to a gzip CSV file, replacing it atomically once on disk"""
+    query = cur.mogrify(f"""
+        COPY (SELECT {', '.join(columns)} FROM {table}
+              WHERE sale_time BETWEEN %s AND %s AND sale_id = ANY(%s)
+              ORDER BY {columns[0]})
+        TO STDOUT WITH (FORMAT csv, HEADER)
+    """, (first, last, sale_ids)).decode()
+    partial = path + ".part"
+    with open(partial, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as f:
+            cur.copy_expert(query, f)
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(partial, path)
+
+
+def archive_sales(engine=None, before=None, directory=ARCHIVE_DIR, batch_sales=ARCHIVE_BATCH_SALES,
+                  pause=ARCHIVE_BATCH_PAUSE, progress=None):
+    """
+    Archives, then deletes, every sale with sale_time before `before` (a
+    date), batch by batch. progress(sales, items, total sales) is called
+    after each batch. Returns (sales, sale items) archived.
+    """
+    engine = engine or get_engine("oltp")
+    conn = engine.raw_connection()
+    sales = items = 0
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM sales WHERE sale_time < %s", (before,))
+            total = cur.fetchone()[0]
+            conn.commit()
+            while True:
+                # Skips the rollups' DELETE trigger for this transaction only
+                cur.execute("SELECT set_config('sales.archiving', 'on', true)")
+                # The tables this batch deletes from, in the order backups and checkouts lock them
+                cur.execute("LOCK TABLE sale_client_ids, sales, sale_items IN ROW EXCLUSIVE MODE")
+                cur.execute("""
+                    SELECT sale_id, sale_time FROM sales
+                    WHERE sale_time < %s
+                    ORDER BY sale_time, sale_id
+                    LIMIT %s
+                    FOR UPDATE
+                """, (before, batch_sales))
+                batch = cur.fetchall()
+                if not batch:
+                    conn.commit()
+                    break
+                sale_ids = [sale_id for sale_id, _ in batch]
+                first, last = batch[0][1], batch[-1][1]
+
+                folder = os.path.join(directory, first.strftime("%Y-%m"))
+                os.makedirs(folder, exist_ok=True)
+                name = f"{first:%Y%m%dT%H%M%S}_{sale_ids[0]}.csv.gz"
+                _copy_out(cur, os.path.join(folder, f"sales_{name}"), "sales", SALE_COLUMNS,
+                          sale_ids, first, last)
+                _copy_out(cur, os.path.join(folder, f"sale_items_{name}"), "sale_items", ITEM_COLUMNS,
+                          sale_ids, first, last)
+
+                cur.execute("""
+                    DELETE FROM sale_items WHERE sale_time BETWEEN %s AND %s AND sale_id = ANY(%s)
+                """, (first, last, sale_ids))
+                batch_items = cur.rowcount
+                cur.execute("""
+                    WITH archived AS (
+                        DELETE FROM sales WHERE sale_time BETWEEN %s AND %s AND sale_id = ANY(%s)
+                        RETURNING client_sale_id
+                    )
+                    DELETE FROM sale_client_ids
+                    WHERE client_sale_id IN (SELECT client_sale_id FROM archived WHERE client_sale_id IS NOT NULL)
+                """, (first, last, sale_ids))
+                conn.commit()
+
+                sales += len(sale_ids)
+                items += batch_items
+                if progress:
+                    progress(sales, items, total)
+                time.sleep(pause)
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return sales, items
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive old sales to compressed CSV files and delete them")
+    cutoff = parser.add_mutually_exclusive_group(required=True)
+    cutoff.add_argument("--before", type=datetime.date.fromisoformat, help="archive sales before this date")
+    cutoff.add_argument("--older-than-days", type=int, help="archive sales older than this many days")
+    parser.add_argument("--dir", default=ARCHIVE_DIR, help=f"archive directory (default {ARCHIVE_DIR})")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SALES, help="sales per batch")
+    parser.add_argument("--pause", type=float, default=ARCHIVE_BATCH_PAUSE, help="seconds between batches")
+    args = parser.parse_args()
+
+    before = args.before or datetime.date.today() - datetime.timedelta(days=args.older_than_days)
+    started = time.monotonic()
+
+    def report(sales, items, total):
+        rate = sales / max(time.monotonic() - started, 1e-9)
+        print(f"   ✔ {sales:,} / {total:,} sales ({items:,} items, {rate:,.0f} sales/s)", end="\r")
+
+    try:
+        sales, items = archive_sales(before=before, directory=args.dir, batch_sales=args.batch_size,
+                                     pause=args.pause, progress=report)
+        print()
+        print(f"✅ Archived {sales:,} sales ({items:,} items) before {before} to {args.dir}/")
+    except KeyboardInterrupt:
+        print("\n⚠️ Interrupted; run again to resume")
+    except Exception as e:
+        print(f"\n❌ Archival failed: {e}")
+        raise SystemExit(1)
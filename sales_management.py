@@ -3,6 +3,8 @@ from sqlalchemy import text
 from tabulate import tabulate
 from db import get_engine
 from auth import has_permission, get_current_user, get_current_name
+from checkout import complete_sale, price_cart, CheckoutError, PAYMENT_METHODS
+from catalog_cache import catalog
 
 engine = get_engine()
 
@@ -13,15 +15,14 @@ def process_sale():
         return
 
     cart = []
-    total = 0.0
     current_user = get_current_user()
     current_name = get_current_name()
 
+    # Import here to avoid circular import
+    from product_management import view_products
+    view_products()
+
     while True:
-        # Import here to avoid circular import
-        from product_management import view_products
-        view_products()
-        
         product_id = input("Enter Product ID (or 'done' to finish): ").strip()
         if product_id.lower() == 'done':
             break
@@ -32,6 +33,16 @@ def process_sale():
             print("❌ Invalid Product ID. Try again.")
             continue
 
+        product = catalog.ensure_fresh(engine).get(pid)
+        if product is None:
+            # May have been added by another process since the cache was loaded
+            catalog.invalidate([pid])
+            product = catalog.ensure_fresh(engine).get(pid)
+        if product is None:
+            print("❌ Product not found. Try again.")
+            continue
+        print(f"   {product['name']} | ₹{product['price']:.2f} | In stock: {product['stock_quantity']}")
+
         try:
             quantity = int(input("Enter quantity: ").strip())
             if quantity <= 0:
@@ -41,89 +52,62 @@ def process_sale():
             print("❌ Invalid number. Try again.")
             continue
 
-        try:
-            with engine.connect() as conn:
-                result = conn.execute(text("""
-                    SELECT name, price, stock_quantity
-                    FROM products
-                    WHERE product_id = :pid
-                """), {"pid": pid})
-                product_data = result.fetchone()
-
-            if not product_data:
-                print("❌ Product ID not found.")
-                continue
-            if product_data[2] < quantity:
-                print(f"❌ Only {product_data[2]} units in stock.")
-                continue
-
-            item_total = float(product_data[1]) * quantity
-            cart.append({
-                'product_id': pid,
-                'name': product_data[0],
-                'price': float(product_data[1]),
-                'quantity': quantity,
-                'item_total': item_total
-            })
-            total += item_total
-            print(f"✅ Added {quantity} x {product_data[0]}. Item Total: ₹{item_total:.2f}")
-
-        except Exception as e:
-            print(f"❌ Database error: {e}")
-            return
+        cart.append((pid, quantity))
+        print(f"✅ Added {quantity} x {product['name']}.")
 
     if not cart:
         print("❌ Cart is empty. Sale cancelled.")
         return
 
+    # Price the whole cart in one query; drop lines that can't be sold
+    try:
+        with engine.connect() as conn:
+            quote = price_cart(conn, cart)
+    except Exception as e:
+        print(f"❌ Database error: {e}")
+        return
+
+    for product_id, message in quote['problems']:
+        print(f"❌ Removed product {product_id} from cart: {message}")
+    if not quote['lines']:
+        print("❌ Cart is empty. Sale cancelled.")
+        return
+
+    rows = [dict(product_id=l['product_id'], name=l['name'], quantity=l['quantity'],
+                 price=float(l['price']), item_total=float(l['subtotal'])) for l in quote['lines']]
+    print(tabulate(rows, headers="keys", tablefmt="psql"))
+
     # Payment
-    print(f"\nTotal Amount: ₹{total:.2f}")
+    print(f"\nTotal Amount: ₹{quote['total']:.2f}")
     payment_method = input("Enter payment method (CASH/CARD/UPI/WALLET): ").strip().upper()
-    if payment_method not in ('CASH', 'CARD', 'UPI', 'WALLET'):
+    if payment_method not in PAYMENT_METHODS:
         print("❌ Invalid payment method. Sale cancelled.")
         return
 
     customer_id = input("Enter customer ID (or leave blank if walk-in): ").strip() or None
+    if customer_id is not None:
+        try:
+            customer_id = int(customer_id)
+        except ValueError:
+            print("❌ Invalid customer ID. Sale cancelled.")
+            return
 
     try:
+        # Validation, stock locking and the write happen in one transaction
         with engine.begin() as conn:
-            # Validate customer if provided
-            if customer_id:
-                res = conn.execute(text("SELECT 1 FROM customers WHERE customer_id = :cid"), {"cid": customer_id})
-                if res.fetchone() is None:
-                    print("❌ Invalid customer ID. Sale cancelled.")
-                    return
-
-            # Insert sale using the current_user as employee_id
-            result = conn.execute(text("""
-                INSERT INTO sales (total_amount, payment_method, customer_id, employee_id)
-                VALUES (:total, :pm, :cid, :eid)
-                RETURNING sale_id
-            """), {
-                "total": round(total, 2),
-                "pm": payment_method,
-                "cid": customer_id,
-                "eid": current_user
-            })
-            sale_id_row = result.fetchone()
-            if not sale_id_row:
-                raise RuntimeError("Failed to create sale record.")
-            sale_id = sale_id_row[0]
-
-            # Insert sale items
-            for item in cart:
-                conn.execute(text("""
-                    INSERT INTO sale_items (sale_id, product_id, quantity, unit_price)
-                    VALUES (:sale_id, :pid, :qty, :price)
-                """), {
-                    "sale_id": sale_id,
-                    "pid": item['product_id'],
-                    "qty": item['quantity'],
-                    "price": item['price']
-                })
+            receipt = complete_sale(
+                conn,
+                [(l['product_id'], l['quantity']) for l in quote['lines']],
+                payment_method,
+                current_user,
+                customer_id,
+            )
+        catalog.apply_stock(receipt['stock_levels'])
 
         print("🎉 Sale completed successfully!")
-        print(f"🧾 Sale ID: {sale_id} | Total: ₹{total:.2f} | Cashier: {current_name}")
+        print(f"🧾 Sale ID: {receipt['sale_id']} | Total: ₹{receipt['total']:.2f} | Cashier: {current_name}")
 
+    except CheckoutError as e:
+        print(f"❌ Sale cancelled: {e.message}")
     except Exception as e:
-        print(f"❌ Transaction cancelled due to error: {e}")
\ No newline at end of file
+        print(f"❌ Transaction cancelled due to error: {e}")
@@ -0,0 +1,142 @@
+# sales_partitions.py
+"""
+Monthly partitions of sales and sale_items.
+
+Both tables are partitioned by sale_time, one partition per calendar month
+(sales_y2025m01, sale_items_y2025m01, ...; see attached_assets/migrations),
+so time-window reports scan only the months they cover and old months are
+retired whole instead of by DELETE.
+
+A sale can only be recorded once its month has a partition. ensure_upcoming()
+creates the current month and PARTITION_MONTHS_AHEAD months ahead; the API
+server runs it at startup and this module's job should run daily. Offline
+batches carrying older sale times create the months they need.
+
+retire() removes every month before a cutoff. Each month's partitions are
+detached with DETACH PARTITION CONCURRENTLY, which does not block checkouts,
+then either kept as plain tables (archived_sales_y2025m01, ...) for export
+or dropped. A detach left pending by an interrupted run is finished with
+DETACH PARTITION ... FINALIZE, so retire() can simply be run again. No DELETE triggers fire, so sales rollups and per-product
+statistics keep those months; run dashboard_counters.py to re-base the
+all-time counters.
+
+    python sales_partitions.py                                     # create upcoming months, list
+    python sales_partitions.py --retire-before 2024-01-01          # detach and keep as archived_*
+    python sales_partitions.py --retire-before 2024-01-01 --drop
+"""
+import argparse
+import datetime
+import os
+from sqlalchemy import text
+from db import get_engine
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("SALES_PARTITION_MONTHS_AHEAD", "3"))
+# Creating a partition briefly locks the parent table; give up rather than queue checkouts behind it
+PARTITION_LOCK_TIMEOUT = os.getenv("SALES_PARTITION_LOCK_TIMEOUT", "5s")
+PARENTS = ("sale_items", "sales")    # detach order: referencing table first
+
+
+def _add_months(day, months):
+    month = day.month - 1 + months
+    return datetime.date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def ensure_partitions(conn, first_day, last_day):
+    """Creates any missing monthly partitions covering first_day..last_day, in the caller's transaction"""
+    return conn.execute(text("SELECT sales_partitions_ensure(CAST(:first AS DATE), CAST(:last AS DATE))"),
+                        {"first": first_day, "last": last_day}).scalar()
+
+
+def ensure_upcoming(conn, months_ahead=PARTITION_MONTHS_AHEAD):
+    """Creates the current month's partitions and months_ahead more. Returns the number created."""
+    conn.execute(text(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT}'"))
+    today = datetime.date.today()
+    return ensure_partitions(conn, today.replace(day=1), _add_months(today, months_ahead))
+
+
+def list_partitions(conn):
+    """[(parent, partition, month, estimated rows, bytes)] for every attached partition, oldest first"""
+    return conn.execute(text("""
+        SELECT parent.relname, child.relname,
+               to_date(substring(child.relname from '_y(\\d{4}m\\d{2})$'), 'YYYY"m"MM'),
+               GREATEST(child.reltuples, 0)::bigint, pg_total_relation_size(child.oid)
+        FROM pg_inherits i
+        JOIN pg_class parent ON parent.oid = i.inhparent
+        JOIN pg_class child ON child.oid = i.inhrelid
+        WHERE parent.oid IN ('public.sales'::regclass, 'public.sale_items'::regclass)
+        ORDER BY 3, 1
+    """)).fetchall()
+
+
+def retire(engine=None, before=None, drop=False, progress=None):
+    """
+    Detaches every monthly partition that ends on or before `before` (a date;
+    months are only retired whole) and renames it archived_<name>, or drops
+    it. Returns the months retired.
+    """
+    engine = engine or get_engine("oltp")
+    with engine.connect() as conn:
+        months = sorted({row[2] for row in list_partitions(conn)
+                         if row[2] is not None and _add_months(row[2], 1) <= before})
+        # {partition: detach pending} for every attached partition
+        attached = dict(conn.execute(text("""
+            SELECT child.relname, i.inhdetachpending
+            FROM pg_inherits i
+            JOIN pg_class child ON child.oid = i.inhrelid
+            WHERE i.inhparent IN ('public.sales'::regclass, 'public.sale_items'::regclass)
+        """)).fetchall())
+
+    # DETACH ... CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for month in months:
+            suffix = month.strftime("_y%Ym%m")
+            for parent in PARENTS:
+                partition = parent + suffix
+                if partition not in attached:
+                    # Detached by an earlier run that stopped part way through the month
+                    if conn.execute(text("SELECT to_regclass(:name)"), {"name": partition}).scalar() is None:
+                        continue
+                elif attached[partition]:
+                    # An earlier DETACH ... CONCURRENTLY was interrupted; nothing can be attached
+                    # or detached on the parent until it is finished
+                    conn.execute(text(f"ALTER TABLE {parent} DETACH PARTITION {partition} FINALIZE"))
+                else:
+                    conn.execute(text(f"ALTER TABLE {parent} DETACH PARTITION {partition} CONCURRENTLY"))
+                if parent == "sale_items":
+                    # The detached items still reference sales; drop that so the month of sales can go too
+                    conn.execute(text(f"ALTER TABLE {partition} DROP CONSTRAINT IF EXISTS sale_items_sale_id_fkey"))
+                if drop:
+                    conn.execute(text(f"DROP TABLE {partition}"))
+                else:
+                    conn.execute(text(f"ALTER TABLE {partition} RENAME TO archived_{partition}"))
+            conn.execute(text("DELETE FROM sale_client_ids WHERE sale_time < CAST(:end AS DATE)"),
+                         {"end": _add_months(month, 1)})
+            if progress:
+                progress(month)
+    return months
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create and retire monthly sales partitions")
+    parser.add_argument("--months-ahead", type=int, default=PARTITION_MONTHS_AHEAD)
+    parser.add_argument("--retire-before", type=datetime.date.fromisoformat,
+                        help="retire whole months ending on or before this date (YYYY-MM-DD)")
+    parser.add_argument("--drop", action="store_true", help="drop retired months instead of keeping archived_* tables")
+    args = parser.parse_args()
+
+    engine = get_engine("oltp")
+    try:
+        with engine.begin() as conn:
+            created = ensure_upcoming(conn, args.months_ahead)
+        print(f"✅ Sales partitions ready through {_add_months(datetime.date.today(), args.months_ahead):%Y-%m}"
+              f" ({created} created)")
+        if args.retire_before:
+            months = retire(engine, args.retire_before, drop=args.drop,
+                            progress=lambda m: print(f"   ✔ Retired {m:%Y-%m}"))
+            action = "Dropped" if args.drop else "Detached"
+            print(f"✅ {action} {len(months)} month(s) of sales")
+        with engine.connect() as conn:
+            for parent, partition, month, rows, size in list_partitions(conn):
+                print(f"   {partition:<24} ~{rows:>12,} rows  {size / 1048576:>10,.1f} MB")
+    except Exception as e:
+        print(f"❌ Partition maintenance failed: {e}")
@@ -0,0 +1,94 @@
+# sales_rollups.py
+"""
+Hourly and daily sales rollups.
+
+sales_rollup_hourly (bucket) and sales_rollup_daily (sale_date) hold
+sale_count and revenue per payment method and employee (0 = none). Triggers
+on sales (attached_assets/migrations) keep them current as sales commit, so
+time-series reports (sales by date, peak hours, seasonal trends, daily sales)
+aggregate a few rows per hour/day instead of the raw sales history.
+
+backfill() rebuilds the rollups for a date range from the sales table, one
+day per transaction. Use it after loading historical sales with triggers
+disabled, or to repair a range:
+
+    python sales_rollups.py                          # whole history
+    python sales_rollups.py --start 2024-01-01 --end 2024-12-31
+"""
+import argparse
+import datetime
+from sqlalchemy import text
+from db import get_engine
+
+
+def _sales_date_range(conn):
+    return conn.execute(text("""
+        SELECT MIN(sale_time)::date, MAX(sale_time)::date FROM sales WHERE sale_time IS NOT NULL
+    """)).fetchone()
+
+
+def backfill_day(conn, day):
+    """Recomputes both rollups for one day from sales, in the caller's transaction"""
+    # SHARE mode waits for open sale transactions and holds new ones back until commit,
+    # so the rebuilt rows can't miss (or double count) a sale committing meanwhile
+    conn.execute(text("LOCK TABLE sales IN SHARE MODE"))
+    params = {"start": day, "end": day + datetime.timedelta(days=1)}
+    conn.execute(text("""
+        DELETE FROM sales_rollup_hourly WHERE bucket >= :start AND bucket < :end
+    """), params)
+    conn.execute(text("DELETE FROM sales_rollup_daily WHERE sale_date = :start"), params)
+    conn.execute(text("""
+        INSERT INTO sales_rollup_hourly (bucket, payment_method, employee_id, sale_count, revenue)
+        SELECT date_trunc('hour', sale_time), payment_method, COALESCE(employee_id, 0),
+               COUNT(*), SUM(total_amount)
+        FROM sales
+        WHERE sale_time >= :start AND sale_time < :end
+        GROUP BY 1, 2, 3
+    """), params)
+    conn.execute(text("""
+        INSERT INTO sales_rollup_daily (sale_date, payment_method, employee_id, sale_count, revenue)
+        SELECT CAST(:start AS DATE), payment_method, employee_id, SUM(sale_count), SUM(revenue)
+        FROM sales_rollup_hourly
+        WHERE bucket >= :start AND bucket < :end
+        GROUP BY payment_method, employee_id
+    """), params)
+
+
+def backfill(engine=None, start=None, end=None, progress=None):
+    """
+    Rebuilds the rollups for every day from start to end (inclusive), one transaction per day.
+    Defaults to the full range of sale_time. Returns the number of days processed.
+    """
+    engine = engine or get_engine("analytics")
+    if start is None or end is None:
+        with engine.connect() as conn:
+            first, last = _sales_date_range(conn)
+        if first is None:
+            return 0
+        start = start or first
+        end = end or last
+
+    days = 0
+    day = start
+    while day <= end:
+        with engine.begin() as conn:
+            backfill_day(conn, day)
+        days += 1
+        if progress:
+            progress(day)
+        day += datetime.timedelta(days=1)
+    return days
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild sales rollups from the sales table")
+    parser.add_argument("--start", type=datetime.date.fromisoformat, help="first day (YYYY-MM-DD)")
+    parser.add_argument("--end", type=datetime.date.fromisoformat, help="last day (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    try:
+        count = backfill(start=args.start, end=args.end,
+                         progress=lambda day: print(f"   ✔ {day}", end="\r"))
+        print(f"✅ Rebuilt sales rollups for {count} day(s)")
+    except Exception as e:
+        print(f"❌ Rollup backfill failed: {e}")
@@ -0,0 +1,185 @@
+# session_tokens.py
+"""
+Signed session tokens for the API.
+
+Login issues a JWT (HS256) carrying the employee id, name and role. Routes
+check it with the ``current_session`` / ``require_role`` dependencies, which
+need no database round trip:
+
+  * a verified token's claims are cached in memory until it expires, so
+    repeat requests skip signature checking entirely;
+  * logout adds the token id to ``revoked_tokens``; every process re-reads
+    the (small) list of unexpired revocations at most every
+    TOKEN_REVOCATION_REFRESH seconds and checks membership in memory.
+
+Every uvicorn worker validates tokens on its own, so they must share
+JWT_SECRET. Without it a random per-process secret is used and tokens only
+work on the worker that issued them, until it restarts.
+"""
+import os
+import secrets
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from jose import jwt, JWTError
+from sqlalchemy import text
+from db_config import get_async_engine
+
+JWT_ALGORITHM = "HS256"
+TOKEN_TTL_MINUTES = int(os.getenv("TOKEN_TTL_MINUTES", "720"))  # one long shift
+TOKEN_REVOCATION_REFRESH = float(os.getenv("TOKEN_REVOCATION_REFRESH", "5"))
+TOKEN_CACHE_SIZE = 4096
+
+JWT_SECRET = os.getenv("JWT_SECRET")
+if not JWT_SECRET:
+    JWT_SECRET = secrets.token_urlsafe(32)
+    print("⚠️ JWT_SECRET not set: session tokens are valid only in this process until it restarts")
+
+
+class TokenError(ValueError):
+    """Raised for a missing, malformed, expired or revoked token (the API answers 401)."""
+
+
+class Session:
+    """The authenticated caller of one request, as read from its token"""
+    __slots__ = ("employee_id", "name", "role", "token_id", "expires_at")
+
+    def __init__(self, claims):
+        self.employee_id = int(claims["sub"])
+        self.name = claims.get("name")
+        self.role = claims["role"]
+        self.token_id = claims["jti"]
+        self.expires_at = claims["exp"]
+
+
+def issue_token(employee_id, name, role):
+    """Returns (token, expires_at) for a successful login; expires_at is a UNIX timestamp"""
+    now = int(time.time())
+    expires_at = now + TOKEN_TTL_MINUTES * 60
+    token = jwt.encode({
+        "sub": str(employee_id),
+        "name": name,
+        "role": role,
+        "iat": now,
+        "exp": expires_at,
+        "jti": uuid.uuid4().hex,
+    }, JWT_SECRET, algorithm=JWT_ALGORITHM)
+    return token, expires_at
+
+
+class _VerifiedTokens:
+    """LRU of token -> Session for tokens whose signature has already been checked"""
+
+    def __init__(self, size=TOKEN_CACHE_SIZE):
+        self.size = size
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+
+    def get(self, token):
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is not None:
+                self._sessions.move_to_end(token)
+            return session
+
+    def put(self, token, session):
+        with self._lock:
+            self._sessions[token] = session
+            if len(self._sessions) > self.size:
+                self._sessions.popitem(last=False)
+
+
+class RevocationList:
+    """In-memory copy of revoked_tokens (token ids revoked before they expire)"""
+
+    def __init__(self, refresh_interval=TOKEN_REVOCATION_REFRESH):
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._revoked = {}        # token id -> expires_at (UNIX time)
+        self._loaded_at = None
+        self._refreshing = False
+
+    def needs_refresh(self):
+        with self._lock:
+            expired = self._loaded_at is None or time.monotonic() - self._loaded_at > self.refresh_interval
+            return expired and not self._refreshing
+
+    def refresh(self, conn):
+        with self._lock:
+            self._refreshing = True
+        try:
+            rows = conn.execute(text("""
+                SELECT jti, EXTRACT(EPOCH FROM expires_at) FROM revoked_tokens WHERE expires_at > now()
+            """)).fetchall()
+            with self._lock:
+                self._revoked = {r[0]: float(r[1]) for r in rows}
+                self._loaded_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def revoke(self, conn, session):
+        """Records a revocation in the caller's transaction and applies it in this process"""
+        conn.execute(text("DELETE FROM revoked_tokens WHERE expires_at < now()"))
+        conn.execute(text("""
+            INSERT INTO revoked_tokens (jti, employee_id, expires_at)
+            VALUES (:jti, :eid, to_timestamp(:exp))
+            ON CONFLICT (jti) DO NOTHING
+        """), {"jti": session.token_id, "eid": session.employee_id, "exp": session.expires_at})
+        with self._lock:
+            self._revoked[session.token_id] = session.expires_at
+
+    def is_revoked(self, token_id):
+        return token_id in self._revoked
+
+
+_verified = _VerifiedTokens()
+revocations = RevocationList()
+
+
+def verify_token(token):
+    """Returns the Session for a valid, unexpired token. Raises TokenError otherwise."""
+    session = _verified.get(token)
+    if session is None:
+        try:
+            claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+            session = Session(claims)
+        except (JWTError, KeyError, TypeError, ValueError):
+            raise TokenError("Invalid or expired session token")
+        _verified.put(token, session)
+    if session.expires_at <= time.time():
+        raise TokenError("Session expired")
+    if revocations.is_revoked(session.token_id):
+        raise TokenError("Session has been logged out")
+    return session
+
+
+# ----------------- FastAPI dependencies -----------------
+_bearer = HTTPBearer(auto_error=False)
+
+
+async def current_session(credentials: HTTPAuthorizationCredentials = Depends(_bearer)):
+    """Dependency: the caller's Session, or 401"""
+    if credentials is None:
+        raise HTTPException(status_code=401, detail="Not logged in",
+                            headers={"WWW-Authenticate": "Bearer"})
+    if revocations.needs_refresh():
+        async with get_async_engine().connect() as conn:
+            await conn.run_sync(revocations.refresh)
+    try:
+        return verify_token(credentials.credentials)
+    except TokenError as e:
+        raise HTTPException(status_code=401, detail=str(e),
+                            headers={"WWW-Authenticate": "Bearer"})
+
+
+def require_role(*roles):
+    """Dependency factory: the caller's Session if their role is one of roles, else 403"""
+    async def check(session: Session = Depends(current_session)):
+        if session.role not in roles:
+            raise HTTPException(status_code=403, detail=f"{session.role} cannot perform this action")
+        return session
+    return check
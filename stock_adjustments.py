@@ -0,0 +1,165 @@
+# stock_adjustments.py
+"""
+Set-based stock adjustments shared by the API server and the CLI.
+
+Any number of adjustments is applied in two statements:
+
+    1. lock every product named                 -- in product_id order, like checkout
+    2. read current stock, record a movement for every level that changes
+       (one INSERT ... SELECT, see stock_ledger.py) and return the previous
+       and new level of each product
+
+An adjustment is (product_id, quantity, mode):
+    "set"  the stock level becomes quantity (a stock count)
+    "add"  quantity is added to the current level; negative removes stock
+
+Several adjustments of the same product are folded in order first (a set
+followed by adds counts from the set level). A product that is not found, or
+an "add" that would take stock below zero, is reported and left unchanged;
+the other adjustments still apply. Movements are recorded as ADJUSTMENT
+(stock counts, corrections) or CLEARANCE (stock written off).
+
+Functions take a synchronous SQLAlchemy Connection; the API server runs them
+with ``await conn.run_sync(apply_adjustments, ...)``. A stock sync file
+(CSV: product_id,quantity[,mode]; mode defaults to set) is applied with
+
+    python stock_adjustments.py stock_count.csv
+    python stock_adjustments.py deliveries.csv --mode add
+    python stock_adjustments.py damaged.csv --mode add --kind CLEARANCE
+"""
+import argparse
+import csv
+import time
+from sqlalchemy import text
+from db import get_engine
+from stock_ledger import PENDING_BY_PRODUCT, lock_products
+
+MODES = ("add", "set")
+KINDS = ("ADJUSTMENT", "CLEARANCE")
+MAX_ADJUSTMENTS = 100000    # per request or call; a full-catalog stock sync fits in one
+
+
+class StockAdjustmentError(Exception):
+    """Raised when a list of adjustments is invalid as a whole. status_code is the HTTP status for the API."""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def merge_adjustments(adjustments):
+    """Folds (product_id, quantity, mode) triples into {product_id: (quantity, absolute)}, keeping first-seen order"""
+    merged = {}
+    for product_id, quantity, mode in adjustments:
+        if mode not in MODES:
+            raise StockAdjustmentError(f"Invalid mode {mode!r} for product {product_id}; expected add or set")
+        if mode == "set":
+            if quantity < 0:
+                raise StockAdjustmentError(f"Stock level for product {product_id} cannot be negative")
+            merged[product_id] = (quantity, True)
+        else:
+            previous, absolute = merged.get(product_id, (0, False))
+            merged[product_id] = (previous + quantity, absolute)
+    if not merged:
+        raise StockAdjustmentError("No adjustments given")
+    if len(merged) > MAX_ADJUSTMENTS:
+        raise StockAdjustmentError(f"At most {MAX_ADJUSTMENTS} products per request")
+    return merged
+
+
+def apply_adjustments(conn, adjustments, kind="ADJUSTMENT"):
+    """
+    Applies the adjustments in the caller's transaction, recording movements
+    of the given kind. Returns
+    {"results": [{"product_id", "status", "previous", "stock_quantity"}, ...],
+     "updated": n, "not_found": n, "rejected": n}
+    with status "updated", "not_found" or "rejected" (would go below zero).
+    """
+    if kind not in KINDS:
+        raise StockAdjustmentError(f"Invalid kind {kind!r}; expected {' or '.join(KINDS)}")
+    merged = merge_adjustments(adjustments)
+    # Every stock writer commits under these locks (stock_ledger.py), so the levels read next
+    # include every committed movement and no other can commit until this adjustment does
+    lock_products(conn, merged)
+    rows = conn.execute(text(f"""
+        WITH v AS (
+            SELECT * FROM unnest(CAST(:pids AS INTEGER[]), CAST(:qtys AS INTEGER[]), CAST(:absolute AS BOOLEAN[]))
+                AS v(product_id, quantity, absolute)
+        ),
+        cur AS (
+            SELECT p.product_id, p.stock_quantity + COALESCE(m.quantity, 0) AS stock_quantity
+            FROM products p
+            LEFT JOIN {PENDING_BY_PRODUCT} m ON m.product_id = p.product_id
+            WHERE p.product_id = ANY(:pids)
+        ),
+        target AS (
+            SELECT v.product_id,
+                   CASE WHEN v.absolute THEN v.quantity ELSE c.stock_quantity + v.quantity END AS stock_quantity
+            FROM v JOIN cur c USING (product_id)
+            WHERE v.absolute OR c.stock_quantity + v.quantity >= 0
+        ),
+        -- Levels that are already right (most of a nightly sync) get no movement
+        moved AS (
+            INSERT INTO stock_movements (product_id, quantity, kind)
+            SELECT t.product_id, t.stock_quantity - c.stock_quantity, CAST(:kind AS VARCHAR)
+            FROM target t JOIN cur c USING (product_id)
+            WHERE t.stock_quantity <> c.stock_quantity
+        )
+        SELECT v.product_id, c.stock_quantity, t.stock_quantity
+        FROM v
+        LEFT JOIN cur c USING (product_id)
+        LEFT JOIN target t USING (product_id)
+    """), {
+        "pids": list(merged),
+        "qtys": [quantity for quantity, _ in merged.values()],
+        "absolute": [absolute for _, absolute in merged.values()],
+        "kind": kind,
+    }).fetchall()
+
+    found = {r[0]: r for r in rows}
+    results = []
+    counts = {"updated": 0, "not_found": 0, "rejected": 0}
+    for product_id in merged:
+        _, previous, new = found[product_id]
+        status = "not_found" if previous is None else "rejected" if new is None else "updated"
+        counts[status] += 1
+        results.append({
+            "product_id": product_id,
+            "status": status,
+            "previous": previous,
+            "stock_quantity": new if new is not None else previous,
+        })
+    return {"results": results, **counts}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply stock levels or changes from a CSV file in one statement")
+    parser.add_argument("file", help="CSV with a header row: product_id,quantity[,mode]")
+    parser.add_argument("--mode", choices=MODES, default="set", help="mode for rows without one (default set)")
+    parser.add_argument("--kind", choices=KINDS, default="ADJUSTMENT",
+                        help="movement recorded for the changes (default ADJUSTMENT)")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    try:
+        with open(args.file, newline="", encoding="utf-8-sig") as f:
+            adjustments = [(int(row["product_id"]), int(row["quantity"]), (row.get("mode") or args.mode).strip().lower())
+                           for row in csv.DictReader(f)]
+        with get_engine("oltp").begin() as conn:
+            result = apply_adjustments(conn, adjustments, args.kind)
+        print(f"✅ {result['updated']:,} products updated in {time.monotonic() - started:.1f}s "
+              f"({result['not_found']:,} not found, {result['rejected']:,} rejected)")
+        for r in [r for r in result["results"] if r["status"] != "updated"][:20]:
+            reason = "not found" if r["status"] == "not_found" else f"only {r['previous']} in stock"
+            print(f"   ⚠️ Product {r['product_id']}: {reason}")
+        print("💡 Running API servers pick up the changes within CATALOG_CACHE_TTL seconds")
+    except (KeyError, ValueError) as e:
+        print(f"❌ Invalid file: expected product_id and quantity columns with whole numbers ({e})")
+        raise SystemExit(1)
+    except StockAdjustmentError as e:
+        print(f"❌ {e.message}")
+        raise SystemExit(1)
+    except Exception as e:
+        print(f"❌ Stock update failed: {e}")
+        raise SystemExit(1)
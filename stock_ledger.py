@@ -0,0 +1,215 @@
+# stock_ledger.py
+"""
+Append-only stock movement ledger and its compactor.
+
+Stock changes are recorded as signed movements in stock_movements (see
+attached_assets/migrations) instead of updates to products.stock_quantity:
+
+    SALE         checkout and offline batches (reference: sale_id; a batch
+                 records one movement per product, with no reference when
+                 several of its sales sold it)
+    RESTOCK      manual restocks
+    PO_RECEIPT   purchase order receipts (reference: order_id)
+    ADJUSTMENT   stock counts and corrections
+    CLEARANCE    stock written off
+
+Product rows are rewritten once per compaction instead of once per sale,
+and a checkout no longer holds its products locked for the whole sale.
+
+fold() moves the pending movements into products.stock_quantity, in one
+transaction with the stock_compaction watermark, so at every moment
+
+    current stock = products.stock_quantity + the product's pending movements
+
+which the product_stock view and current_stock() return. Reads that must be
+exact (checkout, the product catalog, adjustments) use them; reports may
+read products.stock_quantity, which is at most one compaction behind.
+
+Every writer holds its products locked (lock_products, in product_id order)
+when it commits; checkouts take the lock as their last step. So a
+transaction holding the lock sees every committed movement of those
+products, and no other movement of them can commit until it does: checkout
+re-checks stock under the lock as its last step (nothing is oversold), and
+a stock count sets the level exactly. Concurrent sales of one product
+still take turns for that last check and the commit, so a hot product's
+sales commit one at a time; the ledger removes the product row update, not
+the per-product lock.
+
+The API server folds every STOCK_COMPACT_INTERVAL seconds; without it, run
+
+    python stock_ledger.py --every 5
+    python stock_ledger.py --prune-days 365      # drop folded movements older than a year
+
+Settings (environment):
+    STOCK_COMPACT_INTERVAL=5
+"""
+import argparse
+import os
+import time
+from sqlalchemy import text
+from db import get_engine
+
+MOVEMENT_KINDS = ("SALE", "RESTOCK", "PO_RECEIPT", "ADJUSTMENT", "CLEARANCE")
+STOCK_COMPACT_INTERVAL = float(os.getenv("STOCK_COMPACT_INTERVAL", "5"))
+
+# Pending quantity of the products in :pids, for joining onto products
+PENDING_BY_PRODUCT = """
+    (SELECT product_id, SUM(quantity) AS quantity
+     FROM stock_movements
+     WHERE product_id = ANY(:pids) AND txid >= (SELECT folded_before FROM stock_compaction)
+     GROUP BY product_id)
+"""
+
+
+def record_movements(conn, kind, product_ids, quantities, reference_ids=None):
+    """Appends one movement per product_id / signed quantity, in the caller's transaction"""
+    if kind not in MOVEMENT_KINDS:
+        raise ValueError(f"Unknown stock movement kind {kind!r}")
+    if not product_ids:
+        return
+    conn.execute(text("""
+        INSERT INTO stock_movements (product_id, quantity, kind, reference_id)
+        SELECT v.product_id, v.quantity, CAST(:kind AS VARCHAR), v.reference_id
+        FROM unnest(CAST(:pids AS INTEGER[]), CAST(:qtys AS INTEGER[]), CAST(:refs AS INTEGER[]))
+             AS v(product_id, quantity, reference_id)
+    """), {
+        "kind": kind,
+        "pids": list(product_ids),
+        "qtys": list(quantities),
+        "refs": list(reference_ids) if reference_ids is not None else [None] * len(product_ids),
+    })
+
+
+def lock_products(conn, product_ids):
+    """
+    Locks product rows in product_id order against other writers and the
+    compactor, until commit. Read stock in a later statement.
+    """
+    conn.execute(text("""
+        SELECT product_id FROM products
+        WHERE product_id = ANY(:pids)
+        ORDER BY product_id
+        FOR NO KEY UPDATE
+    """), {"pids": list(product_ids)})
+
+
+def current_stock(conn, product_ids):
+    """{product_id: current stock} for the products that exist"""
+    return dict(conn.execute(text(f"""
+        SELECT p.product_id, p.stock_quantity + COALESCE(m.quantity, 0)
+        FROM products p
+        LEFT JOIN {PENDING_BY_PRODUCT} m ON m.product_id = p.product_id
+        WHERE p.product_id = ANY(:pids)
+    """), {"pids": list(product_ids)}).fetchall())
+
+
+def locked_stock(conn, product_ids):
+    """Locks the products (see lock_products) and returns {product_id: current stock}, own movements included"""
+    lock_products(conn, product_ids)
+    return current_stock(conn, product_ids)
+
+
+def fold(conn):
+    """
+    Folds every movement of finished transactions into products.stock_quantity
+    and advances the watermark, in the caller's transaction. Returns
+    (movements folded, products changed), or None if another compactor is running.
+    """
+    if conn.execute(text("SELECT 1 FROM stock_compaction FOR UPDATE SKIP LOCKED")).first() is None:
+        return None
+    # Transactions below the snapshot's xmin have all finished, so their movements can all be seen
+    return tuple(conn.execute(text("""
+        WITH bounds AS (
+            SELECT folded_before, pg_snapshot_xmin(pg_current_snapshot()) AS upto FROM stock_compaction
+        ),
+        folded AS (
+            SELECT sm.product_id, SUM(sm.quantity) AS quantity, COUNT(*) AS movements
+            FROM stock_movements sm, bounds b
+            WHERE sm.txid >= b.folded_before AND sm.txid < b.upto
+            GROUP BY sm.product_id
+        ),
+        -- Lock in product_id order, like every writer, so they can't deadlock
+        locked AS (
+            SELECT product_id FROM products
+            WHERE product_id IN (SELECT product_id FROM folded WHERE quantity <> 0)
+            ORDER BY product_id
+            FOR NO KEY UPDATE
+        ),
+        updated AS (
+            UPDATE products p
+            SET stock_quantity = p.stock_quantity + f.quantity
+            FROM folded f JOIN locked USING (product_id)
+            WHERE p.product_id = f.product_id
+            RETURNING p.product_id
+        ),
+        watermark AS (
+            UPDATE stock_compaction c
+            SET folded_before = b.upto, compacted_at = CURRENT_TIMESTAMP
+            FROM bounds b
+        )
+        SELECT CAST(COALESCE((SELECT SUM(movements) FROM folded), 0) AS BIGINT), (SELECT COUNT(*) FROM updated)
+    """)).one())
+
+
+def compact(engine=None):
+    """One compaction in its own transaction; see fold()"""
+    engine = engine or get_engine("oltp")
+    with engine.begin() as conn:
+        return fold(conn)
+
+
+def rebase(cur, folded_before):
+    """
+    After a restore (psycopg2 cursor, same transaction): folds the movements
+    that were pending when the backup was taken (its watermark folded_before)
+    and restamps restored movements, whose transaction ids came from another
+    server, as folded.
+    """
+    cur.execute("""
+        UPDATE products p
+        SET stock_quantity = p.stock_quantity + m.quantity
+        FROM (SELECT product_id, SUM(quantity) AS quantity FROM stock_movements
+              WHERE txid >= CAST(%s AS xid8) GROUP BY product_id) m
+        WHERE p.product_id = m.product_id
+    """, (folded_before,))
+    cur.execute("""
+        UPDATE stock_movements SET txid = '0'
+        WHERE txid >= pg_snapshot_xmin(pg_current_snapshot())
+    """)
+    cur.execute("UPDATE stock_compaction SET folded_before = pg_snapshot_xmin(pg_current_snapshot())")
+
+
+def prune(engine=None, keep_days=365):
+    """Deletes folded movements older than keep_days. Returns the number deleted."""
+    engine = engine or get_engine("oltp")
+    with engine.begin() as conn:
+        return conn.execute(text("""
+            DELETE FROM stock_movements
+            WHERE created_at < CURRENT_DATE - CAST(:keep_days AS INTEGER)
+              AND txid < (SELECT folded_before FROM stock_compaction)
+        """), {"keep_days": keep_days}).rowcount
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fold pending stock movements into product stock levels")
+    parser.add_argument("--every", type=float, default=0, help="repeat every N seconds (default: run once)")
+    parser.add_argument("--prune-days", type=int, help="also delete folded movements older than this many days")
+    args = parser.parse_args()
+
+    try:
+        if args.prune_days is not None:
+            print(f"✅ Pruned {prune(keep_days=args.prune_days):,} movements older than {args.prune_days} days")
+    except Exception as e:
+        print(f"❌ Pruning stock movements failed: {e}")
+    while True:
+        try:
+            result = compact()
+            if result is None:
+                print("⚠️ Another compactor is running")
+            elif result[0] or not args.every:
+                print(f"✅ Folded {result[0]:,} movements into {result[1]:,} products")
+        except Exception as e:
+            print(f"❌ Stock compaction failed: {e}")
+        if not args.every:
+            break
+        time.sleep(args.every)
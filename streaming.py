@@ -0,0 +1,101 @@
+# streaming.py
+"""
+Opt-in streaming responses for large API lists.
+
+A list endpoint streams when the client asks for ``?format=ndjson`` /
+``?format=csv`` or sends ``Accept: application/x-ndjson`` / ``text/csv``.
+Rows are read through a server-side cursor in fixed-size partitions and each
+partition is encoded (and gzip-compressed when the client accepts it) and
+sent straight away, so memory stays flat and the first byte goes out as soon
+as the first partition is read, whatever the table size.
+"""
+import csv
+import io
+import json
+import zlib
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+PARTITION_SIZE = 1000
+
+
+def stream_format(request, fmt=None):
+    """Returns 'ndjson' / 'csv' when the request opts into streaming, else None (plain JSON)."""
+    if fmt is not None:
+        fmt = fmt.lower()
+        if fmt == "json":
+            return None
+        if fmt not in STREAM_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported format {fmt!r}; use json, ndjson or csv")
+        return fmt
+    accept = request.headers.get("accept", "")
+    for name, media_type in STREAM_FORMATS.items():
+        if media_type in accept:
+            return name
+    return None
+
+
+def _wants_gzip(request):
+    return "gzip" in request.headers.get("accept-encoding", "").lower()
+
+
+def _encode_ndjson(records):
+    return "".join(json.dumps(record, default=str) + "\n" for record in records)
+
+
+def _encode_csv(records, fieldnames, header):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames)
+    if header:
+        writer.writeheader()
+    writer.writerows(records)
+    return buffer.getvalue()
+
+
+async def _generate(engine, query, params, to_record, fieldnames, fmt, compress):
+    # wbits=31 writes a gzip container; Z_SYNC_FLUSH pushes each partition out whole
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    header = True
+    async with engine.connect() as conn:
+        result = await conn.stream(text(query), params)
+        async for partition in result.partitions(PARTITION_SIZE):
+            records = [to_record(r) for r in partition]
+            if fmt == "csv":
+                chunk = _encode_csv(records, fieldnames, header)
+                header = False
+            else:
+                chunk = _encode_ndjson(records)
+            data = chunk.encode("utf-8")
+            if compressor:
+                data = compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+    if fmt == "csv" and header:
+        # Empty result: still send the header row
+        data = _encode_csv([], fieldnames, True).encode("utf-8")
+        yield compressor.compress(data) if compressor else data
+    if compressor:
+        yield compressor.flush()
+
+
+def stream_rows(request, engine, query, params, to_record, fieldnames, fmt, filename):
+    """
+    Returns a StreamingResponse that runs query on a server-side cursor and writes
+    every row as NDJSON or CSV. to_record maps a row to a dict with fieldnames as keys.
+    """
+    compress = _wants_gzip(request)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    if fmt == "csv":
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    return StreamingResponse(
+        _generate(engine, query, params, to_record, fieldnames, fmt, compress),
+        media_type=STREAM_FORMATS[fmt],
+        headers=headers,
+    )
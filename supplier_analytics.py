@@ -6,7 +6,7 @@ from auth import has_permission
 from datetime import datetime, timedelta
 import decimal
 
-engine = get_engine()
+engine = get_engine("analytics")
 
 def safe_float_convert(value):
     """Safely convert any value to float for calculations"""
@@ -46,7 +46,6 @@ def supplier_scorecard_system():
                 FROM suppliers s
                 LEFT JOIN products p ON s.supplier_id = p.supplier_id
                 LEFT JOIN sale_items si ON p.product_id = si.product_id
-                LEFT JOIN sales s2 ON si.sale_id = s2.sale_id
                 GROUP BY s.supplier_id, s.name, s.contact_info, s.reliability_score
                 ORDER BY total_revenue_generated DESC
             """)).fetchall()
@@ -1,30 +1,70 @@
 # system_admin.py
 from sqlalchemy import text
-from db import get_engine
+from db import get_engine, pool_stats
+from dashboard_counters import read_counters
+from sales_archive import archive_sales, ARCHIVE_DIR
+import backup
 from auth import has_permission
 import datetime
 
 engine = get_engine()
 
 def system_backup():
-    """Create database backup"""
+    """Create a database backup (compressed table files + manifest, see backup.py)"""
     if not has_permission(["ADMIN"]):
         return
         
     try:
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_file = f"backup_supermarket_{timestamp}.sql"
+        print("\n🔧 SYSTEM BACKUP")
+        print("1. Full backup")
+        print("2. Incremental backup (new sales since the last backup)")
+        choice = input("Choose backup type: ").strip()
+        if choice not in ('1', '2'):
+            print("❌ Invalid choice")
+            return
+            
+        manifest = backup.backup(
+            incremental=(choice == '2'),
+            progress=lambda table, entry: print(f"   ✔ {table}: {entry['rows']} rows"))
+        size = sum(entry["bytes"] for entry in manifest["tables"].values())
+        print(f"✅ Backup {manifest['name']} saved to {backup.BACKUP_DIR}/ "
+              f"({size / 1048576:.1f} MB, {manifest['duration_seconds']}s)")
         
-        # This would use pg_dump in production
-        print(f"🔧 Backup functionality would create: {backup_file}")
-        print("💡 In production, implement pg_dump command here")
+    except Exception as e:
+        print(f"❌ Backup error: {e}")
+
+def system_restore():
+    """Restore the database from a backup"""
+    if not has_permission(["ADMIN"]):
+        return
         
-        # For now, export critical tables
-        tables = ['products', 'sales', 'customers', 'employees']
-        print(f"📦 Would backup tables: {', '.join(tables)}")
+    try:
+        backups = backup.list_backups()
+        if not backups:
+            print(f"❌ No backups found in {backup.BACKUP_DIR}/")
+            return
+            
+        print("\n♻️ SYSTEM RESTORE")
+        recent = backups[-10:]
+        for i, m in enumerate(recent, 1):
+            print(f"{i}. {m['name']} ({m['kind']}, {m['created_at']})")
+        choice = int(input("Restore which backup: ").strip())
+        if not 1 <= choice <= len(recent):
+            print("❌ Invalid choice")
+            return
+            
+        print("WARNING: This replaces ALL current data with the backup!")
+        confirm = input("Type 'RESTORE' to confirm: ").strip()
+        if confirm != 'RESTORE':
+            print("❌ Cancelled")
+            return
+            
+        counts = backup.restore(recent[choice - 1]["name"], replace=True)
+        print(f"✅ Restored {counts['sales']} sales and {counts['products']} products")
+        print("💡 Restart the API server so it reloads its product catalog")
         
     except Exception as e:
-        print(f"❌ Backup error: {e}")
+        print(f"❌ Restore error: {e}")
 
 def system_health_check():
     """Check system health and statistics"""
@@ -34,67 +74,75 @@ def system_health_check():
     try:
         with engine.connect() as conn:
             # System statistics
+            counters = read_counters(conn)
             stats = conn.execute(text("""
                 SELECT 
-                    (SELECT COUNT(*) FROM products) as total_products,
-                    (SELECT COUNT(*) FROM sales WHERE DATE(sale_time) = CURRENT_DATE) as today_sales,
                     (SELECT COUNT(*) FROM employees) as total_employees,
                     (SELECT COUNT(*) FROM customers) as total_customers,
-                    (SELECT COUNT(*) FROM notifications WHERE status = 'unread') as unread_alerts,
-                    (SELECT SUM(stock_quantity) FROM products) as total_inventory
+                    (SELECT COUNT(*) FROM notifications WHERE status = 'unread') as unread_alerts
             """)).fetchone()
             
             print("\n🏥 SYSTEM HEALTH CHECK")
             print("=" * 40)
-            print(f"📦 Total Products: {stats[0]}")
-            print(f"💰 Today's Sales: {stats[1]}")
-            print(f"👥 Total Employees: {stats[2]}")
-            print(f"🤝 Total Customers: {stats[3]}")
-            print(f"🔔 Unread Alerts: {stats[4]}")
-            print(f"📊 Total Inventory Value: {stats[5]} units")
+            print(f"📦 Total Products: {counters['total_products']}")
+            print(f"💰 Today's Sales: {counters['today_sales_count']}")
+            print(f"👥 Total Employees: {stats[0]}")
+            print(f"🤝 Total Customers: {stats[1]}")
+            print(f"🔔 Unread Alerts: {stats[2]}")
+            print(f"📊 Total Inventory Value: {counters['inventory_units']} units")
             print("=" * 40)
+
+        print("\n🔌 CONNECTION POOLS (this process)")
+        for pool in pool_stats():
+            print(f"   {pool['pool']} ({pool['driver']}): {pool['checked_out']} in use / "
+                  f"{pool['max_connections']} max | waiting: {pool['waiting']} | "
+                  f"checkouts: {pool['checkouts']} | timeouts: {pool['timeouts']} | "
+                  f"max wait: {pool['wait_seconds_max'] * 1000:.1f} ms")
             
     except Exception as e:
         print(f"❌ Health check error: {e}")
 
 def purge_old_data():
-    """Archive or purge old data"""
+    """Archive old sales to compressed files and remove them, in small batches (see sales_archive.py)"""
     if not has_permission(["ADMIN"]):
         return
         
     try:
         print("🗑️  DATA PURGE MANAGEMENT")
-        print("WARNING: This will permanently delete old data!")
+        print(f"Old sales and their items are moved to compressed CSV files under {ARCHIVE_DIR}/")
+        print("WARNING: They will be removed from the database!")
         
         confirm = input("Type 'DELETE' to confirm: ").strip()
         if confirm != 'DELETE':
             print("❌ Cancelled")
             return
             
-        days = int(input("Delete sales older than (days): ").strip())
+        days = int(input("Archive sales older than (days): ").strip())
+        before = datetime.date.today() - datetime.timedelta(days=days)
         
-        with engine.begin() as conn:
-            # Count records to be deleted
+        with engine.connect() as conn:
             count = conn.execute(text("""
-                SELECT COUNT(*) FROM sales 
-                WHERE sale_time < CURRENT_DATE - INTERVAL ':days days'
-            """), {"days": days}).fetchone()[0]
+                SELECT COUNT(*) FROM sales WHERE sale_time < CAST(:before AS DATE)
+            """), {"before": before}).scalar()
             
-            if count == 0:
-                print("✅ No old data found")
-                return
-                
-            print(f"⚠️  Will delete {count} sales records")
-            final_confirm = input("Type 'CONFIRM' to proceed: ").strip()
+        if count == 0:
+            print("✅ No old data found")
+            return
+            
+        print(f"⚠️  Will archive {count} sales recorded before {before}")
+        final_confirm = input("Type 'CONFIRM' to proceed: ").strip()
+        if final_confirm != 'CONFIRM':
+            print("❌ Cancelled")
+            return
             
-            if final_confirm == 'CONFIRM':
-                conn.execute(text("""
-                    DELETE FROM sales 
-                    WHERE sale_time < CURRENT_DATE - INTERVAL ':days days'
-                """), {"days": days})
-                print(f"✅ Deleted {count} old sales records")
-            else:
-                print("❌ Cancelled")
+        # Batches commit one by one, so checkouts keep running; Ctrl+C only undoes the current batch
+        sales, items = archive_sales(
+            engine, before,
+            progress=lambda done, items, total: print(f"   ✔ {done} / {total} sales archived", end="\r"))
+        print()
+        print(f"✅ Archived {sales} old sales ({items} items) to {ARCHIVE_DIR}/")
                 
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrupted: run the purge again to resume")
     except Exception as e:
-        print(f"❌ Purge error: {e}")
\ No newline at end of file
+        print(f"❌ Purge error: {e}")
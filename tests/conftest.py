@@ -0,0 +1,126 @@
+# tests/conftest.py
+"""
+Shared fixtures. The tests run against their own database, TEST_PGDATABASE
+(default mart_test), never the store's: it is created from the migrations at
+the start of the run and dropped at the end, so the employees, products and
+sales the tests make are removed with it. Tests that need the database are
+skipped when PostgreSQL can't be reached.
+
+    python -m pytest -q tests
+    TEST_PGDATABASE=mart_ci python -m pytest -q tests
+"""
+import itertools
+import os
+import sys
+
+APP_DATABASE = os.getenv("PGDATABASE", "mart_db")
+TEST_DATABASE = os.getenv("TEST_PGDATABASE", "mart_test")
+if TEST_DATABASE == APP_DATABASE:
+    raise RuntimeError(f"TEST_PGDATABASE must not be the store's database ({APP_DATABASE}): the tests drop it")
+
+# Before any project module reads them
+os.environ["PGDATABASE"] = TEST_DATABASE
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+# The API's background jobs would race the tests' own compaction and window slides
+os.environ["STOCK_COMPACT_INTERVAL"] = "0"
+os.environ["SALES_WINDOWS_INTERVAL"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2
+import pytest
+from sqlalchemy import text
+from db_config import DB_HOST, DB_USER, DB_PASS, DB_PORT, get_engine, dispose_engines
+
+_names = itertools.count(1)
+
+
+def _server():
+    conn = psycopg2.connect(host=DB_HOST, dbname="postgres", user=DB_USER, password=DB_PASS, port=DB_PORT)
+    conn.autocommit = True
+    return conn
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Creates and migrates the test database for this run; drops it afterwards"""
+    try:
+        server = _server()
+    except psycopg2.Error as e:
+        pytest.skip(f"database server not available: {e}")
+    with server.cursor() as cur:
+        cur.execute(f'DROP DATABASE IF EXISTS "{TEST_DATABASE}" WITH (FORCE)')
+        cur.execute(f'CREATE DATABASE "{TEST_DATABASE}"')
+    import migrate
+    migrate.migrate()
+    yield TEST_DATABASE
+    dispose_engines()
+    with server.cursor() as cur:
+        cur.execute(f'DROP DATABASE IF EXISTS "{TEST_DATABASE}" WITH (FORCE)')
+    server.close()
+
+
+@pytest.fixture(scope="session")
+def engine(database):
+    return get_engine("oltp")
+
+
+def unique(prefix):
+    """A name no other fixture call in this run returns"""
+    return f"{prefix}{next(_names)}"
+
+
+@pytest.fixture
+def make_employee(engine):
+    """Creates employees: make_employee(role="CASHIER", password="pw") -> employee_id"""
+    from passwords import hash_password
+
+    def make(role="CASHIER", password="pw", username=None):
+        with engine.begin() as conn:
+            return conn.execute(text("""
+                INSERT INTO employees (name, role, username, password)
+                VALUES (:name, :role, :username, :password)
+                RETURNING employee_id
+            """), {"name": unique("Test Employee "), "role": role, "username": username or unique("test_user"),
+                   "password": hash_password(password)}).scalar()
+    return make
+
+
+@pytest.fixture
+def make_product(engine):
+    """Creates products: make_product(stock=0, price="10.00") -> product_id"""
+    def make(stock=0, price="10.00", barcode=None):
+        with engine.begin() as conn:
+            category_id = conn.execute(text("""
+                INSERT INTO categories (name) VALUES (:name) RETURNING category_id
+            """), {"name": unique("Test Category ")}).scalar()
+            supplier_id = conn.execute(text("""
+                INSERT INTO suppliers (name) VALUES (:name) RETURNING supplier_id
+            """), {"name": unique("Test Supplier ")}).scalar()
+            return conn.execute(text("""
+                INSERT INTO products (name, barcode, price, stock_quantity, category_id, supplier_id, cost_price)
+                VALUES (:name, :barcode, :price, :stock, :category_id, :supplier_id, :price)
+                RETURNING product_id
+            """), {"name": unique("Test Product "), "barcode": barcode, "price": price, "stock": stock,
+                   "category_id": category_id, "supplier_id": supplier_id}).scalar()
+    return make
+
+
+@pytest.fixture(scope="session")
+def api(database):
+    """A TestClient for the API server, started once per run"""
+    from fastapi.testclient import TestClient
+    import api_server
+    with TestClient(api_server.app) as client:
+        yield client
+
+
+@pytest.fixture
+def login(api, make_employee):
+    """Creates an employee and logs in: login(role="CASHIER") -> request headers"""
+    def log_in(role="CASHIER"):
+        username = unique("api_user")
+        make_employee(role=role, username=username)
+        response = api.post("/api/auth/login", json={"username": username, "password": "pw"})
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return log_in
@@ -0,0 +1,39 @@
+# tests/test_api_server.py
+"""API routes, through a TestClient against the test database."""
+import datetime
+import pytest
+from checkout import complete_sales_batch
+from pagination import encode_cursor
+
+
+def test_sale_details_of_an_older_month(engine, api, login, make_product, make_employee):
+    headers = login()
+    product_id, seller = make_product(stock=10, price="2.50"), make_employee()
+    with engine.begin() as conn:
+        [sale] = complete_sales_batch(conn, [{
+            "client_sale_id": f"details-{product_id}", "items": [(product_id, 3, None)],
+            "payment_method": "CASH", "employee_id": seller, "sale_time": datetime.datetime(2024, 2, 29, 18),
+        }])
+
+    response = api.get(f"/api/sales/{sale['sale_id']}", headers=headers)
+    assert response.status_code == 200
+    [item] = response.json()["items"]
+    assert (item["product_id"], item["quantity"], item["subtotal"]) == (product_id, 3, 7.5)
+
+    assert api.get("/api/sales/999999999", headers=headers).json() == {"items": []}
+
+
+LIST_ROUTES = ["/api/products", "/api/categories", "/api/suppliers", "/api/sales", "/api/customers",
+               "/api/employees", "/api/notifications", "/api/purchase-orders"]
+
+
+@pytest.mark.parametrize("route", LIST_ROUTES)
+def test_list_routes_page_and_reject_bad_cursors(api, login, route):
+    headers = login("ADMIN")
+    first = api.get(route, params={"limit": 1}, headers=headers)
+    assert first.status_code == 200, first.text
+    for cursor in ("not-a-cursor", encode_cursor([["nested"], {"key": 1}, True])):
+        assert api.get(route, params={"cursor": cursor}, headers=headers).status_code == 400
+    if first.json().get("next_cursor"):
+        assert api.get(route, params={"limit": 1, "cursor": first.json()["next_cursor"]},
+                       headers=headers).status_code == 200
@@ -0,0 +1,51 @@
+# tests/test_backup.py
+"""Full and incremental backups restored into the test database."""
+import gzip
+import os
+import time
+import pytest
+from sqlalchemy import text
+from backup import backup, list_backups, restore, verify
+from checkout import complete_sale
+from stock_ledger import current_stock
+
+
+def _sell(engine, product_id, employee_id, quantity):
+    with engine.begin() as conn:
+        complete_sale(conn, [(product_id, quantity)], "CASH", employee_id)
+
+
+def _state(engine, product_id):
+    with engine.connect() as conn:
+        sales = conn.execute(text("SELECT COUNT(*) FROM sale_items WHERE product_id = :pid"),
+                             {"pid": product_id}).scalar()
+        folded = conn.execute(text("SELECT stock_quantity FROM products WHERE product_id = :pid"),
+                              {"pid": product_id}).scalar()
+        return sales, current_stock(conn, [product_id])[product_id], folded
+
+
+def test_restore_of_incremental_chain(engine, make_product, make_employee, tmp_path):
+    product_id, seller = make_product(stock=50), make_employee()
+    _sell(engine, product_id, seller, 5)
+    full = backup(str(tmp_path), workers=2)
+    time.sleep(1)       # backup names have one-second resolution
+    _sell(engine, product_id, seller, 7)
+    incremental = backup(str(tmp_path), incremental=True, workers=2)
+    assert incremental["base"] == full["name"]
+    assert incremental["high_water"]["sale_id"] > full["high_water"]["sale_id"]
+    assert [m["name"] for m in list_backups(str(tmp_path))] == [full["name"], incremental["name"]]
+
+    _sell(engine, product_id, seller, 3)        # after the backup: gone once restored
+    restore(incremental["name"], str(tmp_path), replace=True, progress=lambda message: None)
+
+    # The movements still pending at backup time are folded into the product's stock
+    assert _state(engine, product_id) == (2, 38, 38)
+
+
+def test_restore_refuses_corrupt_backup(engine, make_product, tmp_path):
+    make_product()
+    manifest = backup(str(tmp_path), workers=1)
+    with gzip.open(os.path.join(tmp_path, manifest["name"], manifest["tables"]["products"]["file"]), "wb") as f:
+        f.write(b"product_id\n")
+    with pytest.raises(RuntimeError, match="missing or corrupt"):
+        verify(manifest["name"], str(tmp_path))
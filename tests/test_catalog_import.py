@@ -0,0 +1,94 @@
+# tests/test_catalog_import.py
+"""Bulk product import: row rejects, upsert counts, and the CLI and API loaders."""
+import io
+import re
+import pytest
+from sqlalchemy import text
+from catalog_import import CatalogImportError, import_products, parse_header
+from conftest import unique
+
+
+@pytest.fixture
+def catalog(engine, make_product):
+    """(category_id, supplier_id, barcode) of an existing product with 7 in stock"""
+    barcode = unique("IMPORT-")
+    product_id = make_product(stock=7, price="5.00", barcode=barcode)
+    with engine.connect() as conn:
+        category_id, supplier_id = conn.execute(text("""
+            SELECT category_id, supplier_id FROM products WHERE product_id = :pid
+        """), {"pid": product_id}).one()
+    return category_id, supplier_id, barcode
+
+
+def _product(engine, barcode):
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT name, price, stock_quantity, low_stock_threshold FROM products WHERE barcode = :b
+        """), {"b": barcode}).one()
+
+
+def _import(engine, body):
+    with engine.begin() as conn:
+        return import_products(conn, io.BytesIO(body.encode("utf-8")))
+
+
+def test_valid_rows_are_upserted_and_bad_rows_reported(engine, catalog):
+    category_id, supplier_id, existing = catalog
+    new = unique("NEW-")
+    result = _import(engine, "\n".join([
+        "barcode,name,price,category_id,supplier_id,stock_quantity,low_stock_threshold",
+        f"{existing},Renamed,6.25,{category_id},{supplier_id},100,3",
+        f" {new} , New product ,1.5,{category_id},{supplier_id},,",
+        f"{new},Same barcode again,1.00,{category_id},{supplier_id},,",
+        f",No barcode,1.00,{category_id},{supplier_id},,",
+        f"{unique('BAD-')},Bad price,1.999,{category_id},{supplier_id},,",
+        f"{unique('BAD-')},Bad stock,1.00,{category_id},{supplier_id},-4,",
+        f"{unique('BAD-')},Bad category,1.00,999999999,{supplier_id},,",
+        f"{unique('BAD-')},Bad supplier,1.00,{category_id},abc,,",
+        f"{unique('BAD-')},{'x' * 101},1.00,{category_id},{supplier_id},,",
+    ]))
+    assert (result["rows"], result["inserted"], result["updated"], result["rejected"]) == (9, 1, 1, 7)
+    assert [(r["row"], r["error"]) for r in result["rejects"]] == [
+        (3, "barcode repeats row 2"),
+        (4, "barcode is required"),
+        (5, "price must be an amount like 12.50"),
+        (6, "stock_quantity must be a whole number"),
+        (7, "unknown category_id"),
+        (8, "unknown supplier_id"),
+        (9, "name is longer than 100 characters"),
+    ]
+    # An existing product keeps its stock; stock changes go through adjustments
+    assert _product(engine, existing) == ("Renamed", 6.25, 7, 3)
+    assert _product(engine, new) == ("New product", 1.5, 0, 10)
+
+
+@pytest.mark.parametrize("header, message", [
+    ("name,barcode,price,category_id", "Missing required column(s) supplier_id"),
+    ("name,barcode,price,category_id,supplier_id,colour", "Unknown column(s) colour"),
+    ("name,barcode,price,category_id,supplier_id,price", "more than once"),
+])
+def test_bad_headers(header, message):
+    with pytest.raises(CatalogImportError, match=re.escape(message)):
+        parse_header(header.encode("utf-8"))
+
+
+def test_malformed_csv_is_refused(engine, catalog):
+    category_id, supplier_id, _ = catalog
+    with pytest.raises(CatalogImportError, match="Malformed CSV"):
+        _import(engine, f'name,barcode,price,category_id,supplier_id\n"Unclosed,X1,1.00,{category_id},{supplier_id}\n')
+
+
+def test_api_import(api, login, engine, catalog):
+    category_id, supplier_id, existing = catalog
+    new = unique("API-")
+    body = (f"name,barcode,price,category_id,supplier_id\n"
+            f"Api renamed,{existing},2.00,{category_id},{supplier_id}\n"
+            f"Api new,{new},3.00,{category_id},{supplier_id}\n"
+            f"Api bad,{unique('API-')},free,{category_id},{supplier_id}\n")
+    assert api.post("/api/products/import", content=body, headers=login("CASHIER")).status_code == 403
+    response = api.post("/api/products/import", content=body, headers={**login("ADMIN"), "Content-Type": "text/csv"})
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert (result["inserted"], result["updated"], result["rejected"]) == (1, 1, 1)
+    assert result["rejects"][0]["row"] == 3
+    assert _product(engine, new)[:3] == ("Api new", 3, 0)
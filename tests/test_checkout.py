@@ -0,0 +1,121 @@
+# tests/test_checkout.py
+"""Checkout and offline sales batches, against the test database."""
+from decimal import Decimal
+import pytest
+from sqlalchemy import text
+from checkout import CheckoutError, complete_sale, complete_sales_batch, price_cart
+from stock_ledger import current_stock
+from conftest import unique
+
+
+def _sales_of(engine, employee_id):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM sales WHERE employee_id = :eid"),
+                            {"eid": employee_id}).scalar()
+
+
+def test_duplicate_lines_are_merged(engine, make_product, make_employee):
+    milk, bread, seller = make_product(stock=10, price="1.25"), make_product(stock=10), make_employee()
+    with engine.begin() as conn:
+        sale = complete_sale(conn, [(milk, 2), (bread, 1), (milk, 3)], "CARD", seller)
+    assert [(line["product_id"], line["quantity"]) for line in sale["lines"]] == [(milk, 5), (bread, 1)]
+    assert sale["total"] == Decimal("16.25")
+    assert (sale["stock_levels"][milk], sale["stock_levels"][bread]) == (5, 9)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM sale_items WHERE sale_id = :sid"),
+                            {"sid": sale["sale_id"]}).scalar() == 2
+
+
+def test_merged_lines_cannot_oversell(engine, make_product, make_employee):
+    product_id, seller = make_product(stock=4), make_employee()
+    with pytest.raises(CheckoutError, match="Only 4 units"):
+        with engine.begin() as conn:
+            complete_sale(conn, [(product_id, 3), (product_id, 2)], "CASH", seller)
+    assert _sales_of(engine, seller) == 0
+    with engine.connect() as conn:
+        assert current_stock(conn, [product_id])[product_id] == 4
+        [(problem_id, message)] = price_cart(conn, [(product_id, 3), (product_id, 2)])["problems"]
+    assert problem_id == product_id and message.startswith("Only 4 units")
+
+
+@pytest.mark.parametrize("items, payment, customer, status, message", [
+    ([], "CASH", None, 400, "Cart is empty"),
+    ([(1, 0)], "CASH", None, 400, "must be positive"),
+    (None, "CHEQUE", None, 400, "Invalid payment method"),
+    (None, "CASH", 999999999, 404, "Customer not found"),
+    ([(999999999, 1)], "CASH", None, 404, "Product 999999999 not found"),
+])
+def test_unsellable_carts(engine, make_product, make_employee, items, payment, customer, status, message):
+    product_id, seller = make_product(stock=5), make_employee()
+    with pytest.raises(CheckoutError, match=message) as raised:
+        with engine.begin() as conn:
+            complete_sale(conn, [(product_id, 1)] if items is None else items, payment, seller, customer)
+    assert raised.value.status_code == status
+    assert _sales_of(engine, seller) == 0
+
+
+def _batch(engine, sales):
+    with engine.begin() as conn:
+        return complete_sales_batch(conn, sales)
+
+
+def _offline(employee_id, items, client_sale_id=None, **extra):
+    return {"client_sale_id": client_sale_id or unique("offline-"), "items": items, "payment_method": "CASH",
+            "employee_id": employee_id, **extra}
+
+
+def _movements(engine, product_id):
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT quantity, reference_id FROM stock_movements
+            WHERE product_id = :pid AND kind = 'SALE' ORDER BY movement_id
+        """), {"pid": product_id}).fetchall()
+
+
+def test_batch_rejects_per_sale(engine, make_product, make_employee):
+    product_id, seller = make_product(stock=5, price="3.00"), make_employee()
+    results = _batch(engine, [
+        _offline(seller, [(product_id, 2, None)]),
+        _offline(seller, [(999999999, 1, None)]),
+        _offline(999999999, [(product_id, 1, None)]),
+        _offline(seller, [(product_id, 1, None)], customer_id=999999999),
+        _offline(seller, [(product_id, 0, None)]),
+        _offline(seller, [], payment_method="CHEQUE"),
+        _offline(seller, [(product_id, 9, "2.00")]),
+    ])
+    assert [r["status"] for r in results] == ["created"] + ["rejected"] * 5 + ["created"]
+    assert [r["error"] for r in results[1:6]] == [
+        "Product 999999999 not found", "Employee not found", "Customer not found",
+        "Quantities must be positive", "Invalid payment method 'CHEQUE'"]
+    assert (results[0]["total"], results[-1]["total"]) == (Decimal("6.00"), Decimal("18.00"))
+    # Offline sales already happened: stock may go below zero
+    with engine.connect() as conn:
+        assert current_stock(conn, [product_id])[product_id] == -6
+
+
+def test_batch_replay_is_a_duplicate(engine, make_product, make_employee):
+    product_id, seller = make_product(stock=10), make_employee()
+    sale = _offline(seller, [(product_id, 1, None)])
+    [first] = _batch(engine, [sale])
+    assert _batch(engine, [sale])[0] == {**first, "status": "duplicate", "total": None}
+
+    client_sale_id = unique("twice-")
+    twice = _batch(engine, [_offline(seller, [(product_id, 1, None)], client_sale_id),
+                            _offline(seller, [(product_id, 1, None)], client_sale_id)])
+    assert [r["status"] for r in twice] == ["created", "rejected"]
+    assert "more than once" in twice[1]["error"]
+    with engine.connect() as conn:
+        assert current_stock(conn, [product_id])[product_id] == 8
+
+
+def test_batch_records_one_movement_per_product(engine, make_product, make_employee):
+    shared, single, seller = make_product(stock=20), make_product(stock=20), make_employee()
+    results = _batch(engine, [
+        _offline(seller, [(shared, 2, None), (single, 1, None), (shared, 1, None)]),
+        _offline(seller, [(shared, 4, None)]),
+    ])
+    assert _movements(engine, shared) == [(-7, None)]
+    assert _movements(engine, single) == [(-1, results[0]["sale_id"])]
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM sale_items WHERE product_id = :pid"),
+                            {"pid": shared}).scalar() == 3
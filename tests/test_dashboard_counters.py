@@ -0,0 +1,52 @@
+# tests/test_dashboard_counters.py
+"""Trigger-maintained dashboard counters against counts taken from the base tables."""
+from decimal import Decimal
+from sqlalchemy import text
+from checkout import complete_sale
+from dashboard_counters import compact, read_counters, reconcile
+import stock_ledger
+
+
+def _counters(engine):
+    with engine.connect() as conn:
+        return read_counters(conn)
+
+
+def _changes(before, after):
+    return {key: after[key] - before[key] for key in before if after[key] != before[key]}
+
+
+def test_counters_follow_products_and_sales(engine, make_product, make_employee):
+    stock_ledger.compact(engine)    # fold earlier tests' movements, so only this test's are folded below
+    reconcile(engine)               # earlier tests may retire or restore rows without triggers
+    before = _counters(engine)
+    product_id, seller = make_product(stock=40, price="2.50"), make_employee()
+    with engine.begin() as conn:
+        complete_sale(conn, [(product_id, 3)], "CASH", seller)
+        complete_sale(conn, [(product_id, 1)], "CARD", seller)
+    stock_ledger.compact(engine)    # stock reaches products.stock_quantity at compaction
+
+    assert _changes(before, _counters(engine)) == {
+        "total_products": 1, "inventory_units": 36, "total_sales": 2, "total_revenue": Decimal("10.00"),
+        "today_sales_count": 2, "today_revenue": Decimal("10.00"),
+    }
+    assert reconcile(engine) == []
+
+
+def test_reconcile_corrects_drift_and_compact_keeps_totals(engine):
+    reconcile(engine)
+    before = _counters(engine)
+    with engine.begin() as conn:
+        conn.execute(text("""
+            INSERT INTO dashboard_counters (counter_name, counter_period, shard, value)
+            VALUES ('products', 'all', 7, 5)
+            ON CONFLICT (counter_name, counter_period, shard)
+            DO UPDATE SET value = dashboard_counters.value + 5
+        """))
+    assert _counters(engine)["total_products"] == before["total_products"] + 5
+    assert reconcile(engine) == [("products", "all", -5)]
+
+    compact(engine)
+    assert _counters(engine) == before
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM dashboard_counters WHERE shard <> 0")).scalar() == 0
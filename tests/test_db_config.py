@@ -0,0 +1,41 @@
+# tests/test_db_config.py
+"""Named connection pools: settings overrides, one engine per pool, checkout statistics."""
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+import db_config
+from db_config import get_engine, pool_settings, pool_stats
+
+
+def test_overrides_for_all_pools_and_one_pool(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "4")
+    monkeypatch.setenv("DB_ANALYTICS_POOL_SIZE", "1")
+    monkeypatch.setenv("DB_ANALYTICS_POOL_TIMEOUT", "5")
+    assert pool_settings("oltp") == {**db_config.POOL_DEFAULTS["oltp"], "pool_size": 4}
+    assert pool_settings("analytics") == {**db_config.POOL_DEFAULTS["analytics"], "pool_size": 1, "pool_timeout": 5}
+
+
+def test_unknown_pool():
+    with pytest.raises(ValueError, match="Unknown connection pool 'reports'"):
+        pool_settings("reports")
+
+
+@pytest.fixture
+def tiny_pool(database, monkeypatch):
+    """A pool of one connection that gives up waiting after a second"""
+    monkeypatch.setitem(db_config.POOL_DEFAULTS, "tiny",
+                        {"pool_size": 1, "max_overflow": 0, "pool_recycle": 1800, "pool_timeout": 1})
+    yield get_engine("tiny")
+    db_config._engines.pop("tiny").dispose()
+
+
+def test_one_engine_per_pool_with_checkout_stats(tiny_pool):
+    assert get_engine("tiny") is tiny_pool
+    with tiny_pool.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        with pytest.raises(PoolTimeoutError):
+            tiny_pool.connect()
+    [stats] = [s for s in pool_stats() if s["pool"] == "tiny"]
+    assert (stats["driver"], stats["max_connections"], stats["checked_out"]) == ("psycopg2", 1, 0)
+    assert (stats["checkouts"], stats["timeouts"], stats["waiting"]) == (1, 1, 0)
+    assert stats["wait_seconds_max"] >= 1
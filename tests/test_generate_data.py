@@ -0,0 +1,33 @@
+# tests/test_generate_data.py
+"""The synthetic data generator's settings and its refusal to overwrite data."""
+import datetime
+import os
+import subprocess
+import sys
+import pytest
+from generate_data import SCALES, _parse_args, generate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_overrides_replace_preset_sizes():
+    settings, replace = _parse_args(["--scale", "small", "--products", "25", "--end", "2025-03-01", "--replace"])
+    assert settings["products"] == 25
+    assert settings["customers"] == SCALES["small"]["customers"]
+    assert settings["end"] == datetime.date(2025, 3, 1)
+    assert replace
+
+
+def test_refuses_to_overwrite_without_replace(make_product):
+    make_product()
+    settings, _ = _parse_args(["--days", "1"])
+    with pytest.raises(RuntimeError, match="--replace"):
+        generate(settings, progress=lambda message: None)
+
+
+def test_failure_exits_non_zero(make_product):
+    make_product()
+    run = subprocess.run([sys.executable, "generate_data.py", "--days", "1"], cwd=ROOT, env=os.environ,
+                         capture_output=True, text=True, timeout=120)
+    assert run.returncode == 1
+    assert "Data generation failed" in run.stdout
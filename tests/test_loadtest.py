@@ -0,0 +1,76 @@
+# tests/test_loadtest.py
+"""The load-test harness's traffic model and statistics (no server needed)."""
+import argparse
+import random
+from collections import Counter
+import pytest
+from loadtest import Recorder, Store, parse_mix, percentile, summarize
+from pagination import encode_cursor
+
+
+class _Catalog:
+    """Answers the product and supplier listings Store loads, two pages of products"""
+
+    def __init__(self, count=50):
+        self.products = [{"product_id": i, "barcode": f"BC{i}" if i % 10 else None, "price": 1.0}
+                         for i in range(1, count + 1)]
+
+    def request(self, method, path, body=None, label=None):
+        if path.startswith("/api/suppliers"):
+            return 200, {"suppliers": [{"supplier_id": 3}]}
+        half = len(self.products) // 2
+        if "cursor=" in path:
+            return 200, {"products": self.products[half:], "next_cursor": None}
+        return 200, {"products": self.products[:half], "next_cursor": encode_cursor([half])}
+
+
+def _store(seed=1, zipf=1.0):
+    random.seed(seed)
+    return Store(_Catalog(), zipf)
+
+
+def test_store_loads_every_page_of_sellable_products():
+    store = _store()
+    assert sorted(p["product_id"] for p in store.products) == [i for i in range(1, 51) if i % 10]
+    assert store.suppliers == [3]
+
+
+def test_picks_are_reproducible_and_skewed():
+    picks = lambda: [p["product_id"] for p in _store(seed=7).pick(random.Random("7:0"), k=2000)]
+    first = picks()
+    assert first == picks()
+    counts = Counter(first).most_common()
+    # Zipf with s=1 over 45 products: the top product is drawn about 23 times as often as the last
+    assert counts[0][1] > 10 * counts[-1][1]
+
+
+def test_basket_merges_repeated_products():
+    store = _store(zipf=3.0)         # steep enough that baskets repeat the top product
+    rng = random.Random(5)
+    baskets = [store.basket(8, rng) for _ in range(50)]
+    for basket in baskets:
+        ids = [product["product_id"] for product, _ in basket]
+        assert len(ids) == len(set(ids))
+    assert any(quantity > 1 for basket in baskets for _, quantity in basket)
+
+
+def test_parse_mix():
+    assert parse_mix("checkout=60, lookup") == {"checkout": 60.0, "lookup": 1.0}
+    with pytest.raises(argparse.ArgumentTypeError, match="unknown scenario 'refund'"):
+        parse_mix("refund=5")
+
+
+def test_percentiles_and_summary():
+    assert percentile([], 50) is None
+    values = [i / 1000 for i in range(1, 101)]
+    assert (percentile(values, 50), percentile(values, 99), percentile(values, 100)) == (0.05, 0.099, 0.1)
+
+    recorder = Recorder()
+    for value in values:
+        recorder.record("GET /", value, 200)
+    recorder.record("POST /api/sales", 0.5, 400)
+    recorder.record("POST /api/sales", 0.7, 0)
+    endpoints, overall = summarize(recorder, 10)
+    assert endpoints["POST /api/sales"]["status_codes"] == {"0": 1, "400": 1}
+    assert (endpoints["POST /api/sales"]["errors"], overall["errors"], overall["requests"]) == (2, 2, 102)
+    assert endpoints["GET /"]["p95_ms"] == 95.0 and overall["throughput_rps"] == 10.2
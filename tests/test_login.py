@@ -0,0 +1,63 @@
+# tests/test_login.py
+"""Login: case-insensitive usernames, unique in that case too, and bcrypt hashes upgraded on login."""
+import os
+import pytest
+from psycopg2 import errors
+from sqlalchemy import exc, text
+import passwords
+from migrate import MIGRATIONS_DIR, Migration, split_statements
+from conftest import unique
+
+USERNAMES_MIGRATION = os.path.join(MIGRATIONS_DIR, "0008_employees_username_lower_unique.sql")
+
+
+def _stored_password(engine, username):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT password FROM employees WHERE username = :u"), {"u": username}).scalar()
+
+
+def test_login_ignores_username_case(api, make_employee):
+    username = unique("Casey")
+    make_employee(username=username)
+    for typed in (username, username.lower(), username.upper()):
+        assert api.post("/api/auth/login", json={"username": typed, "password": "pw"}).status_code == 200
+    assert api.post("/api/auth/login", json={"username": username, "password": "PW"}).status_code == 401
+    assert api.post("/api/auth/login", json={"username": unique("nobody"), "password": "pw"}).status_code == 401
+
+
+def test_usernames_are_unique_ignoring_case(make_employee):
+    username = unique("Robin")
+    make_employee(username=username)
+    with pytest.raises(exc.IntegrityError):
+        make_employee(username=username.lower())
+
+
+def test_migration_refuses_usernames_differing_in_case(engine):
+    guard = split_statements(Migration(USERNAMES_MIGRATION).sql)[0]
+    with engine.connect() as conn:
+        transaction = conn.begin()
+        try:
+            conn.execute(text("DROP INDEX employees_username_lower_key"))
+            conn.execute(text("""
+                INSERT INTO employees (name, role, username, password)
+                VALUES ('A', 'CASHIER', 'Clash', 'x'), ('B', 'CASHIER', 'clash', 'x')
+            """))
+            with pytest.raises(errors.RaiseException, match="Usernames differing only in case: clash"):
+                conn.connection.dbapi_connection.cursor().execute(guard)
+        finally:
+            transaction.rollback()
+
+
+@pytest.mark.parametrize("stored", ["pw", passwords.hash_password("pw", rounds=5)])
+def test_login_upgrades_the_stored_password(engine, api, make_employee, stored):
+    username = unique("upgrade")
+    employee_id = make_employee(username=username)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE employees SET password = :p WHERE employee_id = :eid"),
+                     {"p": stored, "eid": employee_id})
+    assert passwords.needs_rehash(stored)
+
+    assert api.post("/api/auth/login", json={"username": username, "password": "pw"}).status_code == 200
+    upgraded = _stored_password(engine, username)
+    assert passwords.is_bcrypt_hash(upgraded) and not passwords.needs_rehash(upgraded)
+    assert passwords.verify_password("pw", upgraded)
@@ -0,0 +1,64 @@
+# tests/test_metrics.py
+"""Prometheus metrics: the text format, query labels and the /metrics endpoint."""
+import pytest
+import metrics
+
+
+def _value(body, series):
+    """The value of one series (name plus labels, exactly as rendered) in a /metrics body"""
+    for line in body.splitlines():
+        if line.startswith(series + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+@pytest.mark.parametrize("statement, name", [
+    ("SELECT p.name FROM public.products p WHERE p.product_id = $1", "SELECT products"),
+    ("SELECT EXTRACT(EPOCH FROM expires_at) FROM revoked_tokens", "SELECT revoked_tokens"),
+    ("INSERT INTO sale_items (sale_id) SELECT 1", "INSERT sale_items"),
+    ("WITH moved AS (DELETE FROM dashboard_counters RETURNING *) SELECT 1", "DELETE dashboard_counters"),
+    ("LOCK TABLE sales IN SHARE MODE", "LOCK sales"),
+    ("SAVEPOINT sp1", "SAVEPOINT"),
+])
+def test_query_name(statement, name):
+    assert metrics.query_name(statement) == name
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_seconds", "Test histogram", ("kind",), buckets=(0.1, 1.0))
+    try:
+        for value in (0.05, 0.5, 0.5, 3.0):
+            histogram.observe(value, kind='say "hi"\n')
+        assert histogram.render() == [
+            "# HELP test_seconds Test histogram",
+            "# TYPE test_seconds histogram",
+            'test_seconds_bucket{kind="say \\"hi\\"\\n",le="0.1"} 1',
+            'test_seconds_bucket{kind="say \\"hi\\"\\n",le="1.0"} 3',
+            'test_seconds_bucket{kind="say \\"hi\\"\\n",le="+Inf"} 4',
+            'test_seconds_sum{kind="say \\"hi\\"\\n"} 4.05',
+            'test_seconds_count{kind="say \\"hi\\"\\n"} 4',
+        ]
+    finally:
+        metrics._registry.remove(histogram)
+
+
+def test_metrics_endpoint_counts_requests_and_sales(api, login, make_product):
+    headers = login()
+    product_id = make_product(stock=5, price="3.00")
+    before = api.get("/metrics").text
+    assert api.post("/api/sales", json={"items": [{"product_id": product_id, "quantity": 2}],
+                                        "payment_method": "CASH"}, headers=headers).status_code == 200
+    assert api.get("/api/sales/999999999", headers=headers).status_code == 200
+
+    response = api.get("/metrics")
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE
+    after = response.text
+    for series, change in [
+        ('sales_completed_total{channel="pos"}', 1),
+        ('sale_items_total{channel="pos"}', 1),
+        ('sales_revenue_total{channel="pos"}', 6.0),
+        ('http_requests_total{method="GET",route="/api/sales/{sale_id}",status="200"}', 1),
+    ]:
+        assert _value(after, series) - _value(before, series) == change, series
+    assert 'db_pool_max_connections{pool="oltp",driver="asyncpg"}' in after
+    assert 'route="/metrics"' not in after
@@ -0,0 +1,112 @@
+# tests/test_migrate.py
+"""Versioned migrations: statement splitting, transactional and no-transaction files."""
+import os
+import pytest
+from psycopg2 import errors
+from sqlalchemy import text
+import migrate
+from migrate import Migration, load_migrations, split_statements
+
+
+def test_split_statements_skips_quoted_semicolons():
+    sql = """
+        -- a comment; not a statement
+        CREATE TABLE t (note text DEFAULT 'a;b', "odd;name" int);
+        /* block; comment */
+        CREATE FUNCTION f() RETURNS int LANGUAGE sql AS $body$ SELECT 1; $body$;
+        DO $$ BEGIN RAISE NOTICE 'x;y'; END $$;;
+        -- trailing comment
+    """
+    create_table, create_function, do_block = split_statements(sql)
+    assert create_table.endswith("""CREATE TABLE t (note text DEFAULT 'a;b', "odd;name" int)""")
+    assert create_function.endswith("AS $body$ SELECT 1; $body$")
+    assert do_block == "DO $$ BEGIN RAISE NOTICE 'x;y'; END $$"
+
+
+def _write(directory, name, sql):
+    path = os.path.join(directory, name)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(sql)
+    return path
+
+
+def test_migration_files(tmp_path):
+    plain = Migration(_write(tmp_path, "0042_add_things.sql", "SELECT 1;"))
+    assert (plain.version, plain.name, plain.transactional) == (42, "add_things", True)
+    assert not Migration(_write(tmp_path, "0043_index.sql", "-- migrate: no-transaction\nSELECT 1;")).transactional
+    with pytest.raises(ValueError, match="must look like"):
+        Migration(_write(tmp_path, "add_things.sql", ""))
+    os.remove(tmp_path / "add_things.sql")
+    _write(tmp_path, "42_again.sql", "SELECT 1;")
+    with pytest.raises(ValueError, match="Duplicate migration version 42"):
+        load_migrations(str(tmp_path))
+
+
+@pytest.fixture
+def extra_migrations(engine, tmp_path, monkeypatch):
+    """Adds migrations 9001.. from tmp_path to the project's own; removes what they made afterwards"""
+    project = load_migrations()
+    monkeypatch.setattr(migrate, "load_migrations", lambda: project + load_migrations(str(tmp_path)))
+    yield tmp_path
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS migrate_test_things"))
+        conn.execute(text("DELETE FROM schema_migrations WHERE version > 9000"))
+
+
+def _index_valid(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass('migrate_test_things_name_idx')
+        """)).scalar()
+
+
+def test_pending_migrations_are_applied_once(engine, extra_migrations, capsys):
+    _write(extra_migrations, "9001_things.sql", "CREATE TABLE migrate_test_things (name text);")
+    _write(extra_migrations, "9002_things_index.sql", """-- migrate: no-transaction
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS migrate_test_things_name_idx ON migrate_test_things (name);
+        INSERT INTO migrate_test_things VALUES ('after the index');
+    """)
+    assert migrate.migrate() == [9001, 9002]
+    assert _index_valid(engine)
+    assert migrate.migrate() == []
+
+    # An edited migration is reported, not re-run
+    _write(extra_migrations, "9001_things.sql", "CREATE TABLE migrate_test_things (name text, extra int);")
+    assert migrate.migrate() == []
+    assert "9001_things changed after it was applied" in capsys.readouterr().out
+    assert [(v, applied, unchanged) for v, _, applied, unchanged in migrate.status() if v > 9000] == [
+        (9001, True, False), (9002, True, True)]
+
+
+def test_failed_migration_is_rolled_back(engine, extra_migrations):
+    _write(extra_migrations, "9001_things.sql", """
+        CREATE TABLE migrate_test_things (name text);
+        SELECT no_such_function();
+    """)
+    with pytest.raises(errors.UndefinedFunction):
+        migrate.migrate()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT to_regclass('migrate_test_things')")).scalar() is None
+        assert conn.execute(text("SELECT COUNT(*) FROM schema_migrations WHERE version > 9000")).scalar() == 0
+
+
+def test_invalid_concurrent_index_is_rebuilt(engine, extra_migrations, capsys):
+    _write(extra_migrations, "9001_things.sql", "CREATE TABLE migrate_test_things (name text);")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE migrate_test_things (name text)"))
+        conn.execute(text("CREATE INDEX migrate_test_things_name_idx ON migrate_test_things (name)"))
+        # What an interrupted CREATE INDEX CONCURRENTLY leaves behind
+        conn.execute(text("""
+            UPDATE pg_index SET indisvalid = false WHERE indexrelid = 'migrate_test_things_name_idx'::regclass
+        """))
+        conn.execute(text("""
+            INSERT INTO schema_migrations (version, name, checksum) VALUES (9001, 'things', :checksum)
+        """), {"checksum": Migration(str(extra_migrations / "9001_things.sql")).checksum})
+    assert _index_valid(engine) is False
+
+    _write(extra_migrations, "9002_things_index.sql", """-- migrate: no-transaction
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS migrate_test_things_name_idx ON migrate_test_things (name);
+    """)
+    assert migrate.migrate() == [9002]
+    assert "Rebuilding invalid index migrate_test_things_name_idx" in capsys.readouterr().out
+    assert _index_valid(engine) is True
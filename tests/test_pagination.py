@@ -0,0 +1,77 @@
+# tests/test_pagination.py
+"""Cursor encoding and the keyset WHERE / ORDER BY fragments (no database needed)."""
+import datetime
+from decimal import Decimal
+import pytest
+from pagination import CursorError, decode_cursor, encode_cursor, keyset_page, split_page
+
+SALES_KEY = [("s.sale_time", datetime.datetime), ("s.sale_id", int)]
+
+
+@pytest.mark.parametrize("values", [
+    [42],
+    ["Milk", 7],
+    [datetime.datetime(2025, 3, 1, 9, 30, 15, 250000), 12],
+    [datetime.date(2025, 3, 1), 3],
+    [Decimal("19.99"), 5],
+    [None, 8],
+])
+def test_cursor_round_trip(values):
+    assert decode_cursor(encode_cursor(values), len(values)) == values
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", encode_cursor([1, 2]), "eyJhIjoxfQ",    # {"a":1}
+                                    encode_cursor([{"when": "2025-01-01"}])])
+def test_malformed_cursor(cursor):
+    with pytest.raises(CursorError):
+        decode_cursor(cursor, 1)
+
+
+@pytest.mark.parametrize("values", [["x"], [True], [1.5], [None], [{"ts": "2025-01-01T00:00:00"}]])
+def test_cursor_of_wrong_type(values):
+    with pytest.raises(CursorError):
+        decode_cursor(encode_cursor(values), 1, (int,))
+
+
+def test_first_page_has_no_condition():
+    where, order_by, params = keyset_page([("c.name", str), ("c.customer_id", int)], None, 50)
+    assert where == ""
+    assert order_by == "c.name ASC, c.customer_id ASC"
+    assert params == {"limit": 51}
+
+
+def test_next_page_starts_after_cursor():
+    cursor = encode_cursor(["Milk", 7])
+    where, _, params = keyset_page([("name", str), ("category_id", int)], cursor, 10)
+    assert where == "WHERE (name, category_id) > (:k0, :k1)"
+    assert params == {"limit": 11, "k0": "Milk", "k1": 7}
+
+
+def test_descending_nullable_lead():
+    when = datetime.datetime(2025, 3, 1, 9, 30)
+    where, order_by, params = keyset_page(SALES_KEY, encode_cursor([when, 12]), 10,
+                                          descending=True, nullable_lead=True)
+    assert order_by == "s.sale_time DESC NULLS LAST, s.sale_id DESC"
+    assert where == "WHERE ((s.sale_time, s.sale_id) < (:k0, :k1) OR s.sale_time IS NULL)"
+    assert params["k0"] == when
+
+    # Inside the trailing NULL block only the remaining columns page
+    where, _, params = keyset_page(SALES_KEY, encode_cursor([None, 12]), 10, descending=True, nullable_lead=True)
+    assert where == "WHERE s.sale_time IS NULL AND (s.sale_id) < (:k1)"
+    assert "k0" not in params
+
+
+@pytest.mark.parametrize("values", [["x"], [3, 4], ["2025-03-01", 12], [datetime.date(2025, 3, 1), 12],
+                                    [datetime.datetime(2025, 3, 1), "12"]])
+def test_keyset_page_rejects_mistyped_cursor(values):
+    key = [("id", int)] if len(values) == 1 else SALES_KEY
+    with pytest.raises(CursorError):
+        keyset_page(key, encode_cursor(values), 10, nullable_lead=len(values) > 1)
+
+
+def test_split_page():
+    rows = [(i, f"row {i}") for i in range(1, 5)]
+    page, cursor = split_page(rows, 3, lambda r: (r[0],))
+    assert page == rows[:3]
+    assert decode_cursor(cursor, 1) == [3]
+    assert split_page(rows, 4, lambda r: (r[0],)) == (rows, None)
@@ -0,0 +1,69 @@
+# tests/test_product_sales_stats.py
+"""Per-product sales statistics: trigger-maintained totals and the rolling-window slide."""
+import datetime
+import threading
+from sqlalchemy import text
+from checkout import complete_sale, complete_sales_batch
+from product_sales_stats import refresh_windows, slide_windows
+
+
+def _stats(engine, product_id):
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT lifetime_units, units_7d, units_30d, windows_as_of
+            FROM product_sales_stats WHERE product_id = :pid
+        """), {"pid": product_id}).one()
+
+
+def _sell(engine, product_id, employee_id):
+    with engine.begin() as conn:
+        complete_sale(conn, [(product_id, 1)], "CASH", employee_id)
+
+
+def _replay(engine, employee_id, product_id, days_ago, quantity):
+    when = datetime.datetime.combine(datetime.date.today() - datetime.timedelta(days=days_ago), datetime.time(12))
+    with engine.begin() as conn:
+        [result] = complete_sales_batch(conn, [{
+            "client_sale_id": f"stats-{product_id}-{days_ago}", "items": [(product_id, quantity, None)],
+            "payment_method": "CASH", "employee_id": employee_id, "sale_time": when,
+        }])
+    assert result["status"] == "created"
+
+
+def test_windows_count_whole_days_before_today(engine, make_product, make_employee):
+    product_id, seller = make_product(stock=100), make_employee()
+    _replay(engine, seller, product_id, 1, 2)
+    _replay(engine, seller, product_id, 10, 3)
+    _replay(engine, seller, product_id, 40, 4)
+    with engine.begin() as conn:
+        complete_sale(conn, [(product_id, 5)], "CASH", seller)
+        conn.execute(text("UPDATE product_sales_stats SET windows_as_of = CURRENT_DATE - 1 WHERE product_id = :pid"),
+                     {"pid": product_id})
+
+    assert refresh_windows(engine) >= 1
+    lifetime, units_7d, units_30d, as_of = _stats(engine, product_id)
+    assert (lifetime, units_7d, units_30d, as_of) == (14, 2, 5, datetime.date.today())
+
+    # Today's sales count towards the totals only, until tomorrow's slide
+    _sell(engine, product_id, seller)
+    assert _stats(engine, product_id)[:3] == (15, 2, 5)
+    assert refresh_windows(engine) == 0
+
+
+def test_slide_does_not_hold_back_checkouts(engine, make_product, make_employee):
+    sliding, selling = make_product(stock=10), make_product(stock=10)
+    seller = make_employee()
+    with engine.begin() as conn:
+        complete_sale(conn, [(sliding, 1)], "CASH", seller)
+        complete_sale(conn, [(selling, 1)], "CASH", seller)
+        conn.execute(text("UPDATE product_sales_stats SET windows_as_of = CURRENT_DATE - 1"))
+
+    with engine.connect() as slide_conn:
+        with slide_conn.begin():
+            assert sliding in slide_windows(slide_conn, sliding - 1, batch=1)
+            # A sale of another product goes through while the slide's transaction is open
+            sale = threading.Thread(target=_sell, args=(engine, selling, seller))
+            sale.start()
+            sale.join(5)
+            assert not sale.is_alive()
+    assert _stats(engine, selling)[0] == 2
@@ -0,0 +1,97 @@
+# tests/test_purchase_receiving.py
+"""Idempotent purchase order receiving: received totals, retries, racing receipts."""
+import threading
+import pytest
+from sqlalchemy import text
+from purchase_receiving import ReceivingError, receive_order
+from stock_ledger import current_stock
+
+
+@pytest.fixture
+def order(engine, make_product):
+    """(order_id, product_a, product_b): 10 of a on two lines (6 + 4), 5 of b, nothing in stock"""
+    product_a, product_b = make_product(), make_product()
+    with engine.begin() as conn:
+        supplier_id = conn.execute(text("SELECT supplier_id FROM products WHERE product_id = :pid"),
+                                   {"pid": product_a}).scalar()
+        order_id = conn.execute(text("""
+            INSERT INTO purchase_orders (supplier_id, status) VALUES (:sid, 'PENDING') RETURNING order_id
+        """), {"sid": supplier_id}).scalar()
+        for product_id, quantity in [(product_a, 6), (product_b, 5), (product_a, 4)]:
+            conn.execute(text("""
+                INSERT INTO purchase_order_items (order_id, product_id, quantity, unit_price)
+                VALUES (:oid, :pid, :qty, 1)
+            """), {"oid": order_id, "pid": product_id, "qty": quantity})
+    return order_id, product_a, product_b
+
+
+def _receive(engine, order_id, received=None):
+    with engine.begin() as conn:
+        return receive_order(conn, order_id, received)
+
+
+def _stock(engine, *product_ids):
+    with engine.connect() as conn:
+        stock = current_stock(conn, product_ids)
+    return [stock[pid] for pid in product_ids]
+
+
+def test_received_totals_are_idempotent(engine, order):
+    order_id, a, b = order
+    first = _receive(engine, order_id, [(a, 8)])
+    assert (first["previous_status"], first["status"]) == ("PENDING", "PARTIAL")
+    # The product's total fills its lines in line order
+    assert [(line["product_id"], line["received"], line["added"]) for line in first["lines"]] == [
+        (a, 6, 6), (b, 0, 0), (a, 2, 2)]
+    assert first["stock_levels"] == {a: 8}
+
+    # A retry of the same receipt, and a lower total, change nothing
+    assert all(line["added"] == 0 for line in _receive(engine, order_id, [(a, 8)])["lines"])
+    assert all(line["added"] == 0 for line in _receive(engine, order_id, [(a, 3)])["lines"])
+    assert _stock(engine, a, b) == [8, 0]
+
+    last = _receive(engine, order_id)
+    assert last["status"] == "RECEIVED" and last["stock_levels"] == {a: 10, b: 5}
+    assert _receive(engine, order_id)["stock_levels"] == {}
+    assert _stock(engine, a, b) == [10, 5]
+
+
+@pytest.mark.parametrize("received, status, message", [
+    ("not on order", 400, "is not on purchase order"),
+    ("too many", 400, "Received 11 of product"),
+    ("negative", 400, "cannot be negative"),
+])
+def test_bad_receipts_are_refused(engine, order, received, status, message):
+    order_id, a, _ = order
+    lines = {"not on order": [(999999999, 1)], "too many": [(a, 11)], "negative": [(a, -1)]}[received]
+    with pytest.raises(ReceivingError, match=message) as raised:
+        _receive(engine, order_id, lines)
+    assert raised.value.status_code == status
+    assert _stock(engine, a) == [0]
+
+
+def test_unknown_order(engine):
+    with pytest.raises(ReceivingError) as raised:
+        _receive(engine, 999999999)
+    assert raised.value.status_code == 404
+
+
+def test_racing_receipts_add_stock_once(engine, order):
+    order_id, a, b = order
+    start = threading.Barrier(4)
+    failed = []
+
+    def receive():
+        start.wait()
+        try:
+            _receive(engine, order_id, [(a, 10), (b, 5)])
+        except Exception as e:
+            failed.append(e)
+
+    threads = [threading.Thread(target=receive) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not failed
+    assert _stock(engine, a, b) == [10, 5]
@@ -0,0 +1,66 @@
+# tests/test_query_log.py
+"""Plan capture for slow statements: the EXPLAIN (ANALYZE) re-run is never kept."""
+import json
+import logging
+import pytest
+from sqlalchemy import text
+import query_log
+
+
+class _Records(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(json.loads(record.getMessage()))
+
+
+@pytest.fixture
+def slow_records(engine, monkeypatch):
+    """Logs and explains every statement; yields the logged records"""
+    monkeypatch.setattr(query_log, "SQL_SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(query_log, "SQL_EXPLAIN_SLOW", True)
+    monkeypatch.setattr(query_log, "_explained", {})
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS query_log_marks (n int)"))
+        conn.execute(text("TRUNCATE query_log_marks"))
+        # A read that writes: nothing in the SELECT marks it as a write
+        conn.execute(text("""
+            CREATE OR REPLACE FUNCTION query_log_mark() RETURNS bigint LANGUAGE sql AS $$
+                INSERT INTO query_log_marks VALUES (1);
+                SELECT COUNT(*) FROM query_log_marks;
+            $$
+        """))
+    handler = _Records()
+    query_log.slow_log.addHandler(handler)
+    yield handler.records
+    query_log.slow_log.removeHandler(handler)
+
+
+def _marks(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT COUNT(*) FROM query_log_marks")).scalar()
+
+
+@pytest.mark.parametrize("autocommit", [False, True])
+def test_explain_rerun_is_rolled_back(engine, slow_records, autocommit):
+    with engine.connect() as conn:
+        if autocommit:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        assert conn.execute(text("SELECT query_log_mark()")).scalar() == 1
+        # The statement's own transaction is intact after the plan capture
+        assert conn.execute(text("SELECT COUNT(*) FROM query_log_marks")).scalar() == 1
+        conn.commit()
+    assert _marks(engine) == 1
+    [plan] = [r["plan"] for r in slow_records if "query_log_mark()" in r["statement"] and "plan" in r]
+    assert any("Result" in line for line in plan)
+
+
+def test_failed_explain_leaves_transaction_usable(engine, slow_records):
+    with engine.connect() as conn:
+        conn.execute(text("SELECT query_log_mark()"))
+        assert query_log._explain(conn, "SELECT 1 / 0", {})[0].startswith("EXPLAIN failed")
+        assert conn.execute(text("SELECT COUNT(*) FROM query_log_marks")).scalar() == 1
+        conn.commit()
+    assert _marks(engine) == 1
@@ -0,0 +1,77 @@
+# tests/test_sales_archive.py
+"""Archival of old sales in batches, and resuming after an interrupted batch."""
+import csv
+import datetime
+import glob
+import gzip
+import os
+import pytest
+from sqlalchemy import text
+import sales_archive
+from checkout import complete_sales_batch
+from sales_archive import archive_sales
+from conftest import unique
+
+BEFORE = datetime.date(2018, 4, 1)
+
+
+def _rows(directory, prefix):
+    rows = []
+    for path in sorted(glob.glob(os.path.join(directory, "*", f"{prefix}_*.csv.gz"))):
+        with gzip.open(path, "rt", newline="") as f:
+            rows.extend(csv.DictReader(f))
+    return rows
+
+
+def _left(engine):
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT (SELECT COUNT(*) FROM sales WHERE sale_time < :before),
+                   (SELECT COUNT(*) FROM sale_items WHERE sale_time < :before),
+                   (SELECT COUNT(*) FROM sale_client_ids WHERE sale_time < :before)
+        """), {"before": BEFORE}).one()
+
+
+def test_interrupted_archive_resumes_without_duplicates(engine, make_product, make_employee, tmp_path,
+                                                        monkeypatch):
+    product_id, seller = make_product(stock=100), make_employee()
+    with engine.begin() as conn:
+        complete_sales_batch(conn, [
+            {"client_sale_id": unique("archive-"), "items": [(product_id, 1, None), (product_id, 2, "1.00")],
+             "payment_method": "CASH", "employee_id": seller,
+             "sale_time": datetime.datetime(2018, 3, day, 10)}
+            for day in range(1, 6)
+        ])
+    with engine.connect() as conn:
+        rollup = conn.execute(text("SELECT SUM(sale_count) FROM sales_rollup_daily WHERE employee_id = :eid"),
+                              {"eid": seller}).scalar()
+
+    # The second batch fails after writing its sales file: it is rolled back
+    copy_out, copies = sales_archive._copy_out, []
+
+    def failing_copy_out(cur, path, *args):
+        copies.append(path)
+        if len(copies) == 4:
+            raise OSError("disk full")
+        copy_out(cur, path, *args)
+
+    monkeypatch.setattr(sales_archive, "_copy_out", failing_copy_out)
+    with pytest.raises(OSError):
+        archive_sales(engine, BEFORE, str(tmp_path), batch_sales=2, pause=0)
+    assert _left(engine) == (3, 6, 3)
+
+    monkeypatch.setattr(sales_archive, "_copy_out", copy_out)
+    progress = []
+    assert archive_sales(engine, BEFORE, str(tmp_path), batch_sales=2, pause=0,
+                         progress=lambda *p: progress.append(p)) == (3, 6)
+    assert progress == [(2, 4, 3), (3, 6, 3)]
+    assert _left(engine) == (0, 0, 0)
+
+    sales, items = _rows(tmp_path, "sales"), _rows(tmp_path, "sale_items")
+    assert len(sales) == len({row["sale_id"] for row in sales}) == 5
+    assert len(items) == 10 and {row["sale_id"] for row in items} == {row["sale_id"] for row in sales}
+    assert not glob.glob(os.path.join(tmp_path, "*", "*.part"))
+    # Archived sales stay counted in the rollups
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT SUM(sale_count) FROM sales_rollup_daily WHERE employee_id = :eid"),
+                            {"eid": seller}).scalar() == rollup == 5
@@ -0,0 +1,63 @@
+# tests/test_sales_partitions.py
+"""Retiring old months of sales: whole-partition detach, and recovery from an interrupted detach."""
+import datetime
+import pytest
+from sqlalchemy import exc, text
+from checkout import complete_sales_batch
+from sales_partitions import list_partitions, retire
+
+
+def _replay(engine, product_id, employee_id, when):
+    with engine.begin() as conn:
+        [result] = complete_sales_batch(conn, [{
+            "client_sale_id": f"partitions-{product_id}-{when:%Y%m%d}", "items": [(product_id, 1, None)],
+            "payment_method": "CASH", "employee_id": employee_id, "sale_time": when,
+        }])
+    return result["sale_id"]
+
+
+def _attached(engine):
+    with engine.connect() as conn:
+        return {row[1] for row in list_partitions(conn)}
+
+
+def _count(engine, table):
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar()
+
+
+def test_retire_keeps_month_as_archived_tables(engine, make_product, make_employee):
+    product_id, seller = make_product(stock=10), make_employee()
+    _replay(engine, product_id, seller, datetime.datetime(2019, 1, 15, 12))
+    assert {"sales_y2019m01", "sale_items_y2019m01"} <= _attached(engine)
+
+    assert datetime.date(2019, 1, 1) in retire(engine, datetime.date(2019, 2, 1))
+    assert not {"sales_y2019m01", "sale_items_y2019m01"} & _attached(engine)
+    assert _count(engine, "archived_sales_y2019m01") == 1
+    assert _count(engine, "archived_sale_items_y2019m01") == 1
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM sale_client_ids WHERE sale_time < '2019-02-01'")).scalar() == 0
+
+
+def test_retire_finishes_an_interrupted_detach(engine, make_product, make_employee):
+    product_id, seller = make_product(stock=10), make_employee()
+    _replay(engine, product_id, seller, datetime.datetime(2019, 6, 15, 12))
+
+    # A DETACH ... CONCURRENTLY cancelled while it waits for an open transaction stays pending
+    with engine.connect() as reader:
+        with reader.begin():
+            reader.execute(text("SELECT COUNT(*) FROM sale_items"))
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                conn.execute(text("SET statement_timeout = '500ms'"))
+                with pytest.raises(exc.OperationalError):
+                    conn.execute(text("ALTER TABLE sale_items DETACH PARTITION sale_items_y2019m06 CONCURRENTLY"))
+                conn.execute(text("RESET statement_timeout"))
+    with engine.connect() as conn:
+        assert conn.execute(text("""
+            SELECT inhdetachpending FROM pg_inherits WHERE inhrelid = 'sale_items_y2019m06'::regclass
+        """)).scalar()
+
+    retire(engine, datetime.date(2019, 7, 1), drop=True)
+    assert not {"sales_y2019m06", "sale_items_y2019m06"} & _attached(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT to_regclass('sale_items_y2019m06')")).scalar() is None
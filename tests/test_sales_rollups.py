@@ -0,0 +1,44 @@
+# tests/test_sales_rollups.py
+"""Hourly and daily sales rollups: trigger maintenance and backfill."""
+import datetime
+from decimal import Decimal
+from sqlalchemy import text
+from checkout import complete_sales_batch
+from sales_rollups import backfill
+from conftest import unique
+
+DAY = datetime.date(2023, 5, 10)
+
+
+def _rollups(engine, employee_id):
+    with engine.connect() as conn:
+        hourly = conn.execute(text("""
+            SELECT bucket, payment_method, sale_count, revenue FROM sales_rollup_hourly
+            WHERE employee_id = :eid ORDER BY 1, 2
+        """), {"eid": employee_id}).fetchall()
+        daily = conn.execute(text("""
+            SELECT sale_date, payment_method, sale_count, revenue FROM sales_rollup_daily
+            WHERE employee_id = :eid ORDER BY 1, 2
+        """), {"eid": employee_id}).fetchall()
+    return hourly, daily
+
+
+def test_rollups_follow_sales_and_backfill_rebuilds_them(engine, make_product, make_employee):
+    product_id, seller = make_product(stock=100, price="4.00"), make_employee()
+    at = lambda hour, minute: datetime.datetime.combine(DAY, datetime.time(hour, minute))
+    with engine.begin() as conn:
+        complete_sales_batch(conn, [
+            {"client_sale_id": unique("rollup-"), "items": [(product_id, quantity, None)], "payment_method": method,
+             "employee_id": seller, "sale_time": when}
+            for quantity, method, when in [(1, "CASH", at(9, 15)), (2, "CASH", at(9, 45)), (3, "CARD", at(14, 0))]
+        ])
+
+    hourly, daily = _rollups(engine, seller)
+    assert hourly == [(at(9, 0), "CASH", 2, Decimal("12.00")), (at(14, 0), "CARD", 1, Decimal("12.00"))]
+    assert daily == [(DAY, "CARD", 1, Decimal("12.00")), (DAY, "CASH", 2, Decimal("12.00"))]
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM sales_rollup_hourly WHERE employee_id = :eid"), {"eid": seller})
+        conn.execute(text("UPDATE sales_rollup_daily SET sale_count = 99 WHERE employee_id = :eid"), {"eid": seller})
+    assert backfill(engine, DAY, DAY) == 1
+    assert _rollups(engine, seller) == (hourly, daily)
@@ -0,0 +1,49 @@
+# tests/test_session_tokens.py
+"""Signed session tokens: verification, role checks and logout revocation across processes."""
+import time
+import pytest
+from jose import jwt
+from session_tokens import (JWT_ALGORITHM, JWT_SECRET, RevocationList, TokenError, issue_token,
+                            verify_token)
+
+
+def test_issued_token_verifies():
+    token, expires_at = issue_token(7, "Sam", "MANAGER")
+    session = verify_token(token)
+    assert (session.employee_id, session.name, session.role, session.expires_at) == (7, "Sam", "MANAGER", expires_at)
+
+
+@pytest.mark.parametrize("claims, secret", [
+    ({"exp": int(time.time()) - 1}, JWT_SECRET),        # expired
+    ({}, "some other secret"),                           # forged
+    ({"role": None, "sub": None}, JWT_SECRET),          # malformed claims
+])
+def test_bad_tokens_are_refused(claims, secret):
+    token = jwt.encode({"sub": "7", "name": "Sam", "role": "ADMIN", "exp": int(time.time()) + 60,
+                        "jti": "abc", **claims}, secret, algorithm=JWT_ALGORITHM)
+    with pytest.raises(TokenError):
+        verify_token(token)
+
+
+def test_roles_are_checked_from_the_token(api, login):
+    assert api.get("/api/employees").status_code == 401
+    assert api.get("/api/employees", headers={"Authorization": "Bearer not-a-token"}).status_code == 401
+    assert api.get("/api/employees", headers=login("CASHIER")).status_code == 403
+    assert api.get("/api/employees", headers=login("ADMIN")).status_code == 200
+
+
+def test_logout_revokes_only_that_token_in_every_process(engine, api, login):
+    headers, other = login(), login()
+    token_id = verify_token(headers["Authorization"].split()[1]).token_id
+    assert api.post("/api/auth/logout", headers=headers).status_code == 200
+
+    response = api.get("/api/auth/me", headers=headers)
+    assert response.status_code == 401 and "logged out" in response.json()["detail"]
+    assert api.get("/api/auth/me", headers=other).status_code == 200
+
+    # Another worker learns of the revocation at its next refresh
+    elsewhere = RevocationList(refresh_interval=0)
+    assert elsewhere.needs_refresh() and not elsewhere.is_revoked(token_id)
+    with engine.connect() as conn:
+        elsewhere.refresh(conn)
+    assert elsewhere.is_revoked(token_id)
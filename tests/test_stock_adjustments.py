@@ -0,0 +1,56 @@
+# tests/test_stock_adjustments.py
+"""Set-based stock adjustments: folding, partial application and the movements recorded."""
+import pytest
+from sqlalchemy import text
+from stock_adjustments import StockAdjustmentError, apply_adjustments, merge_adjustments
+from stock_ledger import current_stock
+
+
+def _adjust(engine, adjustments, kind="ADJUSTMENT"):
+    with engine.begin() as conn:
+        return apply_adjustments(conn, adjustments, kind)
+
+
+def _movements(engine, product_id):
+    with engine.connect() as conn:
+        return conn.execute(text("""
+            SELECT kind, quantity FROM stock_movements WHERE product_id = :pid ORDER BY movement_id
+        """), {"pid": product_id}).fetchall()
+
+
+def test_merge_folds_in_order():
+    assert merge_adjustments([(1, 5, "add"), (2, 10, "set"), (2, -3, "add"), (1, 2, "add"), (3, 4, "add"),
+                              (3, 8, "set")]) == {1: (7, False), 2: (7, True), 3: (8, True)}
+
+
+@pytest.mark.parametrize("adjustments, message", [
+    ([], "No adjustments given"),
+    ([(1, 5, "replace")], "Invalid mode 'replace'"),
+    ([(1, -1, "set")], "cannot be negative"),
+])
+def test_invalid_adjustment_lists(adjustments, message):
+    with pytest.raises(StockAdjustmentError, match=message):
+        merge_adjustments(adjustments)
+
+
+def test_adjustments_apply_where_they_can(engine, make_product):
+    counted, removed, too_many, unchanged = (make_product(stock=10) for _ in range(4))
+    result = _adjust(engine, [(counted, 25, "set"), (removed, -4, "add"), (too_many, -11, "add"),
+                              (unchanged, 10, "set"), (999999999, 1, "add")])
+    assert [(r["product_id"], r["status"], r["previous"], r["stock_quantity"]) for r in result["results"]] == [
+        (counted, "updated", 10, 25), (removed, "updated", 10, 6), (too_many, "rejected", 10, 10),
+        (unchanged, "updated", 10, 10), (999999999, "not_found", None, None)]
+    assert (result["updated"], result["rejected"], result["not_found"]) == (3, 1, 1)
+
+    assert [_movements(engine, pid) for pid in (counted, removed, too_many, unchanged)] == [
+        [("ADJUSTMENT", 15)], [("ADJUSTMENT", -4)], [], []]
+    with engine.connect() as conn:
+        assert current_stock(conn, [counted, removed, too_many]) == {counted: 25, removed: 6, too_many: 10}
+
+
+def test_clearance_and_invalid_kind(engine, make_product):
+    product_id = make_product(stock=10)
+    _adjust(engine, [(product_id, -3, "add")], "CLEARANCE")
+    assert _movements(engine, product_id) == [("CLEARANCE", -3)]
+    with pytest.raises(StockAdjustmentError, match="Invalid kind 'SALE'"):
+        _adjust(engine, [(product_id, 1, "add")], "SALE")
@@ -0,0 +1,84 @@
+# tests/test_stock_ledger.py
+"""
+Concurrency checks of the stock ledger, against the test database
+(conftest.py). They record real sales from several connections at once.
+"""
+import threading
+import pytest
+from checkout import complete_sale, CheckoutError
+from stock_adjustments import apply_adjustments
+from stock_ledger import compact, current_stock
+
+SELLERS = 8
+
+
+@pytest.fixture
+def product(make_product, make_employee):
+    """A product of its own and SELLERS employees to sell it"""
+    return make_product(), [make_employee() for _ in range(SELLERS)]
+
+
+def _set_stock(engine, product_id, quantity):
+    with engine.begin() as conn:
+        apply_adjustments(conn, [(product_id, quantity, "set")])
+
+
+def _stock(engine, product_id):
+    with engine.connect() as conn:
+        return current_stock(conn, [product_id])[product_id]
+
+
+def _sell_concurrently(engine, product_id, sellers, quantity):
+    """Every seller tries to sell quantity at once; returns the number of sales that went through"""
+    start = threading.Barrier(len(sellers))
+    sold, failed = [], []
+
+    def till(employee_id):
+        start.wait()
+        try:
+            with engine.begin() as conn:
+                complete_sale(conn, [(product_id, quantity)], "CASH", employee_id)
+            sold.append(employee_id)
+        except CheckoutError:
+            pass
+        except Exception as e:
+            failed.append(e)
+
+    threads = [threading.Thread(target=till, args=(employee_id,)) for employee_id in sellers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not failed
+    return len(sold)
+
+
+def test_large_concurrent_sales_cannot_oversell(engine, product):
+    product_id, sellers = product
+    _set_stock(engine, product_id, 100)
+    assert _sell_concurrently(engine, product_id, sellers[:2], 75) == 1
+    assert _stock(engine, product_id) == 25
+
+
+def test_stock_never_goes_negative(engine, product):
+    product_id, sellers = product
+    _set_stock(engine, product_id, 10)
+    sold = _sell_concurrently(engine, product_id, sellers, 3)
+    assert sold == 3
+    compact(engine)
+    assert _stock(engine, product_id) == 1
+
+
+def test_stock_count_includes_sales_committing_meanwhile(engine, product):
+    product_id, sellers = product
+    _set_stock(engine, product_id, 100)
+    with engine.connect() as sale_conn:
+        with sale_conn.begin():
+            complete_sale(sale_conn, [(product_id, 2)], "CASH", sellers[0])
+            # The count waits for the open sale's commit, then sets the level
+            count = threading.Thread(target=_set_stock, args=(engine, product_id, 50))
+            count.start()
+            count.join(0.5)
+            assert count.is_alive()
+        count.join()
+    assert _stock(engine, product_id) == 50
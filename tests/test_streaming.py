@@ -0,0 +1,63 @@
+# tests/test_streaming.py
+"""Streamed list responses: format negotiation, NDJSON / CSV bodies across partitions, gzip."""
+import csv
+import io
+import json
+import pytest
+from fastapi import HTTPException
+import streaming
+from streaming import stream_format
+from conftest import unique
+
+
+class _Request:
+    def __init__(self, **headers):
+        self.headers = headers
+
+
+@pytest.mark.parametrize("fmt, headers, expected", [
+    (None, {}, None),
+    ("json", {"accept": "text/csv"}, None),
+    ("CSV", {}, "csv"),
+    (None, {"accept": "application/x-ndjson"}, "ndjson"),
+    (None, {"accept": "text/csv, */*"}, "csv"),
+])
+def test_stream_format(fmt, headers, expected):
+    assert stream_format(_Request(**headers), fmt) == expected
+
+
+def test_unsupported_format():
+    with pytest.raises(HTTPException) as raised:
+        stream_format(_Request(), "xml")
+    assert raised.value.status_code == 400
+
+
+@pytest.fixture
+def customers(api, login, monkeypatch):
+    """Headers of a logged-in cashier and the names of five new customers, streamed two rows at a time"""
+    headers = login()
+    names = [unique("Streamed Customer ") for _ in range(5)]
+    for name in names:
+        response = api.post("/api/customers", json={"name": name}, headers=headers)
+        assert response.status_code == 200, response.text
+    monkeypatch.setattr(streaming, "PARTITION_SIZE", 2)
+    return headers, names
+
+
+def test_ndjson_stream_has_every_row(api, customers):
+    headers, names = customers
+    response = api.get("/api/customers", params={"format": "ndjson"}, headers=headers)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert set(names) <= {r["name"] for r in records}
+    assert len({r["customer_id"] for r in records}) == len(records)
+
+
+def test_gzip_csv_stream(api, customers):
+    headers, names = customers
+    response = api.get("/api/customers", headers={**headers, "Accept": "text/csv", "Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "customers.csv" in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))    # the client un-gzips the body
+    assert list(rows[0]) == ["customer_id", "name", "phone", "email"]
+    assert set(names) <= {r["name"] for r in rows}